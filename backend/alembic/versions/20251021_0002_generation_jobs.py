@@ -0,0 +1,35 @@
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251021_0002_generation_jobs'
+down_revision = '20251020_0001_init'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+	op.create_table(
+		'generation_jobs',
+		sa.Column('id', sa.Integer(), primary_key=True),
+		sa.Column('batch_id', sa.Integer(), sa.ForeignKey('import_batches.id'), nullable=True),
+		sa.Column('question_id', sa.Integer(), sa.ForeignKey('questions.id'), nullable=False),
+		sa.Column('kb_a_id', sa.String(length=100), nullable=False),
+		sa.Column('kb_b_id', sa.String(length=100), nullable=False),
+		sa.Column('prompt', sa.Text(), nullable=True),
+		sa.Column('status', sa.String(length=20), nullable=False, server_default='queued'),
+		sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+		sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='3'),
+		sa.Column('last_error', sa.Text(), nullable=True),
+		sa.Column('next_run_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+		sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+		sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+	)
+	op.create_index('ix_generation_jobs_status_next_run_at', 'generation_jobs', ['status', 'next_run_at'])
+	op.create_index('ix_generation_jobs_batch_id_status', 'generation_jobs', ['batch_id', 'status'])
+
+
+def downgrade() -> None:
+	op.drop_index('ix_generation_jobs_batch_id_status', table_name='generation_jobs')
+	op.drop_index('ix_generation_jobs_status_next_run_at', table_name='generation_jobs')
+	op.drop_table('generation_jobs')
@@ -0,0 +1,23 @@
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251022_0003_question_batch'
+down_revision = '20251021_0002_generation_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+	# 批量写入按 batch_id 回查自增 id，需要在 questions 上记录来源批次
+	op.add_column('questions', sa.Column('batch_id', sa.Integer(), nullable=True))
+	op.create_foreign_key('fk_questions_batch_id', 'questions', 'import_batches', ['batch_id'], ['id'])
+	op.create_index('ix_questions_batch_id', 'questions', ['batch_id', 'id'])
+	op.create_index('ix_knowledge_docs_batch_id', 'knowledge_docs', ['batch_id', 'id'])
+
+
+def downgrade() -> None:
+	op.drop_index('ix_knowledge_docs_batch_id', table_name='knowledge_docs')
+	op.drop_index('ix_questions_batch_id', table_name='questions')
+	op.drop_constraint('fk_questions_batch_id', 'questions', type_='foreignkey')
+	op.drop_column('questions', 'batch_id')
@@ -0,0 +1,23 @@
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251023_0004_knowledge_doc_hash'
+down_revision = '20251022_0003_question_batch'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+	op.add_column('knowledge_docs', sa.Column('kb_id', sa.String(length=100), nullable=True))
+	op.add_column('knowledge_docs', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+	# 同一知识库内内容唯一；历史数据的哈希为 NULL，不受约束
+	op.create_unique_constraint('uq_knowledge_docs_kb_sha256', 'knowledge_docs', ['kb_id', 'content_sha256'])
+	op.create_index('ix_knowledge_docs_kb_title', 'knowledge_docs', ['kb_id', 'title'])
+
+
+def downgrade() -> None:
+	op.drop_index('ix_knowledge_docs_kb_title', table_name='knowledge_docs')
+	op.drop_constraint('uq_knowledge_docs_kb_sha256', 'knowledge_docs', type_='unique')
+	op.drop_column('knowledge_docs', 'content_sha256')
+	op.drop_column('knowledge_docs', 'kb_id')
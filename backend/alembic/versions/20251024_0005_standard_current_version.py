@@ -0,0 +1,48 @@
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251024_0005_standard_current_version'
+down_revision = '20251023_0004_knowledge_doc_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+	op.add_column('standard_answers', sa.Column('current_version_id', sa.Integer(), nullable=True))
+	op.add_column('standard_answers', sa.Column('next_change_at', sa.DateTime(), nullable=True))
+	op.create_foreign_key(
+		'fk_standard_answers_current_version_id', 'standard_answers', 'standard_answer_versions',
+		['current_version_id'], ['id'],
+	)
+	op.create_index('ix_standard_answers_next_change_at', 'standard_answers', ['next_change_at'])
+
+	# 回填：窗口包含当前时间的最高版本为当前版本，最近的未来窗口边界为 next_change_at
+	bind = op.get_bind()
+	rows = bind.execute(sa.text(
+		'SELECT id, standard_answer_id, version, effective_from, effective_to FROM standard_answer_versions'
+	)).mappings().all()
+	now = datetime.utcnow()
+	state: dict = {}
+	for r in rows:
+		current, next_change_at = state.get(r['standard_answer_id'], (None, None))
+		for boundary in (r['effective_from'], r['effective_to']):
+			if boundary is not None and boundary > now and (next_change_at is None or boundary < next_change_at):
+				next_change_at = boundary
+		opened = r['effective_from'] is None or r['effective_from'] <= now
+		not_closed = r['effective_to'] is None or r['effective_to'] > now
+		if opened and not_closed and (current is None or r['version'] > current['version']):
+			current = r
+		state[r['standard_answer_id']] = (current, next_change_at)
+	for sa_id, (current, next_change_at) in state.items():
+		bind.execute(
+			sa.text('UPDATE standard_answers SET current_version_id = :vid, next_change_at = :nca WHERE id = :id'),
+			{'vid': current['id'] if current is not None else None, 'nca': next_change_at, 'id': sa_id},
+		)
+
+def downgrade() -> None:
+	op.drop_index('ix_standard_answers_next_change_at', table_name='standard_answers')
+	op.drop_constraint('fk_standard_answers_current_version_id', 'standard_answers', type_='foreignkey')
+	op.drop_column('standard_answers', 'next_change_at')
+	op.drop_column('standard_answers', 'current_version_id')
@@ -0,0 +1,25 @@
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20251025_0006_review_indexes'
+down_revision = '20251024_0005_standard_current_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+	# 审核队列：按状态筛选 + 键集分页 (created_at, id) 倒序
+	op.create_index('ix_review_tasks_status_created_at', 'review_tasks', ['status', 'created_at', 'id'])
+	op.create_index('ix_review_tasks_created_at', 'review_tasks', ['created_at', 'id'])
+	# 取问题的最新回答；前缀同时覆盖外键 question_id（MySQL 会移除隐式建的外键索引）
+	op.create_index('ix_generated_answers_question_id_created_at', 'generated_answers', ['question_id', 'created_at'])
+	op.create_index('ix_questions_status', 'questions', ['status'])
+
+
+def downgrade() -> None:
+	op.drop_index('ix_questions_status', table_name='questions')
+	# 外键需要索引：先补回单列索引再删除复合索引
+	op.create_index('ix_generated_answers_question_id', 'generated_answers', ['question_id'])
+	op.drop_index('ix_generated_answers_question_id_created_at', table_name='generated_answers')
+	op.drop_index('ix_review_tasks_created_at', table_name='review_tasks')
+	op.drop_index('ix_review_tasks_status_created_at', table_name='review_tasks')
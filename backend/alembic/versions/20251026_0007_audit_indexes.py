@@ -0,0 +1,24 @@
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20251026_0007_audit_indexes'
+down_revision = '20251025_0006_review_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+	# 审计日志：按动作/用户筛选 + 时间范围 + 键集分页 (created_at, id) 倒序
+	op.create_index('ix_audit_logs_action_created_at', 'audit_logs', ['action', 'created_at', 'id'])
+	# 前缀覆盖外键 user_id（MySQL 会移除隐式建的外键索引）
+	op.create_index('ix_audit_logs_user_id_created_at', 'audit_logs', ['user_id', 'created_at', 'id'])
+	# 无筛选翻页与按保留期清理
+	op.create_index('ix_audit_logs_created_at', 'audit_logs', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+	op.drop_index('ix_audit_logs_created_at', table_name='audit_logs')
+	# 外键需要索引：先补回单列索引再删除复合索引
+	op.create_index('ix_audit_logs_user_id', 'audit_logs', ['user_id'])
+	op.drop_index('ix_audit_logs_user_id_created_at', table_name='audit_logs')
+	op.drop_index('ix_audit_logs_action_created_at', table_name='audit_logs')
@@ -0,0 +1,19 @@
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251027_0008_answer_timings'
+down_revision = '20251026_0007_audit_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+	op.add_column('generated_answers', sa.Column('timings', sa.JSON(), nullable=True))
+	# 慢查询分析按时间窗口扫描
+	op.create_index('ix_generated_answers_created_at', 'generated_answers', ['created_at'])
+
+
+def downgrade() -> None:
+	op.drop_index('ix_generated_answers_created_at', table_name='generated_answers')
+	op.drop_column('generated_answers', 'timings')
@@ -0,0 +1,123 @@
+import hashlib
+import json
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251028_0009_evidence_chunks'
+down_revision = '20251027_0008_answer_timings'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+
+def _chunk_hash(text, metadata):
+	# 与 app.services.evidence_store.chunk_hash 保持一致
+	meta = json.dumps(metadata or {}, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+	return hashlib.sha256(f"{text}\x00{meta}".encode("utf-8")).hexdigest()
+
+
+def _load(value):
+	if value is None or isinstance(value, dict):
+		return value
+	return json.loads(value)
+
+
+def upgrade() -> None:
+	chunks = op.create_table(
+		'evidence_chunks',
+		sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+		sa.Column('sha256', sa.String(length=64), nullable=False),
+		sa.Column('text', sa.Text(), nullable=False),
+		sa.Column('meta_data', sa.JSON(), nullable=True),
+		sa.Column('created_at', sa.DateTime(), nullable=True),
+		sa.UniqueConstraint('sha256', name='uq_evidence_chunks_sha256'),
+	)
+
+	# 回填：按 id 分批把内嵌正文的证据改写为块引用
+	bind = op.get_bind()
+	answers = sa.table('generated_answers', sa.column('id', sa.Integer), sa.column('sources_a', sa.JSON), sa.column('sources_b', sa.JSON))
+	last_id = 0
+	while True:
+		rows = bind.execute(
+			sa.select(answers.c.id, answers.c.sources_a, answers.c.sources_b)
+			.where(answers.c.id > last_id).order_by(answers.c.id).limit(BATCH_SIZE)
+		).all()
+		if not rows:
+			break
+		last_id = rows[-1].id
+		parsed = [(r.id, _load(r.sources_a), _load(r.sources_b)) for r in rows]
+		pending = {}
+		for _, *evidences in parsed:
+			for evidence in evidences:
+				for c in (evidence or {}).get('chunks', []):
+					if 'text' in c:
+						pending.setdefault(_chunk_hash(c.get('text') or '', c.get('metadata')), c)
+		ids = {}
+		if pending:
+			existing = bind.execute(sa.select(chunks.c.sha256, chunks.c.id).where(chunks.c.sha256.in_(list(pending)))).all()
+			ids = {sha: cid for sha, cid in existing}
+			missing = [h for h in pending if h not in ids]
+			if missing:
+				now = datetime.utcnow()
+				bind.execute(chunks.insert(), [
+					{'sha256': h, 'text': pending[h].get('text') or '', 'meta_data': pending[h].get('metadata') or {}, 'created_at': now}
+					for h in missing
+				])
+				added = bind.execute(sa.select(chunks.c.sha256, chunks.c.id).where(chunks.c.sha256.in_(missing))).all()
+				ids.update({sha: cid for sha, cid in added})
+
+		def refs(evidence):
+			if not evidence:
+				return evidence
+			out = []
+			for c in evidence.get('chunks', []):
+				if 'text' in c:
+					c = {'chunk_id': ids[_chunk_hash(c.get('text') or '', c.get('metadata'))], 'score': float(c.get('score') or 0.0)}
+				out.append(c)
+			return {'chunks': out}
+
+		for answer_id, evidence_a, evidence_b in parsed:
+			bind.execute(
+				answers.update().where(answers.c.id == answer_id).values(sources_a=refs(evidence_a), sources_b=refs(evidence_b))
+			)
+
+
+def downgrade() -> None:
+	# 把块引用还原为内嵌正文后删除块表
+	bind = op.get_bind()
+	answers = sa.table('generated_answers', sa.column('id', sa.Integer), sa.column('sources_a', sa.JSON), sa.column('sources_b', sa.JSON))
+	chunks = sa.table('evidence_chunks', sa.column('id', sa.Integer), sa.column('text', sa.Text), sa.column('meta_data', sa.JSON))
+	last_id = 0
+	while True:
+		rows = bind.execute(
+			sa.select(answers.c.id, answers.c.sources_a, answers.c.sources_b)
+			.where(answers.c.id > last_id).order_by(answers.c.id).limit(BATCH_SIZE)
+		).all()
+		if not rows:
+			break
+		last_id = rows[-1].id
+		parsed = [(r.id, _load(r.sources_a), _load(r.sources_b)) for r in rows]
+		chunk_ids = {c['chunk_id'] for _, *ev in parsed for e in ev if e for c in e.get('chunks', []) if 'chunk_id' in c and 'text' not in c}
+		by_id = {}
+		if chunk_ids:
+			by_id = {r.id: r for r in bind.execute(sa.select(chunks.c.id, chunks.c.text, chunks.c.meta_data).where(chunks.c.id.in_(chunk_ids))).all()}
+
+		def inline(evidence):
+			if not evidence:
+				return evidence
+			out = []
+			for c in evidence.get('chunks', []):
+				row = by_id.get(c.get('chunk_id')) if 'text' not in c else None
+				if row is not None:
+					c = {'text': row.text, 'score': c.get('score', 0.0), 'metadata': _load(row.meta_data) or {}}
+				out.append(c)
+			return {'chunks': out}
+
+		for answer_id, evidence_a, evidence_b in parsed:
+			bind.execute(
+				answers.update().where(answers.c.id == answer_id).values(sources_a=inline(evidence_a), sources_b=inline(evidence_b))
+			)
+	op.drop_table('evidence_chunks')
@@ -0,0 +1,120 @@
+import json
+from pathlib import Path
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+import zstandard as zstd
+
+from app.core.config import settings
+
+# revision identifiers, used by Alembic.
+revision = '20251029_0010_compressed_columns'
+down_revision = '20251028_0009_evidence_chunks'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+# 与 app.db.types 的存储格式保持一致：zstd 帧 / 0x00 + 原文 / 无前缀的旧 UTF-8 原文
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+RAW_PREFIX = b"\x00"
+
+# (表, 列, 原类型, 原是否可空, 是否 JSON)
+COLUMNS = [
+	('generated_answers', 'initial_answer', sa.Text(), False, False),
+	('generated_answers', 'aligned_answer', sa.Text(), True, False),
+	('generated_answers', 'sources_a', sa.JSON(), True, True),
+	('generated_answers', 'sources_b', sa.JSON(), True, True),
+	('evidence_chunks', 'text', sa.Text(), False, False),
+]
+
+BLOB = sa.LargeBinary().with_variant(mysql.LONGBLOB(), 'mysql')
+
+
+def _raw_bytes(value):
+	if isinstance(value, str):
+		return value.encode('utf-8')
+	return bytes(value)
+
+
+def _is_encoded(value):
+	return value.startswith(ZSTD_MAGIC) or value.startswith(RAW_PREFIX)
+
+
+def _encode(data, compressor):
+	if len(data) >= settings.column_compression_min_bytes:
+		packed = compressor.compress(data)
+		if len(packed) < len(data):
+			return packed
+	return RAW_PREFIX + data
+
+
+def _decode(value, dicts):
+	if value.startswith(ZSTD_MAGIC):
+		dict_id = zstd.get_frame_parameters(value).dict_id
+		return zstd.ZstdDecompressor(dict_data=dicts[dict_id] if dict_id else None).decompress(value)
+	if value.startswith(RAW_PREFIX):
+		return value[1:]
+	return value
+
+
+def _batches(bind, table, column):
+	"""按 id 分批遍历非空值"""
+	last_id = 0
+	while True:
+		rows = bind.execute(
+			sa.select(table.c.id, column).where(table.c.id > last_id, column.is_not(None)).order_by(table.c.id).limit(BATCH_SIZE)
+		).all()
+		if not rows:
+			break
+		last_id = rows[-1][0]
+		yield rows
+
+
+def upgrade() -> None:
+	bind = op.get_bind()
+	# 迁移统一不用字典压缩（字典需先用现有数据训练）；写入路径配置字典后新数据使用字典
+	compressor = zstd.ZstdCompressor(level=settings.column_compression_level)
+	for table_name, name, old_type, nullable, _ in COLUMNS:
+		# 原地改为 BLOB：MySQL 保留原文的 UTF-8 字节，读取端可识别未压缩的旧值，转换期间服务不受影响
+		with op.batch_alter_table(table_name) as batch:
+			batch.alter_column(name, type_=BLOB, existing_type=old_type, existing_nullable=nullable)
+		table = sa.table(table_name, sa.column('id', sa.Integer), sa.column(name, sa.LargeBinary))
+		column = table.c[name]
+		for rows in _batches(bind, table, column):
+			updates = []
+			for row_id, value in rows:
+				data = _raw_bytes(value)
+				if not _is_encoded(data):
+					updates.append({'_id': row_id, '_value': _encode(data, compressor)})
+			if updates:
+				bind.execute(
+					table.update().where(table.c.id == sa.bindparam('_id')).values({name: sa.bindparam('_value', type_=sa.LargeBinary)}),
+					updates,
+				)
+
+
+def downgrade() -> None:
+	bind = op.get_bind()
+	dicts = {}
+	if settings.column_compression_dict_dir:
+		for path in Path(settings.column_compression_dict_dir).glob('*.zdict'):
+			d = zstd.ZstdCompressionDict(path.read_bytes())
+			dicts[d.dict_id()] = d
+	for table_name, name, old_type, nullable, is_json in COLUMNS:
+		# BLOB 不能直接转回 JSON：写入临时列后替换
+		tmp = f'{name}_raw'
+		op.add_column(table_name, sa.Column(tmp, old_type, nullable=True))
+		table = sa.table(table_name, sa.column('id', sa.Integer), sa.column(name, sa.LargeBinary), sa.column(tmp, old_type))
+		for rows in _batches(bind, table, table.c[name]):
+			updates = []
+			for row_id, value in rows:
+				text = _decode(_raw_bytes(value), dicts).decode('utf-8')
+				updates.append({'_id': row_id, '_value': json.loads(text) if is_json else text})
+			bind.execute(
+				table.update().where(table.c.id == sa.bindparam('_id')).values({tmp: sa.bindparam('_value', type_=old_type)}),
+				updates,
+			)
+		with op.batch_alter_table(table_name) as batch:
+			batch.drop_column(name)
+			batch.alter_column(tmp, new_column_name=name, existing_type=old_type, existing_nullable=True, nullable=nullable)
@@ -0,0 +1,69 @@
+import hashlib
+from pathlib import Path
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+# revision identifiers, used by Alembic.
+revision = '20251030_0011_knowledge_doc_backfill'
+down_revision = '20251029_0010_compressed_columns'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+
+def _file_sha256(source_path):
+	# 只能回填仍在本地磁盘上的源文件；压缩包条目（"xxx.zip!/entry"）与已删除的临时文件跳过
+	if not source_path or '!/' in source_path:
+		return None
+	path = Path(source_path)
+	if not path.is_file():
+		return None
+	digest = hashlib.sha256()
+	with path.open('rb') as f:
+		for block in iter(lambda: f.read(1024 * 1024), b''):
+			digest.update(block)
+	return digest.hexdigest()
+
+
+def upgrade() -> None:
+	op.add_column('knowledge_docs', sa.Column('ragflow_doc_id', sa.String(length=64), nullable=True))
+
+	# 回填 0004 之前导入的行：kb_id 取自 KNOWLEDGE_BACKFILL_KB_ID，content_sha256 读取本地源文件计算。
+	# 未能回填的行在首次重新导入时会被视为新文档再上传一次。
+	bind = op.get_bind()
+	docs = sa.table(
+		'knowledge_docs',
+		sa.column('id', sa.Integer), sa.column('kb_id', sa.String), sa.column('content_sha256', sa.String), sa.column('source_path', sa.String),
+	)
+	if settings.knowledge_backfill_kb_id:
+		bind.execute(docs.update().where(docs.c.kb_id.is_(None)).values(kb_id=settings.knowledge_backfill_kb_id))
+
+	seen = {
+		(kb, sha) for kb, sha in bind.execute(
+			sa.select(docs.c.kb_id, docs.c.content_sha256).where(docs.c.content_sha256.is_not(None))
+		).all()
+	}
+	last_id = 0
+	while True:
+		rows = bind.execute(
+			sa.select(docs.c.id, docs.c.kb_id, docs.c.source_path)
+			.where(docs.c.id > last_id, docs.c.content_sha256.is_(None))
+			.order_by(docs.c.id).limit(BATCH_SIZE)
+		).all()
+		if not rows:
+			break
+		last_id = rows[-1].id
+		for row in rows:
+			sha = _file_sha256(row.source_path)
+			# 同一知识库内的重复内容只回填第一行，避免违反 uq_knowledge_docs_kb_sha256
+			if sha is None or (row.kb_id, sha) in seen:
+				continue
+			seen.add((row.kb_id, sha))
+			bind.execute(docs.update().where(docs.c.id == row.id).values(content_sha256=sha))
+
+
+def downgrade() -> None:
+	op.drop_column('knowledge_docs', 'ragflow_doc_id')
@@ -0,0 +1,49 @@
+from pathlib import PurePosixPath
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20251031_0012_knowledge_doc_source_key'
+down_revision = '20251030_0011_knowledge_doc_backfill'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+
+def _source_key(source_path):
+	# 与 app.services.ingest._source_key 相同：压缩包条目取包内路径，其余取规范化后的磁盘路径
+	if not source_path:
+		return None
+	path = source_path.replace('\\', '/')
+	if '!/' in path:
+		path = path.split('!/', 1)[1]
+	key = str(PurePosixPath(path.lstrip('/')))
+	return key if key not in ('', '.') else None
+
+
+def upgrade() -> None:
+	op.add_column('knowledge_docs', sa.Column('source_key', sa.String(length=500), nullable=True))
+	op.create_index('ix_knowledge_docs_kb_source_key', 'knowledge_docs', ['kb_id', 'source_key'])
+
+	bind = op.get_bind()
+	docs = sa.table('knowledge_docs', sa.column('id', sa.Integer), sa.column('source_path', sa.String), sa.column('source_key', sa.String))
+	last_id = 0
+	while True:
+		rows = bind.execute(
+			sa.select(docs.c.id, docs.c.source_path)
+			.where(docs.c.id > last_id, docs.c.source_path.is_not(None))
+			.order_by(docs.c.id).limit(BATCH_SIZE)
+		).all()
+		if not rows:
+			break
+		last_id = rows[-1].id
+		for row in rows:
+			key = _source_key(row.source_path)
+			if key:
+				bind.execute(docs.update().where(docs.c.id == row.id).values(source_key=key))
+
+
+def downgrade() -> None:
+	op.drop_index('ix_knowledge_docs_kb_source_key', table_name='knowledge_docs')
+	op.drop_column('knowledge_docs', 'source_key')
@@ -0,0 +1,32 @@
+from typing import Optional, Tuple
+from datetime import datetime
+import base64
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+
+def encode_cursor(created_at: Optional[datetime], row_id: int) -> str:
+	"""不透明游标：(created_at, id)，按 created_at DESC, id DESC 翻页"""
+	raw = f"{created_at.isoformat() if created_at else ''}|{row_id}"
+	return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+	try:
+		raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+		ts, row_id = raw.rsplit("|", 1)
+		return (datetime.fromisoformat(ts) if ts else None), int(row_id)
+	except Exception:
+		raise HTTPException(status_code=400, detail="invalid cursor")
+
+
+def keyset_before(created_col, id_col, cursor: str) -> ColumnElement:
+	"""游标之后（更旧）的行；展开为 OR 形式，使 (…, created_at, id) 复合索引可做范围扫描"""
+	created_at, row_id = decode_cursor(cursor)
+	if created_at is None:
+		return and_(created_col.is_(None), id_col < row_id)
+	return or_(
+		created_col < created_at,
+		and_(created_col == created_at, id_col < row_id),
+	)
@@ -1,9 +1,11 @@
 from typing import List, Optional
+from datetime import datetime
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.pagination import encode_cursor, keyset_before
 from app.db.session import get_db_session
 from app.models.models import AuditLog, User
 
@@ -18,18 +20,60 @@ class AuditItem(BaseModel):
 	created_at: str
 
 
-@router.get("", response_model=List[AuditItem])
-async def list_audit(db: AsyncSession = Depends(get_db_session), limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0)) -> List[AuditItem]:
-	res = await db.execute(select(AuditLog).order_by(AuditLog.id.desc()).offset(offset).limit(limit))
-	items: List[AuditItem] = []
-	for l in res.scalars().all():
-		user_email = None
-		# optional join: load user lazily
-		items.append(AuditItem(
+class AuditListResponse(BaseModel):
+	items: List[AuditItem]
+	next_cursor: Optional[str] = None  # 传回 cursor 获取下一页；为空表示已到末页
+
+
+@router.get("", response_model=AuditListResponse)
+async def list_audit(
+	db: AsyncSession = Depends(get_db_session),
+	limit: int = Query(50, ge=1, le=200),
+	cursor: Optional[str] = Query(None),
+	action: Optional[str] = Query(None),
+	user_id: Optional[int] = Query(None),
+	user_email: Optional[str] = Query(None),
+	since: Optional[datetime] = Query(None),
+	until: Optional[datetime] = Query(None),
+) -> AuditListResponse:
+	# 键集分页：按 (created_at, id) 倒序，筛选命中 (action|user_id, created_at, id) 索引
+	stmt = select(AuditLog)
+	if user_email:
+		res_u = await db.execute(select(User.id).where(User.email == user_email))
+		resolved = res_u.scalar_one_or_none()
+		if resolved is None or (user_id is not None and user_id != resolved):
+			return AuditListResponse(items=[])
+		user_id = resolved
+	if user_id is not None:
+		stmt = stmt.where(AuditLog.user_id == user_id)
+	if action:
+		stmt = stmt.where(AuditLog.action == action)
+	if since:
+		stmt = stmt.where(AuditLog.created_at >= since)
+	if until:
+		stmt = stmt.where(AuditLog.created_at < until)
+	if cursor:
+		stmt = stmt.where(keyset_before(AuditLog.created_at, AuditLog.id, cursor))
+	res = await db.execute(stmt.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit + 1))
+	logs = res.scalars().all()
+	next_cursor = encode_cursor(logs[limit - 1].created_at, logs[limit - 1].id) if len(logs) > limit else None
+	logs = logs[:limit]
+
+	# 每页一次批量查询解析用户邮箱
+	user_ids = {l.user_id for l in logs if l.user_id is not None}
+	emails: dict = {}
+	if user_ids:
+		res_users = await db.execute(select(User.id, User.email).where(User.id.in_(user_ids)))
+		emails = {uid: email for uid, email in res_users.all()}
+
+	items = [
+		AuditItem(
 			id=l.id,
-			user_email=user_email,
+			user_email=emails.get(l.user_id),
 			action=l.action,
 			details=l.details,
 			created_at=l.created_at.isoformat() if l.created_at else ""
-		))
-	return items
+		)
+		for l in logs
+	]
+	return AuditListResponse(items=items, next_cursor=next_cursor)
@@ -1,6 +1,9 @@
+from typing import Any, Dict, Tuple
 from pathlib import Path
 import asyncio
+import hashlib
 from uuid import uuid4
+import aiofiles
 from fastapi import APIRouter, UploadFile, File, Depends, Query, HTTPException
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,6 +11,7 @@ from sqlalchemy import select
 import pandas as pd
 
 from app.core.config import settings
+from app.core.telemetry import spawn_background
 from app.db.session import get_db_session
 from app.models.models import ImportBatch
 from app.services.batch_processor import process_questions_file
@@ -42,14 +46,37 @@ async def list_batches(db: AsyncSession = Depends(get_db_session)) -> list[Impor
 	return items
 
 
-async def _save_upload(prefix: str, file: UploadFile) -> str:
+def _too_large() -> HTTPException:
+	return HTTPException(status_code=413, detail=f"文件超过大小上限 {settings.upload_max_bytes} 字节")
+
+
+async def _save_upload(prefix: str, file: UploadFile) -> Tuple[str, Dict[str, Any]]:
+	"""按固定块流式落盘（不在内存中缓存整个文件），同时计算 SHA-256 与字节数。"""
+	max_bytes = settings.upload_max_bytes
+	if max_bytes and file.size is not None and file.size > max_bytes:
+		raise _too_large()
 	storage_dir = Path(settings.storage_base_dir) / "uploads" / prefix
-	storage_dir.mkdir(parents=True, exist_ok=True)
-	file_id = f"{uuid4().hex}_{file.filename}"
-	path = storage_dir / file_id
-	content = await file.read()
-	path.write_bytes(content)
-	return str(path)
+	await asyncio.to_thread(storage_dir.mkdir, parents=True, exist_ok=True)
+	filename = Path(file.filename or "upload").name
+	path = storage_dir / f"{uuid4().hex}_{filename}"
+	digest = hashlib.sha256()
+	size = 0
+	try:
+		async with aiofiles.open(path, "wb") as out:
+			while True:
+				chunk = await file.read(settings.upload_chunk_size)
+				if not chunk:
+					break
+				size += len(chunk)
+				if max_bytes and size > max_bytes:
+					raise _too_large()
+				# hashlib 对大块数据会释放 GIL，放到线程中计算
+				await asyncio.to_thread(digest.update, chunk)
+				await out.write(chunk)
+	except BaseException:
+		await asyncio.to_thread(path.unlink, missing_ok=True)
+		raise
+	return str(path), {"filename": filename, "size": size, "sha256": digest.hexdigest()}
 
 
 def _validate_headers(file_path: str, required: list[str]) -> None:
@@ -70,15 +97,17 @@ def _validate_headers(file_path: str, required: list[str]) -> None:
 async def import_knowledge_a(
 	file: UploadFile = File(...),
 	kb_a_id: str = Query(...),
+	upload_concurrency: int | None = Query(None, ge=1, le=32, description="并发上传 RAGFlow 的 worker 数"),
 	db: AsyncSession = Depends(get_db_session),
 ) -> ImportResponse:
-	path = await _save_upload("knowledge_a", file)
+	path, upload = await _save_upload("knowledge_a", file)
 	_validate_headers(path, required=["title", "category", "source_path", "source_url", "disclosure_date"])  # allow empty values
-	batch = ImportBatch(type="knowledge_a", file_path=path)
+	concurrency = upload_concurrency or settings.ingest_upload_concurrency
+	batch = ImportBatch(type="knowledge_a", file_path=path, meta_data={"upload": upload, "upload_concurrency": concurrency})
 	db.add(batch)
 	await db.commit()
 	await db.refresh(batch)
-	asyncio.create_task(process_knowledge_a_file(file_path=path, kb_a_id=kb_a_id, batch_id=batch.id))
+	spawn_background(process_knowledge_a_file(file_path=path, kb_a_id=kb_a_id, batch_id=batch.id, upload_concurrency=concurrency), kind="import")
 	return ImportResponse(ok=True, batch_id=batch.id, message="processing started")
 
 
@@ -87,19 +116,25 @@ async def import_knowledge_a_hybrid(
 	csv_file: UploadFile = File(...),
 	zip_file: UploadFile = File(...),
 	kb_a_id: str = Query(...),
+	upload_concurrency: int | None = Query(None, ge=1, le=32, description="并发上传 RAGFlow 的 worker 数"),
 	db: AsyncSession = Depends(get_db_session),
 ) -> ImportResponse:
 	"""混合模式：CSV提供元数据，ZIP包含PDF/DOCX文件，通过filename列匹配"""
-	csv_path = await _save_upload("knowledge_a", csv_file)
-	zip_path = await _save_upload("knowledge_a", zip_file)
+	csv_path, csv_upload = await _save_upload("knowledge_a", csv_file)
+	zip_path, zip_upload = await _save_upload("knowledge_a", zip_file)
 	_validate_headers(csv_path, required=["title", "category", "filename"])  # filename用于匹配ZIP内文件
-	batch = ImportBatch(type="knowledge_a_hybrid", file_path=csv_path, metadata={"zip_path": zip_path})
+	concurrency = upload_concurrency or settings.ingest_upload_concurrency
+	batch = ImportBatch(
+		type="knowledge_a_hybrid",
+		file_path=csv_path,
+		meta_data={"zip_path": zip_path, "upload": csv_upload, "zip_upload": zip_upload, "upload_concurrency": concurrency},
+	)
 	db.add(batch)
 	await db.commit()
 	await db.refresh(batch)
 	# 导入ingest的混合处理函数
 	from app.services.ingest import process_knowledge_a_hybrid
-	asyncio.create_task(process_knowledge_a_hybrid(csv_path=csv_path, zip_path=zip_path, kb_a_id=kb_a_id, batch_id=batch.id))
+	spawn_background(process_knowledge_a_hybrid(csv_path=csv_path, zip_path=zip_path, kb_a_id=kb_a_id, batch_id=batch.id, upload_concurrency=concurrency), kind="import")
 	return ImportResponse(ok=True, batch_id=batch.id, message="processing started (hybrid mode)")
 
 
@@ -108,28 +143,30 @@ async def import_knowledge_a_zip(
 	zip_file: UploadFile = File(...),
 	kb_a_id: str = Query(...),
 	default_category: str = Query("announcement"),
+	upload_concurrency: int | None = Query(None, ge=1, le=32, description="并发上传 RAGFlow 的 worker 数"),
 	db: AsyncSession = Depends(get_db_session),
 ) -> ImportResponse:
 	"""纯ZIP模式：自动从文件名提取标题，批量上传PDF/DOCX到RAGFlow A"""
-	zip_path = await _save_upload("knowledge_a", zip_file)
-	batch = ImportBatch(type="knowledge_a_zip", file_path=zip_path, metadata={"default_category": default_category})
+	zip_path, upload = await _save_upload("knowledge_a", zip_file)
+	concurrency = upload_concurrency or settings.ingest_upload_concurrency
+	batch = ImportBatch(type="knowledge_a_zip", file_path=zip_path, meta_data={"default_category": default_category, "upload": upload, "upload_concurrency": concurrency})
 	db.add(batch)
 	await db.commit()
 	await db.refresh(batch)
 	from app.services.ingest import process_knowledge_a_zip
-	asyncio.create_task(process_knowledge_a_zip(zip_path=zip_path, kb_a_id=kb_a_id, default_category=default_category, batch_id=batch.id))
+	spawn_background(process_knowledge_a_zip(zip_path=zip_path, kb_a_id=kb_a_id, default_category=default_category, batch_id=batch.id, upload_concurrency=concurrency), kind="import")
 	return ImportResponse(ok=True, batch_id=batch.id, message="processing started (zip-only mode)")
 
 
 @router.post("/standards-b")
 async def import_standards_b(file: UploadFile = File(...), db: AsyncSession = Depends(get_db_session)) -> ImportResponse:
-	path = await _save_upload("standards_b", file)
+	path, upload = await _save_upload("standards_b", file)
 	_validate_headers(path, required=["topic_key", "content"])  # optional: strong_constraint, effective_from, effective_to, description
-	batch = ImportBatch(type="standards_b", file_path=path)
+	batch = ImportBatch(type="standards_b", file_path=path, meta_data={"upload": upload})
 	db.add(batch)
 	await db.commit()
 	await db.refresh(batch)
-	asyncio.create_task(process_standards_b_file(file_path=path, batch_id=batch.id))
+	spawn_background(process_standards_b_file(file_path=path, batch_id=batch.id), kind="import")
 	return ImportResponse(ok=True, batch_id=batch.id, message="processing started")
 
 
@@ -142,11 +179,11 @@ async def import_questions(
 	prompt: str = Query(""),
 	db: AsyncSession = Depends(get_db_session),
 ) -> ImportResponse:
-	path = await _save_upload("questions", file)
+	path, upload = await _save_upload("questions", file)
 	_validate_headers(path, required=["question"])
-	batch = ImportBatch(type="questions", file_path=path)
+	batch = ImportBatch(type="questions", file_path=path, meta_data={"upload": upload})
 	db.add(batch)
 	await db.commit()
 	await db.refresh(batch)
-	asyncio.create_task(process_questions_file(file_path=path, kb_a_id=kb_a_id, kb_b_id=kb_b_id, prompt=prompt, generate=generate))
+	spawn_background(process_questions_file(file_path=path, kb_a_id=kb_a_id, kb_b_id=kb_b_id, prompt=prompt, generate=generate, batch_id=batch.id), kind="import")
 	return ImportResponse(ok=True, batch_id=batch.id, message="processing started")
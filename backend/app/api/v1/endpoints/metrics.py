@@ -1,24 +1,83 @@
-from typing import Dict, Any
-from fastapi import APIRouter, Depends
-from sqlalchemy import select, func
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, Query, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+import numpy as np
 
+from app.clients.priority import priority_gates
+from app.clients.retrieval_cache import retrieval_cache
 from app.db.session import get_db_session
-from app.models.models import Question, GeneratedAnswer, ReviewTask, StandardAnswerVersion, KnowledgeDoc
+from app.models.models import GeneratedAnswer
+from app.models.enums import ReviewStatus
+from app.services.counters import counters
+from app.services.rag_pipeline import StageTimings, answer_flight
 
 router = APIRouter(prefix="/metrics", tags=["metrics"]) 
 
 
 @router.get("")
-async def get_metrics(db: AsyncSession = Depends(get_db_session)) -> Dict[str, Any]:
-	counts = {}
-	for model, key in [
-		(Question, "questions"),
-		(GeneratedAnswer, "generated_answers"),
-		(ReviewTask, "review_tasks"),
-		(StandardAnswerVersion, "standard_answer_versions"),
-		(KnowledgeDoc, "knowledge_docs"),
-	]:
-		res = await db.execute(select(func.count()).select_from(model))
-		counts[key] = int(res.scalar_one())
+async def get_metrics() -> Dict[str, Any]:
+	# 读取内存中的计数器快照（增量维护 + 周期校准），不再逐表 COUNT(*)
+	await counters.ensure_loaded()
+	snap = counters.snapshot()
+	totals = snap["totals"]
+	reviews = snap["by_status"]["review_tasks"]
+	approved = reviews.get(ReviewStatus.APPROVED.value, 0)
+	reviewed = approved + reviews.get(ReviewStatus.REJECTED.value, 0) + reviews.get(ReviewStatus.NEEDS_REVISION.value, 0)
+	counts: Dict[str, Any] = {
+		"questions": totals["questions"],
+		"generated_answers": totals["generated_answers"],
+		"review_tasks": totals["review_tasks"],
+		"standard_answer_versions": totals["standard_answer_versions"],
+		"knowledge_docs": totals["knowledge_docs"],
+		# 看板使用的汇总指标
+		"total_questions": totals["questions"],
+		"reviewed_count": reviewed,
+		"approval_rate": (approved / reviewed * 100.0) if reviewed else 0.0,
+		"standard_answers_count": totals["standard_answers"],
+		"review_status_distribution": reviews,
+		"knowledge_docs_count": totals["knowledge_docs"],
+		"prompt_templates_count": totals["prompt_templates"],
+		"by_status": snap["by_status"],
+		"counters_reconciled_at": snap["reconciled_at"],
+	}
+	counts["retrieval_cache"] = retrieval_cache.stats()
+	counts["qa_single_flight"] = answer_flight.stats()
+	counts["priority_gates"] = priority_gates.stats()
 	return counts
+
+
+@router.get("/prometheus")
+async def get_prometheus_metrics() -> Response:
+	"""Prometheus 文本格式抓取端点（延迟直方图、重试计数、后台任务数）"""
+	return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/stages")
+async def get_stage_percentiles(
+	db: AsyncSession = Depends(get_db_session),
+	since: Optional[datetime] = Query(None),
+	until: Optional[datetime] = Query(None),
+	limit: int = Query(50000, ge=1, le=200000),
+) -> Dict[str, Any]:
+	"""慢查询分析：时间窗口内（默认最近 24 小时）各阶段耗时的 p50/p95/p99（ms）"""
+	until = until or datetime.utcnow()
+	since = since or until - timedelta(hours=24)
+	res = await db.execute(
+		select(GeneratedAnswer.timings)
+		.where(GeneratedAnswer.created_at >= since, GeneratedAnswer.created_at < until, GeneratedAnswer.timings.is_not(None))
+		.order_by(GeneratedAnswer.created_at.desc())
+		.limit(limit)
+	)
+	# 合并调用复用了另一次执行的耗时，不重复计入
+	rows = [t for t in res.scalars().all() if t and not t.get("coalesced")]
+	stages: Dict[str, Any] = {}
+	for name in [f"{s}_ms" for s in StageTimings.STAGES] + ["total_ms", "context_tokens", "prompt_tokens", "completion_tokens"]:
+		values: List[float] = [float(t[name]) for t in rows if t.get(name) is not None]
+		if not values:
+			continue
+		p50, p95, p99 = np.percentile(np.asarray(values), [50, 95, 99]).tolist()
+		stages[name] = {"count": len(values), "p50": round(p50, 2), "p95": round(p95, 2), "p99": round(p99, 2)}
+	return {"since": since.isoformat(), "until": until.isoformat(), "samples": len(rows), "stages": stages}
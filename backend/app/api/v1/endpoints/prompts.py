@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db_session
 from app.models.models import PromptTemplate
 from app.api.deps import get_current_user, write_audit
+from app.services.counters import counters
 
 router = APIRouter(prefix="/prompts", tags=["prompts"])
 
@@ -39,6 +40,7 @@ async def create_prompt(body: PromptIn, db: AsyncSession = Depends(get_db_sessio
 	db.add(pt)
 	await db.commit()
 	await db.refresh(pt)
+	counters.incr("prompt_templates")
 	await write_audit(db, user, action="prompt.create", details={"id": pt.id, "name": pt.name})
 	return PromptOut(id=pt.id, name=pt.name, version=pt.version, content=pt.content, is_active=pt.is_active)
 
@@ -52,6 +54,7 @@ async def new_prompt_version(name: str, body: PromptIn, db: AsyncSession = Depen
 	db.add(pt)
 	await db.commit()
 	await db.refresh(pt)
+	counters.incr("prompt_templates")
 	await write_audit(db, user, action="prompt.new_version", details={"id": pt.id, "name": pt.name, "version": pt.version})
 	return PromptOut(id=pt.id, name=pt.name, version=pt.version, content=pt.content, is_active=pt.is_active)
 
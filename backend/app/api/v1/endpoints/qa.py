@@ -1,6 +1,11 @@
+from typing import Any, AsyncIterator, Dict, Optional
 from fastapi import APIRouter, Depends
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from loguru import logger
+import orjson
 
+from app.clients.priority import Lane, priority_lane
 from app.services.rag_pipeline import RAGPipeline
 
 
@@ -9,8 +14,9 @@ class QARequest(BaseModel):
 	prompt: str = ""
 	kb_a_id: str
 	kb_b_id: str
-	top_k_a: int = 5
-	top_k_b: int = 5
+	top_k_a: int = Field(5, ge=1)
+	top_k_b: int = Field(5, ge=1)
+	debug: bool = False  # 为 True 时在响应中返回分阶段耗时
 
 
 class QAResponse(BaseModel):
@@ -19,6 +25,7 @@ class QAResponse(BaseModel):
 	evidence_a: dict
 	evidence_b: dict
 	alignment: dict
+	timings: Optional[dict] = None
 
 
 router = APIRouter(prefix="/qa", tags=["qa"])
@@ -27,12 +34,48 @@ router = APIRouter(prefix="/qa", tags=["qa"])
 @router.post("/answer", response_model=QAResponse)
 async def answer(req: QARequest) -> QAResponse:
 	pipeline = RAGPipeline()
-	result = await pipeline.answer(
-		question=req.question,
-		prompt=req.prompt,
-		kb_a_id=req.kb_a_id,
-		kb_b_id=req.kb_b_id,
-		top_k_a=req.top_k_a,
-		top_k_b=req.top_k_b,
-	)
+	with priority_lane(Lane.INTERACTIVE):
+		result = await pipeline.answer(
+			question=req.question,
+			prompt=req.prompt,
+			kb_a_id=req.kb_a_id,
+			kb_b_id=req.kb_b_id,
+			top_k_a=req.top_k_a,
+			top_k_b=req.top_k_b,
+		)
+	if not req.debug:
+		result.pop("timings", None)
 	return QAResponse(**result)
+
+
+def _sse(event: str, data: Dict[str, Any]) -> bytes:
+	return f"event: {event}\ndata: ".encode("utf-8") + orjson.dumps(data) + b"\n\n"
+
+
+@router.post("/answer/stream")
+async def answer_stream(req: QARequest) -> StreamingResponse:
+	"""Server-Sent Events：检索完成即推送 evidence，随后推送 token，最后推送 alignment 与 done。"""
+	pipeline = RAGPipeline()
+
+	# 未标注通道的调用默认按交互处理
+	async def events() -> AsyncIterator[bytes]:
+		try:
+			async for event, data in pipeline.answer_stream(
+				question=req.question,
+				prompt=req.prompt,
+				kb_a_id=req.kb_a_id,
+				kb_b_id=req.kb_b_id,
+				top_k_a=req.top_k_a,
+				top_k_b=req.top_k_b,
+			):
+				yield _sse(event, data)
+		except Exception as e:
+			logger.exception(f"streaming answer failed: {e}")
+			yield _sse("error", {"message": str(e)})
+		yield _sse("done", {})
+
+	return StreamingResponse(
+		events(),
+		media_type="text/event-stream",
+		headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+	)
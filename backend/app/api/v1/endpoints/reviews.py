@@ -1,13 +1,18 @@
 from typing import List, Optional, Any
-from fastapi import APIRouter, Depends, Query
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+import ast
 import json
 
+from app.api.pagination import encode_cursor, keyset_before
 from app.db.session import get_db_session
 from app.models.models import ReviewTask, GeneratedAnswer, Question
 from app.models.enums import ReviewStatus
+from app.services.counters import counters
+from app.services.evidence_store import hydrate_evidence
 
 router = APIRouter(prefix="/reviews", tags=["reviews"])
 
@@ -21,12 +26,15 @@ class ReviewTaskItem(BaseModel):
 
 class ReviewTaskListResponse(BaseModel):
 	tasks: List[ReviewTaskItem]
+	next_cursor: Optional[str] = None  # 传回 cursor 获取下一页；为空表示已到末页
 
 
 class ReviewDetail(BaseModel):
 	id: int
 	question_id: int
+	question: Optional[str] = None
 	status: str
+	comments: Optional[str] = None
 	initial_answer: Optional[str]
 	aligned_answer: Optional[str]
 	alignment: Any
@@ -44,11 +52,21 @@ class ReviewActionResponse(BaseModel):
 
 
 @router.get("", response_model=ReviewTaskListResponse)
-async def list_reviews(db: AsyncSession = Depends(get_db_session), status: Optional[str] = Query(None)) -> ReviewTaskListResponse:
-	stmt = select(ReviewTask)
+async def list_reviews(
+	db: AsyncSession = Depends(get_db_session),
+	status: Optional[str] = Query(None),
+	limit: int = Query(50, ge=1, le=200),
+	cursor: Optional[str] = Query(None),
+) -> ReviewTaskListResponse:
+	# 键集分页：按 (created_at, id) 倒序，命中 (status, created_at, id) / (created_at, id) 索引
+	stmt = select(ReviewTask.id, ReviewTask.question_id, ReviewTask.status, ReviewTask.created_at)
 	if status:
 		stmt = stmt.where(ReviewTask.status == status)
-	res = await db.execute(stmt.order_by(ReviewTask.created_at.desc()))
+	if cursor:
+		stmt = stmt.where(keyset_before(ReviewTask.created_at, ReviewTask.id, cursor))
+	res = await db.execute(stmt.order_by(ReviewTask.created_at.desc(), ReviewTask.id.desc()).limit(limit + 1))
+	rows = res.all()
+	next_cursor = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
 	tasks = [
 		ReviewTaskItem(
 			id=t.id,
@@ -56,31 +74,89 @@ async def list_reviews(db: AsyncSession = Depends(get_db_session), status: Optio
 			status=t.status,
 			created_at=t.created_at.isoformat() if t.created_at else "",
 		)
-		for t in res.scalars().all()
+		for t in rows[:limit]
 	]
-	return ReviewTaskListResponse(tasks=tasks)
+	return ReviewTaskListResponse(tasks=tasks, next_cursor=next_cursor)
 
 
-@router.get("/{task_id}", response_model=ReviewDetail)
-async def get_review(task_id: int, db: AsyncSession = Depends(get_db_session)) -> ReviewDetail:
-	res = await db.execute(select(ReviewTask).where(ReviewTask.id == task_id))
-	task = res.scalar_one()
-	res2 = await db.execute(select(GeneratedAnswer).where(GeneratedAnswer.id == task.generated_answer_id))
-	ga = res2.scalar_one()
-	alignment: Any
+def _parse_alignment(raw: Optional[str]) -> Any:
+	if not raw:
+		return {}
+	try:
+		return json.loads(raw)
+	except ValueError:
+		pass
+	# 早期数据以 str(dict) 形式保存
 	try:
-		alignment = json.loads(ga.alignment_summary or "{}")
-	except Exception:
-		alignment = {"raw": ga.alignment_summary}
+		return ast.literal_eval(raw)
+	except (ValueError, SyntaxError):
+		return {"raw": raw}
+
+
+def _etag(task_id: int, updated_at: Optional[datetime], status: str, include_evidence: bool) -> str:
+	# 回答生成后不再修改，详情只随审核任务流转变化；DATETIME 精度为秒，附带 status 区分同一秒内的流转
+	stamp = updated_at.isoformat() if updated_at else ""
+	return f'W/"{task_id}-{stamp}-{status}-{int(include_evidence)}"'
+
+
+@router.get("/{task_id}", response_model=ReviewDetail)
+async def get_review(
+	task_id: int,
+	response: Response,
+	include_evidence: bool = Query(False),
+	if_none_match: Optional[str] = Header(None),
+	db: AsyncSession = Depends(get_db_session),
+) -> Any:
+	if if_none_match:
+		# 条件请求：先按主键只取 updated_at，命中则 304，不加载回答正文
+		res_v = await db.execute(select(ReviewTask.updated_at, ReviewTask.status).where(ReviewTask.id == task_id))
+		row = res_v.one_or_none()
+		if row is None:
+			raise HTTPException(status_code=404, detail="review task not found")
+		etag = _etag(task_id, row.updated_at, row.status, include_evidence)
+		if etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*":
+			return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+	# 单次 JOIN 查询；证据 JSON 体积大，仅在 include_evidence 时读取
+	columns = [
+		ReviewTask.id,
+		ReviewTask.question_id,
+		ReviewTask.status,
+		ReviewTask.comments,
+		ReviewTask.updated_at,
+		Question.asked_text,
+		GeneratedAnswer.initial_answer,
+		GeneratedAnswer.aligned_answer,
+		GeneratedAnswer.alignment_summary,
+	]
+	if include_evidence:
+		columns += [GeneratedAnswer.sources_a, GeneratedAnswer.sources_b]
+	res = await db.execute(
+		select(*columns)
+		.join(GeneratedAnswer, GeneratedAnswer.id == ReviewTask.generated_answer_id)
+		.join(Question, Question.id == ReviewTask.question_id)
+		.where(ReviewTask.id == task_id)
+	)
+	row = res.one_or_none()
+	if row is None:
+		raise HTTPException(status_code=404, detail="review task not found")
+	evidence_a = evidence_b = None
+	if include_evidence:
+		# 两条证据的块引用合并为一次批量查询还原
+		evidence_a, evidence_b = await hydrate_evidence(db, [row.sources_a, row.sources_b])
+	response.headers["ETag"] = _etag(task_id, row.updated_at, row.status, include_evidence)
+	response.headers["Cache-Control"] = "no-cache"
 	return ReviewDetail(
-		id=task.id,
-		question_id=task.question_id,
-		status=task.status,
-		initial_answer=ga.initial_answer,
-		aligned_answer=ga.aligned_answer,
-		alignment=alignment,
-		evidence_a=ga.sources_a,
-		evidence_b=ga.sources_b,
+		id=row.id,
+		question_id=row.question_id,
+		question=row.asked_text,
+		status=row.status,
+		comments=row.comments,
+		initial_answer=row.initial_answer,
+		aligned_answer=row.aligned_answer,
+		alignment=_parse_alignment(row.alignment_summary),
+		evidence_a=evidence_a,
+		evidence_b=evidence_b,
 	)
 
 
@@ -88,12 +164,17 @@ async def get_review(task_id: int, db: AsyncSession = Depends(get_db_session)) -
 async def approve(task_id: int, body: ReviewActionRequest, db: AsyncSession = Depends(get_db_session)) -> ReviewActionResponse:
 	res = await db.execute(select(ReviewTask).where(ReviewTask.id == task_id))
 	task = res.scalar_one()
+	old_status = task.status
 	task.status = ReviewStatus.APPROVED.value
 	task.comments = body.comments
+	task.updated_at = datetime.utcnow()
 	resq = await db.execute(select(Question).where(Question.id == task.question_id))
 	q = resq.scalar_one()
+	old_question_status = q.status
 	q.status = "answered"
 	await db.commit()
+	counters.move("review_tasks", old_status, task.status)
+	counters.move("questions", old_question_status, q.status)
 	return ReviewActionResponse(ok=True, status=task.status)
 
 
@@ -101,9 +182,12 @@ async def approve(task_id: int, body: ReviewActionRequest, db: AsyncSession = De
 async def request_changes(task_id: int, body: ReviewActionRequest, db: AsyncSession = Depends(get_db_session)) -> ReviewActionResponse:
 	res = await db.execute(select(ReviewTask).where(ReviewTask.id == task_id))
 	task = res.scalar_one()
+	old_status = task.status
 	task.status = ReviewStatus.NEEDS_REVISION.value
 	task.comments = body.comments
+	task.updated_at = datetime.utcnow()
 	await db.commit()
+	counters.move("review_tasks", old_status, task.status)
 	return ReviewActionResponse(ok=True, status=task.status)
 
 
@@ -111,7 +195,10 @@ async def request_changes(task_id: int, body: ReviewActionRequest, db: AsyncSess
 async def reject(task_id: int, body: ReviewActionRequest, db: AsyncSession = Depends(get_db_session)) -> ReviewActionResponse:
 	res = await db.execute(select(ReviewTask).where(ReviewTask.id == task_id))
 	task = res.scalar_one()
+	old_status = task.status
 	task.status = ReviewStatus.REJECTED.value
 	task.comments = body.comments
+	task.updated_at = datetime.utcnow()
 	await db.commit()
+	counters.move("review_tasks", old_status, task.status)
 	return ReviewActionResponse(ok=True, status=task.status)
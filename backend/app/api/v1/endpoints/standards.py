@@ -1,12 +1,14 @@
 from datetime import datetime
 from typing import Optional
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db_session
 from app.models.models import StandardAnswer, StandardAnswerVersion
+from app.services.counters import counters
+from app.services.standard_versions import active_versions, sync_pointers
 
 
 class PromoteRequest(BaseModel):
@@ -24,6 +26,15 @@ class PromoteResponse(BaseModel):
 	version: int | None = None
 
 
+class ActiveStandardResponse(BaseModel):
+	topic_key: str
+	standard_answer_id: int
+	version_id: int
+	version: int
+	content: str
+	strong_constraint: bool
+
+
 router = APIRouter(prefix="/standards", tags=["standards"])
 
 
@@ -32,6 +43,7 @@ async def promote_standard(req: PromoteRequest, db: AsyncSession = Depends(get_d
 	# upsert standard_answers by topic_key
 	result = await db.execute(select(StandardAnswer).where(StandardAnswer.topic_key == req.topic_key))
 	sa = result.scalar_one_or_none()
+	created = sa is None
 	if not sa:
 		sa = StandardAnswer(topic_key=req.topic_key, description=req.description)
 		db.add(sa)
@@ -41,7 +53,7 @@ async def promote_standard(req: PromoteRequest, db: AsyncSession = Depends(get_d
 	res_ver = await db.execute(
 		select(func.coalesce(func.max(StandardAnswerVersion.version), 0)).where(StandardAnswerVersion.standard_answer_id == sa.id)
 	)
-	current_max = int(res_ver.scalar_one()) if res_ver.scalar() is not None else 0
+	current_max = int(res_ver.scalar_one())
 	next_version = current_max + 1
 
 	sav = StandardAnswerVersion(
@@ -53,5 +65,27 @@ async def promote_standard(req: PromoteRequest, db: AsyncSession = Depends(get_d
 		effective_to=req.effective_to,
 	)
 	db.add(sav)
+	await db.flush()
+	await sync_pointers(db, [sa.id])
 	await db.commit()
+	await active_versions.refresh([sa.id])
+	if created:
+		counters.incr("standard_answers")
+	counters.incr("standard_answer_versions")
 	return PromoteResponse(ok=True, message="Promoted to standard", version=next_version)
+
+
+@router.get("/active/{topic_key}", response_model=ActiveStandardResponse)
+async def get_active_standard(topic_key: str) -> ActiveStandardResponse:
+	await active_versions.ensure_fresh()
+	active = active_versions.by_topic(topic_key)
+	if active is None:
+		raise HTTPException(status_code=404, detail="no version in force")
+	return ActiveStandardResponse(
+		topic_key=active.topic_key,
+		standard_answer_id=active.standard_answer_id,
+		version_id=active.version_id,
+		version=active.version,
+		content=active.content,
+		strong_constraint=active.strong_constraint,
+	)
@@ -1,15 +1,18 @@
 from typing import Dict, Any, Optional
-import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.core.config import settings
+from app.core.telemetry import LLM_REQUEST_SECONDS, record_retry, timed
+from app.clients.http_pool import http_clients
+from app.clients.priority import priority_gates
+from app.clients.rate_limiter import llm_limiters
 
 
 class DeepSeekClient:
 	def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None) -> None:
 		self.base_url = base_url or "https://api.deepseek.com"  # placeholder
 		self.api_key = api_key or settings.deepseek_api_key
-		self._client = httpx.AsyncClient(base_url=self.base_url, headers=self._headers)
+		self._client = http_clients.get(self.base_url, headers=self._headers, timeout=settings.llm_timeout)
 
 	@property
 	def _headers(self) -> Dict[str, str]:
@@ -18,13 +21,22 @@ class DeepSeekClient:
 			headers["Authorization"] = f"Bearer {self.api_key}"
 		return headers
 
-	@retry(wait=wait_exponential(multiplier=0.5, min=1, max=8), stop=stop_after_attempt(3))
+	@retry(wait=wait_exponential(multiplier=0.5, min=1, max=8), stop=stop_after_attempt(3), before_sleep=record_retry("deepseek"))
 	async def chat(self, prompt: str, model: str = "deepseek-chat", temperature: float = 0.2) -> Dict[str, Any]:
 		# Placeholder schema; adapt to actual DeepSeek API
 		payload = {"model": model, "messages": [{"role": "user", "content": prompt}], "temperature": temperature}
-		resp = await self._client.post("/chat/completions", json=payload)
+		limiter = llm_limiters.get("deepseek")
+		estimated = limiter.estimate(prompt)
+		async with priority_gates.get("llm").slot():
+			await limiter.acquire(estimated)
+			with timed(LLM_REQUEST_SECONDS, provider="deepseek", mode="chat"):
+				resp = await self._client.post("/chat/completions", json=payload)
+		limiter.record(resp)
 		resp.raise_for_status()
-		return resp.json()
+		data = resp.json()
+		limiter.settle(estimated, data.get("usage"))
+		return data
 
 	async def aclose(self) -> None:
-		await self._client.aclose()
+		# 连接池由 lifespan（http_clients.aclose）统一关闭
+		pass
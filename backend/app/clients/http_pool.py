@@ -0,0 +1,58 @@
+from typing import Dict, Optional, Tuple
+import importlib.util
+import httpx
+from loguru import logger
+
+from app.core.config import settings
+
+
+class HTTPClientRegistry:
+	"""进程级共享的 httpx.AsyncClient 池，按 (base_url, headers) 复用连接。
+
+	由 FastAPI lifespan 负责关闭；在 lifespan 之外（脚本、后台任务）按需懒加载。
+	"""
+
+	def __init__(self) -> None:
+		self._clients: Dict[Tuple[str, Tuple[Tuple[str, str], ...], float], httpx.AsyncClient] = {}
+
+	def _limits(self) -> httpx.Limits:
+		return httpx.Limits(
+			max_connections=settings.http_max_connections,
+			max_keepalive_connections=settings.http_max_keepalive_connections,
+			keepalive_expiry=settings.http_keepalive_expiry,
+		)
+
+	def _http2_enabled(self) -> bool:
+		if not settings.http_http2:
+			return False
+		if importlib.util.find_spec("h2") is None:
+			logger.warning("HTTP_HTTP2 is enabled but the 'h2' package is not installed; falling back to HTTP/1.1")
+			return False
+		return True
+
+	def get(self, base_url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None) -> httpx.AsyncClient:
+		use_timeout = timeout if timeout is not None else settings.http_timeout
+		key = (base_url, tuple(sorted((headers or {}).items())), use_timeout)
+		client = self._clients.get(key)
+		if client is None or client.is_closed:
+			client = httpx.AsyncClient(
+				base_url=base_url,
+				headers=headers,
+				timeout=use_timeout,
+				limits=self._limits(),
+				http2=self._http2_enabled(),
+			)
+			self._clients[key] = client
+		return client
+
+	async def aclose(self) -> None:
+		clients = list(self._clients.values())
+		self._clients.clear()
+		for client in clients:
+			try:
+				await client.aclose()
+			except Exception as e:
+				logger.warning(f"Failed to close http client {client.base_url}: {e}")
+
+
+http_clients = HTTPClientRegistry()
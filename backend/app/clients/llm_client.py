@@ -1,14 +1,19 @@
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional
+import json
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.core.config import settings
+from app.core.telemetry import LLM_REQUEST_SECONDS, record_retry, timed
+from app.clients.http_pool import http_clients
+from app.clients.priority import priority_gates
+from app.clients.rate_limiter import llm_limiters
 
 
 class LLMClient:
 	"""通用 LLM 客户端，支持 Qwen、DeepSeek、OpenAI 等"""
 	
-	def __init__(self, provider: Optional[str] = None, model: Optional[str] = None, api_key: Optional[str] = None) -> None:
+	def __init__(self, provider: Optional[str] = None, model: Optional[str] = None, api_key: Optional[str] = None, http_client: Optional[httpx.AsyncClient] = None) -> None:
 		self.provider = provider or settings.llm_provider
 		self.model = model or settings.llm_model
 		
@@ -32,7 +37,8 @@ class LLMClient:
 		else:
 			self.base_url = "https://api.deepseek.com"  # 默认
 		
-		self._client = httpx.AsyncClient(base_url=self.base_url, headers=self._headers, timeout=60.0)
+		# 默认借用 lifespan 管理的共享连接池
+		self._client = http_client or http_clients.get(self.base_url, headers=self._headers, timeout=settings.llm_timeout)
 
 	@property
 	def _headers(self) -> Dict[str, str]:
@@ -44,7 +50,7 @@ class LLMClient:
 				headers["Authorization"] = f"Bearer {self.api_key}"
 		return headers
 
-	@retry(wait=wait_exponential(multiplier=0.5, min=1, max=8), stop=stop_after_attempt(3))
+	@retry(wait=wait_exponential(multiplier=0.5, min=1, max=8), stop=stop_after_attempt(3), before_sleep=record_retry("llm"))
 	async def chat(self, prompt: str, model: Optional[str] = None, temperature: float = 0.2) -> Dict[str, Any]:
 		"""统一的 chat completion 接口"""
 		use_model = model or self.model
@@ -56,12 +62,68 @@ class LLMClient:
 			"temperature": temperature
 		}
 		
-		resp = await self._client.post("/chat/completions", json=payload)
+		limiter = llm_limiters.get(self.provider)
+		estimated = limiter.estimate(prompt)
+		async with priority_gates.get("llm").slot():
+			await limiter.acquire(estimated)
+			with timed(LLM_REQUEST_SECONDS, provider=self.provider, mode="chat"):
+				resp = await self._client.post("/chat/completions", json=payload)
+		limiter.record(resp)
 		resp.raise_for_status()
-		return resp.json()
+		data = resp.json()
+		limiter.settle(estimated, data.get("usage"))
+		return data
+
+	async def chat_stream(self, prompt: str, model: Optional[str] = None, temperature: float = 0.2, usage: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+		"""流式 chat completion，逐段产出增量文本（OpenAI 兼容的 SSE 格式）。
+		已开始输出后无法安全重试，因此不使用 tenacity 装饰器。
+		传入 usage 字典时，流结束后写入最后一个分片携带的 token 用量（提供商未返回则保持不变）。
+		"""
+		use_model = model or self.model
+		payload = {
+			"model": use_model,
+			"messages": [{"role": "user", "content": prompt}],
+			"temperature": temperature,
+			"stream": True,
+			# 要求在 [DONE] 之前额外返回一个 choices 为空、只带 usage 的分片
+			"stream_options": {"include_usage": True},
+		}
+		limiter = llm_limiters.get(self.provider)
+		estimated = limiter.estimate(prompt)
+		final_usage: Optional[Dict[str, Any]] = None
+		# 整个流期间占用并发名额；记录整个流的耗时（首字节到结束）
+		async with priority_gates.get("llm").slot():
+			await limiter.acquire(estimated)
+			with timed(LLM_REQUEST_SECONDS, provider=self.provider, mode="stream"):
+				async with self._client.stream("POST", "/chat/completions", json=payload) as resp:
+					limiter.record(resp)
+					resp.raise_for_status()
+					async for line in resp.aiter_lines():
+						if not line.startswith("data:"):
+							continue
+						data = line[len("data:"):].strip()
+						if data == "[DONE]":
+							break
+						try:
+							chunk = json.loads(data)
+						except ValueError:
+							continue
+						if chunk.get("usage"):
+							final_usage = chunk["usage"]
+						choices = chunk.get("choices") or []
+						if not choices:
+							continue
+						content = (choices[0].get("delta") or {}).get("content")
+						if content:
+							yield content
+		# 未返回 usage 时按预估值计入 TPM
+		limiter.settle(estimated, final_usage)
+		if final_usage and usage is not None:
+			usage.update(final_usage)
 
 	async def aclose(self) -> None:
-		await self._client.aclose()
+		# 连接池由 lifespan（http_clients.aclose）或传入 http_client 的调用方统一关闭
+		pass
 
 
 # 保持向后兼容
@@ -71,5 +133,5 @@ class DeepSeekClient(LLMClient):
 		super().__init__(provider="deepseek", api_key=api_key)
 		if base_url:
 			self.base_url = base_url
-			self._client = httpx.AsyncClient(base_url=self.base_url, headers=self._headers, timeout=60.0)
+			self._client = http_clients.get(self.base_url, headers=self._headers, timeout=settings.llm_timeout)
 
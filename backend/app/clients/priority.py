@@ -0,0 +1,179 @@
+from __future__ import annotations
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import Enum
+import asyncio
+
+from app.core.config import settings
+from app.core.telemetry import LANE_ACTIVE, LANE_WAITING
+
+
+class Lane(str, Enum):
+	INTERACTIVE = "interactive"  # QA 接口
+	BATCH = "batch"  # 批量生成任务
+
+
+class LaneRef:
+	"""调用所属通道的可变引用：合并到同一执行的调用共享一个引用，交互调用加入时可原地提升"""
+
+	__slots__ = ("lane",)
+
+	def __init__(self, lane: Lane) -> None:
+		self.lane = lane
+
+
+# 当前调用所属的通道；未设置时按交互处理，避免未标注的调用被批量任务挤占
+_DEFAULT_LANE = LaneRef(Lane.INTERACTIVE)
+current_lane: ContextVar[LaneRef] = ContextVar("current_lane", default=_DEFAULT_LANE)
+# 通道提升后需要重新调度的排队点（闸门、限流器）
+_promotion_listeners: List[Callable[[], None]] = []
+
+
+@contextmanager
+def priority_lane(lane: Lane) -> Iterator[None]:
+	token = current_lane.set(LaneRef(lane))
+	try:
+		yield
+	finally:
+		current_lane.reset(token)
+
+
+def on_promotion(listener: Callable[[], None]) -> None:
+	_promotion_listeners.append(listener)
+
+
+def promote(ref: LaneRef) -> None:
+	"""把批量引用提升为交互：已排队的等待者随即按交互优先级调度，已在执行的调用不受影响"""
+	if ref.lane is Lane.INTERACTIVE:
+		return
+	ref.lane = Lane.INTERACTIVE
+	for listener in list(_promotion_listeners):
+		listener()
+
+
+class PriorityGate:
+	"""外部调用（RAGFlow 检索、LLM）前的并发闸门，交互通道优先。
+
+	- 总并发不超过 capacity；批量通道最多占用 batch_share 比例的名额（至少 1 个）；
+	- 有交互请求在等待时，批量请求不再获得新名额，释放的名额先给交互请求；
+	- 同一通道内按到达顺序放行。已在执行的批量调用不会被打断；
+	- 排队中的批量请求被 promote 提升后，随即按交互通道调度。
+	"""
+
+	def __init__(self, resource: str, capacity: int, batch_share: float) -> None:
+		self.resource = resource
+		self.capacity = max(1, capacity)
+		self.batch_limit = max(1, min(self.capacity, int(self.capacity * batch_share)))
+		self._active: Dict[Lane, int] = {lane: 0 for lane in Lane}
+		# 按到达顺序排队；通道取自引用的当前值，提升后的等待者立即按交互调度
+		self._waiters: List[Tuple[asyncio.Future, LaneRef]] = []
+		on_promotion(self._wake)
+
+	@property
+	def active(self) -> int:
+		return sum(self._active.values())
+
+	def _waiting(self, lane: Lane) -> int:
+		return sum(1 for _fut, ref in self._waiters if ref.lane is lane)
+
+	def _can_start(self, lane: Lane) -> bool:
+		if self.active >= self.capacity:
+			return False
+		if lane is Lane.INTERACTIVE:
+			return True
+		return not self._waiting(Lane.INTERACTIVE) and self._active[Lane.BATCH] < self.batch_limit
+
+	def _update_waiting(self) -> None:
+		for lane in Lane:
+			LANE_WAITING.labels(resource=self.resource, lane=lane.value).set(self._waiting(lane))
+
+	def _grant(self, lane: Lane) -> None:
+		self._active[lane] += 1
+		LANE_ACTIVE.labels(resource=self.resource, lane=lane.value).inc()
+
+	def _release(self, lane: Lane) -> None:
+		self._active[lane] -= 1
+		LANE_ACTIVE.labels(resource=self.resource, lane=lane.value).dec()
+		self._wake()
+
+	def _next(self) -> Optional[Tuple[asyncio.Future, LaneRef]]:
+		for lane in (Lane.INTERACTIVE, Lane.BATCH):
+			for entry in self._waiters:
+				if entry[1].lane is lane:
+					return entry if self._can_start(lane) else None
+		return None
+
+	def _wake(self) -> None:
+		while True:
+			entry = self._next()
+			if entry is None:
+				break
+			self._waiters.remove(entry)
+			fut, ref = entry
+			if fut.done():
+				continue
+			self._grant(ref.lane)
+			fut.set_result(ref.lane)
+		self._update_waiting()
+
+	async def acquire(self, ref: LaneRef) -> Lane:
+		"""返回获得名额时所在的通道，释放时按该通道归还"""
+		lane = ref.lane
+		queued = self._waiting(Lane.INTERACTIVE) if lane is Lane.INTERACTIVE else len(self._waiters)
+		if not queued and self._can_start(lane):
+			self._grant(lane)
+			return lane
+		fut = asyncio.get_running_loop().create_future()
+		entry = (fut, ref)
+		self._waiters.append(entry)
+		self._update_waiting()
+		try:
+			return await fut
+		except asyncio.CancelledError:
+			if fut.done() and not fut.cancelled():
+				# 名额已分配但调用方被取消：归还
+				self._release(fut.result())
+			elif entry in self._waiters:
+				self._waiters.remove(entry)
+				# 排在队首的请求离开后，后面的请求可能已可放行
+				self._wake()
+			raise
+
+	@asynccontextmanager
+	async def slot(self, lane: Optional[Lane] = None) -> AsyncIterator[None]:
+		ref = LaneRef(lane) if lane is not None else current_lane.get()
+		granted = await self.acquire(ref)
+		try:
+			yield
+		finally:
+			self._release(granted)
+
+	def stats(self) -> Dict[str, object]:
+		return {
+			"capacity": self.capacity,
+			"batch_limit": self.batch_limit,
+			"active": {lane.value: n for lane, n in self._active.items()},
+			"waiting": {lane.value: self._waiting(lane) for lane in Lane},
+		}
+
+
+class PriorityGates:
+	"""按资源懒加载的进程级闸门"""
+
+	def __init__(self) -> None:
+		self._gates: Dict[str, PriorityGate] = {}
+
+	def get(self, resource: str) -> PriorityGate:
+		gate = self._gates.get(resource)
+		if gate is None:
+			capacity = settings.priority_concurrency.get(resource, settings.priority_default_concurrency)
+			gate = PriorityGate(resource, capacity, settings.priority_batch_share)
+			self._gates[resource] = gate
+		return gate
+
+	def stats(self) -> Dict[str, Dict[str, object]]:
+		return {name: gate.stats() for name, gate in self._gates.items()}
+
+
+priority_gates = PriorityGates()
@@ -1,15 +1,67 @@
 from typing import Any, Dict, List, Optional
+from pathlib import Path
+import asyncio
 import httpx
+from loguru import logger
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.core.config import settings
+from app.core.telemetry import RAGFLOW_REQUEST_SECONDS, record_retry, timed
+from app.clients.http_pool import http_clients
+from app.clients.priority import priority_gates
+from app.clients.retrieval_cache import RetrievalCache, retrieval_cache
+
+
+class ParseBatcher:
+	"""按 kb_id 收集刚上传的文档 id，达到数量或时间阈值时合并为一次解析请求。
+
+	大批量导入时把每文档一次的 parse 调用压缩为每 max_batch 个文档一次。
+	"""
+
+	def __init__(self, client: "RAGFlowClient", max_batch: Optional[int] = None, max_delay: Optional[float] = None) -> None:
+		self.client = client
+		self.max_batch = max_batch or settings.ragflow_parse_batch_size
+		self.max_delay = max_delay if max_delay is not None else settings.ragflow_parse_batch_delay_seconds
+		self._pending: Dict[str, List[str]] = {}
+		self._timers: Dict[str, asyncio.Task] = {}
+
+	async def add(self, kb_id: str, doc_id: str) -> None:
+		ids = self._pending.setdefault(kb_id, [])
+		ids.append(doc_id)
+		if len(ids) >= self.max_batch:
+			await self.flush(kb_id)
+		elif kb_id not in self._timers:
+			self._timers[kb_id] = asyncio.create_task(self._flush_later(kb_id))
+
+	async def _flush_later(self, kb_id: str) -> None:
+		await asyncio.sleep(self.max_delay)
+		await self.flush(kb_id)
+
+	async def flush(self, kb_id: Optional[str] = None) -> None:
+		for kb in ([kb_id] if kb_id is not None else list(self._pending)):
+			timer = self._timers.pop(kb, None)
+			if timer is not None and timer is not asyncio.current_task():
+				timer.cancel()
+			ids = self._pending.pop(kb, [])
+			if not ids:
+				continue
+			try:
+				await self.client.parse_documents(kb, ids)
+				# 解析从此刻开始异步进行：从触发时刻重新计算不缓存窗口
+				self.client.cache.mark_parsing(kb)
+			except Exception as e:
+				# 解析失败不影响上传结果，记录日志
+				logger.warning(f"Failed to trigger parse for {len(ids)} docs in kb {kb}: {e}")
 
 
 class RAGFlowClient:
-	def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None) -> None:
+	def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None, http_client: Optional[httpx.AsyncClient] = None, cache: Optional[RetrievalCache] = None) -> None:
 		self.base_url = base_url or settings.ragflow_base_url
 		self.api_key = api_key or settings.ragflow_api_key
-		self._client = httpx.AsyncClient(base_url=self.base_url, headers=self._headers)
+		self.cache = cache or retrieval_cache
+		# 默认借用 lifespan 管理的共享连接池；显式传入的 client 由调用方负责关闭
+		self._client = http_client or http_clients.get(self.base_url, headers=self._headers)
+		self.parse_batcher = ParseBatcher(self)
 
 	@property
 	def _headers(self) -> Dict[str, str]:
@@ -18,59 +70,90 @@ class RAGFlowClient:
 			headers["Authorization"] = f"Bearer {self.api_key}"
 		return headers
 
-	@retry(wait=wait_exponential(multiplier=0.5, min=1, max=8), stop=stop_after_attempt(3))
 	async def upload_document(self, file_path: str, kb_id: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+		"""Upload a document on disk to RAGFlow dataset"""
+		# 在线程中读盘，避免大文件阻塞事件循环
+		path = Path(file_path)
+		content = await asyncio.to_thread(path.read_bytes)
+		return await self.upload_content(filename=path.name, content=content, kb_id=kb_id, metadata=metadata)
+
+	@retry(wait=wait_exponential(multiplier=0.5, min=1, max=8), stop=stop_after_attempt(3), before_sleep=record_retry("ragflow"))
+	async def upload_content(self, filename: str, content: bytes, kb_id: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
 		"""
-		Upload document to RAGFlow dataset
+		Upload document bytes to RAGFlow dataset
 		RAGFlow v0.21.0 API: POST /api/v1/datasets/{dataset_id}/documents
 		"""
-		# 使用正确的 API v1 端点
-		with open(file_path, "rb") as f:
-			files = {"file": f}
-			# 根据 RAGFlow API 文档，使用 multipart/form-data
+		files = {"file": (filename, content)}
+		# 使用正确的 API v1 端点；根据 RAGFlow API 文档，使用 multipart/form-data
+		with timed(RAGFLOW_REQUEST_SECONDS, endpoint="upload"):
 			resp = await self._client.post(
 				f"/api/v1/datasets/{kb_id}/documents",
 				files=files
 			)
 		resp.raise_for_status()
 		result = resp.json()
+		# 知识库内容已变化：丢弃该 kb 的检索缓存，并在解析完成前不再缓存
+		self.cache.mark_parsing(kb_id)
 		
-		# 上传成功后，自动触发解析
-		# RAGFlow API 返回格式: {"code": 0, "data": {"id": "...", ...}}
-		if isinstance(result, dict):
-			code = result.get("code")
-			data = result.get("data")
-			
-			if code == 0 and data:
-				# data 可能是字典或列表
-				if isinstance(data, dict):
-					doc_id = data.get("id")
-				elif isinstance(data, list) and len(data) > 0:
-					doc_id = data[0].get("id") if isinstance(data[0], dict) else None
-				else:
-					doc_id = None
-				
-				if doc_id:
-					try:
-						await self.parse_document(kb_id, doc_id)
-					except Exception as e:
-						# 解析失败不影响上传结果，记录日志
-						import logging
-						logging.warning(f"Failed to trigger parse for doc {doc_id}: {e}")
+		# 上传成功后，交给 ParseBatcher 合并触发解析
+		doc_id = self.extract_doc_id(result)
+		if doc_id:
+			await self.parse_batcher.add(kb_id, doc_id)
 		
 		return result
+
+	@staticmethod
+	def extract_doc_id(result: Any) -> Optional[str]:
+		"""从上传响应中取 RAGFlow 文档 id：{"code": 0, "data": {"id": ...}}，data 也可能是列表"""
+		if not isinstance(result, dict) or result.get("code") != 0:
+			return None
+		data = result.get("data")
+		if isinstance(data, list):
+			data = data[0] if data else None
+		if isinstance(data, dict):
+			return data.get("id")
+		return None
+
+	@retry(wait=wait_exponential(multiplier=0.5, min=1, max=8), stop=stop_after_attempt(3), before_sleep=record_retry("ragflow"))
+	async def delete_documents(self, kb_id: str, doc_ids: List[str]) -> Dict[str, Any]:
+		"""
+		Delete documents (and their chunks) from a dataset
+		RAGFlow v0.21.0 API: DELETE /api/v1/datasets/{dataset_id}/documents
+		"""
+		with timed(RAGFLOW_REQUEST_SECONDS, endpoint="delete"):
+			resp = await self._client.request("DELETE", f"/api/v1/datasets/{kb_id}/documents", json={"ids": list(doc_ids)})
+		resp.raise_for_status()
+		self.cache.invalidate_kb(kb_id)
+		return resp.json()
+
+	@retry(wait=wait_exponential(multiplier=0.5, min=1, max=8), stop=stop_after_attempt(3), before_sleep=record_retry("ragflow"))
+	async def find_documents(self, kb_id: str, name: str) -> List[Dict[str, Any]]:
+		"""
+		List documents in a dataset by file name
+		RAGFlow v0.21.0 API: GET /api/v1/datasets/{dataset_id}/documents?name=...
+		"""
+		with timed(RAGFLOW_REQUEST_SECONDS, endpoint="list"):
+			resp = await self._client.get(f"/api/v1/datasets/{kb_id}/documents", params={"name": name, "page_size": 100})
+		resp.raise_for_status()
+		data = resp.json().get("data") or {}
+		docs = data.get("docs", []) if isinstance(data, dict) else data
+		return [d for d in docs if isinstance(d, dict) and d.get("name") == name]
 	
-	@retry(wait=wait_exponential(multiplier=0.5, min=1, max=8), stop=stop_after_attempt(3))
 	async def parse_document(self, kb_id: str, doc_id: str) -> Dict[str, Any]:
+		return await self.parse_documents(kb_id, [doc_id])
+
+	@retry(wait=wait_exponential(multiplier=0.5, min=1, max=8), stop=stop_after_attempt(3), before_sleep=record_retry("ragflow"))
+	async def parse_documents(self, kb_id: str, doc_ids: List[str]) -> Dict[str, Any]:
 		"""
-		Trigger document parsing
+		Trigger document parsing (many documents per request)
 		RAGFlow v0.21.0 API: POST /api/v1/datasets/{dataset_id}/chunks
 		"""
-		payload = {"document_ids": [doc_id]}
-		resp = await self._client.post(
-			f"/api/v1/datasets/{kb_id}/chunks",
-			json=payload
-		)
+		payload = {"document_ids": list(doc_ids)}
+		with timed(RAGFLOW_REQUEST_SECONDS, endpoint="parse"):
+			resp = await self._client.post(
+				f"/api/v1/datasets/{kb_id}/chunks",
+				json=payload
+			)
 		resp.raise_for_status()
 		return resp.json()
 
@@ -88,13 +171,34 @@ class RAGFlowClient:
 				chunks.append({"text": text, "score": float(score) if score is not None else 0.0, "metadata": meta})
 		return {"chunks": chunks}
 
-	@retry(wait=wait_exponential(multiplier=0.5, min=1, max=8), stop=stop_after_attempt(3))
 	async def query(self, kb_id: str, query: str, top_k: int = 5) -> Dict[str, Any]:
+		if not settings.retrieval_cache_enabled:
+			return await self._query_gated(kb_id, query, top_k)
+		cached = self.cache.get(kb_id, query, top_k)
+		if cached is not None:
+			return cached
+		result = await self._query_gated(kb_id, query, top_k)
+		self.cache.set(kb_id, query, top_k, result)
+		return result
+
+	async def _query_gated(self, kb_id: str, query: str, top_k: int = 5) -> Dict[str, Any]:
+		# 缓存未命中才占用并发名额；通道取自当前上下文（QA 接口为交互，批量任务为批量）
+		async with priority_gates.get("ragflow").slot():
+			return await self._query_remote(kb_id, query, top_k)
+
+	@retry(wait=wait_exponential(multiplier=0.5, min=1, max=8), stop=stop_after_attempt(3), before_sleep=record_retry("ragflow"))
+	async def _query_remote(self, kb_id: str, query: str, top_k: int = 5) -> Dict[str, Any]:
 		payload = {"kb_id": kb_id, "query": query, "top_k": top_k}
-		resp = await self._client.post("/api/kb/query", json=payload)
+		with timed(RAGFLOW_REQUEST_SECONDS, endpoint="query"):
+			resp = await self._client.post("/api/kb/query", json=payload)
 		resp.raise_for_status()
 		data = resp.json()
 		return self._normalize_chunks(data)
 
+	async def flush_parse(self) -> None:
+		"""立即提交所有待合并的解析请求（导入结束时调用）"""
+		await self.parse_batcher.flush()
+
 	async def aclose(self) -> None:
-		await self._client.aclose()
+		# 连接池由 lifespan（http_clients.aclose）或传入 http_client 的调用方统一关闭
+		pass
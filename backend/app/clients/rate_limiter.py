@@ -0,0 +1,176 @@
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import asyncio
+import time
+import httpx
+from loguru import logger
+
+from app.clients.priority import Lane, LaneRef, current_lane, on_promotion
+from app.core.config import settings
+from app.core.telemetry import LLM_LIMITER_QUEUE, LLM_LIMITER_RATE_FACTOR, LLM_THROTTLED
+from app.utils.tokens import estimate_tokens
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+	"""Retry-After：秒数或 HTTP 日期"""
+	if not value:
+		return None
+	try:
+		return max(0.0, float(value))
+	except ValueError:
+		pass
+	try:
+		at = parsedate_to_datetime(value)
+	except (TypeError, ValueError):
+		return None
+	if at.tzinfo is None:
+		at = at.replace(tzinfo=timezone.utc)
+	return max(0.0, (at - datetime.now(timezone.utc)).total_seconds())
+
+
+class _Bucket:
+	"""每分钟配额的令牌桶；容量与补充速率都乘以当前的速率系数，per_minute <= 0 表示不限"""
+
+	def __init__(self, per_minute: int) -> None:
+		self.per_minute = per_minute
+		self.level = float(per_minute)
+		self.updated = time.monotonic()
+
+	def refill(self, now: float, factor: float) -> None:
+		if self.per_minute <= 0:
+			return
+		capacity = self.per_minute * factor
+		self.level = min(capacity, self.level + (now - self.updated) * self.per_minute * factor / 60.0)
+		self.updated = now
+
+	def wait_for(self, amount: float, factor: float) -> float:
+		if self.per_minute <= 0:
+			return 0.0
+		# 超过容量的请求只需等桶满，扣减后余额为负，由后续请求偿还
+		need = min(amount, self.per_minute * factor) - self.level
+		return 0.0 if need <= 0 else need * 60.0 / (self.per_minute * factor)
+
+	def take(self, amount: float) -> None:
+		if self.per_minute > 0:
+			self.level -= amount
+
+
+class _Waiter:
+	"""限流队列中的一个等待者；通道读取调用方引用的当前值"""
+
+	__slots__ = ("ref",)
+
+	def __init__(self, ref: LaneRef) -> None:
+		self.ref = ref
+
+	@property
+	def lane(self) -> Lane:
+		return self.ref.lane
+
+
+class AdaptiveRateLimiter:
+	"""按提供商共享的 RPM + TPM 令牌桶。交互通道的等待者优先，同一通道内按到达顺序放行；
+	排在队首的批量请求在等待补充令牌时，新到的交互请求会接替它成为队首。
+
+	收到 429 时速率系数减半（不低于 llm_rate_min_factor），并在 Retry-After 到期前暂停放行；
+	此后每次成功响应按 llm_rate_recovery_step 线性恢复（AIMD）。token 先按提示词估算
+	加 llm_expected_completion_tokens 预扣，拿到 usage 后按实际用量结算。
+	"""
+
+	def __init__(self, provider: str, rpm: int, tpm: int) -> None:
+		self.provider = provider
+		self.requests = _Bucket(rpm)
+		self.tokens = _Bucket(tpm)
+		self.factor = 1.0
+		self.blocked_until = 0.0
+		self._waiters: List[_Waiter] = []
+		self._changed: Optional[asyncio.Event] = None
+		self._queue = LLM_LIMITER_QUEUE.labels(provider=provider)
+		self._factor_gauge = LLM_LIMITER_RATE_FACTOR.labels(provider=provider)
+		self._factor_gauge.set(self.factor)
+		on_promotion(self._kick)
+
+	def estimate(self, prompt: str) -> int:
+		return estimate_tokens(prompt) + settings.llm_expected_completion_tokens
+
+	def _kick(self) -> None:
+		"""队列变化：唤醒所有等待者重新判断队首"""
+		if self._changed is not None:
+			self._changed.set()
+		self._changed = asyncio.Event()
+
+	def _head(self) -> _Waiter:
+		return next((w for w in self._waiters if w.lane is Lane.INTERACTIVE), self._waiters[0])
+
+	async def acquire(self, tokens: int, lane: Optional[LaneRef] = None) -> None:
+		ref = lane or current_lane.get()
+		waiter = _Waiter(ref)
+		self._waiters.append(waiter)
+		self._kick()
+		self._queue.inc()
+		try:
+			while True:
+				changed = self._changed
+				if self._head() is not waiter:
+					await changed.wait()
+					continue
+				now = time.monotonic()
+				self.requests.refill(now, self.factor)
+				self.tokens.refill(now, self.factor)
+				wait = max(self.blocked_until - now, self.requests.wait_for(1, self.factor), self.tokens.wait_for(tokens, self.factor))
+				if wait <= 0:
+					break
+				try:
+					await asyncio.wait_for(changed.wait(), timeout=wait)
+				except asyncio.TimeoutError:
+					pass
+			self.requests.take(1)
+			self.tokens.take(tokens)
+		finally:
+			self._waiters.remove(waiter)
+			self._kick()
+			self._queue.dec()
+
+	def record(self, resp: httpx.Response) -> None:
+		"""根据响应状态调整速率：429 退避，成功则逐步恢复"""
+		if resp.status_code == 429:
+			retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+			self.throttled(retry_after)
+		elif resp.is_success and self.factor < 1.0:
+			self._set_factor(self.factor + settings.llm_rate_recovery_step)
+
+	def throttled(self, retry_after: Optional[float] = None) -> None:
+		LLM_THROTTLED.labels(provider=self.provider).inc()
+		self._set_factor(self.factor * 0.5)
+		pause = retry_after if retry_after is not None else settings.llm_throttle_pause_seconds
+		self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+		logger.warning(f"LLM provider {self.provider} throttled, pausing {pause:.1f}s, rate factor {self.factor:.2f}")
+
+	def settle(self, estimated: int, usage: Optional[Dict[str, Any]]) -> None:
+		"""按实际 token 用量修正预扣（多退少补）"""
+		actual = (usage or {}).get("total_tokens")
+		if actual is not None:
+			self.tokens.take(int(actual) - estimated)
+
+	def _set_factor(self, value: float) -> None:
+		self.factor = min(1.0, max(settings.llm_rate_min_factor, value))
+		self._factor_gauge.set(self.factor)
+
+
+class RateLimiterRegistry:
+	"""进程级限流器：同一提供商的所有 LLM 调用（QA、流式、批量任务）共用一个配额"""
+
+	def __init__(self) -> None:
+		self._limiters: Dict[str, AdaptiveRateLimiter] = {}
+
+	def get(self, provider: str) -> AdaptiveRateLimiter:
+		limiter = self._limiters.get(provider)
+		if limiter is None:
+			limits = settings.llm_rate_limits.get(provider, {})
+			limiter = AdaptiveRateLimiter(provider, int(limits.get("rpm", settings.llm_rpm)), int(limits.get("tpm", settings.llm_tpm)))
+			self._limiters[provider] = limiter
+		return limiter
+
+
+llm_limiters = RateLimiterRegistry()
@@ -0,0 +1,117 @@
+from typing import Any, Dict, Optional, Tuple
+from collections import OrderedDict
+import copy
+import time
+import unicodedata
+
+from app.core.config import settings
+
+
+CacheKey = Tuple[str, str, int]
+
+
+def normalize_query(query: str) -> str:
+	"""全角/半角、大小写、空白归一，保证同一问题的不同写法命中同一缓存项"""
+	text = unicodedata.normalize("NFKC", query or "")
+	return " ".join(text.split()).lower()
+
+
+class RetrievalCache:
+	"""RAGFlow 检索结果缓存：LRU 容量上限 + 按知识库的 TTL，上传后按 kb_id 失效。
+
+	RAGFlow 的解析是异步的，触发后分块会陆续出现。有文档在解析的知识库在
+	retrieval_cache_parse_window_seconds 内既不读也不写缓存，避免缓存解析完成前的结果。
+	"""
+
+	def __init__(self, max_entries: Optional[int] = None, default_ttl: Optional[float] = None, kb_ttl: Optional[Dict[str, float]] = None) -> None:
+		self.max_entries = max_entries if max_entries is not None else settings.retrieval_cache_max_entries
+		self.default_ttl = default_ttl if default_ttl is not None else settings.retrieval_cache_ttl_seconds
+		self.kb_ttl = dict(kb_ttl if kb_ttl is not None else settings.retrieval_cache_kb_ttl)
+		self._entries: "OrderedDict[CacheKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.expirations = 0
+		self.invalidations = 0
+		self._parsing: Dict[str, float] = {}  # kb_id -> 解析窗口结束时间
+
+	@staticmethod
+	def make_key(kb_id: str, query: str, top_k: int) -> CacheKey:
+		return (kb_id, normalize_query(query), int(top_k))
+
+	def ttl_for(self, kb_id: str) -> float:
+		return float(self.kb_ttl.get(kb_id, self.default_ttl))
+
+	def mark_parsing(self, kb_id: str, window: Optional[float] = None) -> None:
+		"""知识库有文档待解析或正在解析：丢弃已有缓存，并在窗口内跳过该 kb 的缓存"""
+		window = settings.retrieval_cache_parse_window_seconds if window is None else window
+		self._parsing[kb_id] = max(self._parsing.get(kb_id, 0.0), time.monotonic() + window)
+		self.invalidate_kb(kb_id)
+
+	def parsing(self, kb_id: str) -> bool:
+		until = self._parsing.get(kb_id)
+		if until is None:
+			return False
+		if until <= time.monotonic():
+			del self._parsing[kb_id]
+			return False
+		return True
+
+	def get(self, kb_id: str, query: str, top_k: int) -> Optional[Dict[str, Any]]:
+		if self.parsing(kb_id):
+			self.misses += 1
+			return None
+		key = self.make_key(kb_id, query, top_k)
+		entry = self._entries.get(key)
+		if entry is None:
+			self.misses += 1
+			return None
+		expires_at, value = entry
+		if expires_at <= time.monotonic():
+			del self._entries[key]
+			self.expirations += 1
+			self.misses += 1
+			return None
+		self._entries.move_to_end(key)
+		self.hits += 1
+		# 返回副本，避免调用方修改污染缓存
+		return copy.deepcopy(value)
+
+	def set(self, kb_id: str, query: str, top_k: int, value: Dict[str, Any]) -> None:
+		ttl = self.ttl_for(kb_id)
+		if ttl <= 0 or self.max_entries <= 0 or self.parsing(kb_id):
+			return
+		key = self.make_key(kb_id, query, top_k)
+		self._entries[key] = (time.monotonic() + ttl, copy.deepcopy(value))
+		self._entries.move_to_end(key)
+		while len(self._entries) > self.max_entries:
+			self._entries.popitem(last=False)
+			self.evictions += 1
+
+	def invalidate_kb(self, kb_id: str) -> int:
+		keys = [k for k in self._entries if k[0] == kb_id]
+		for k in keys:
+			del self._entries[k]
+		self.invalidations += len(keys)
+		return len(keys)
+
+	def clear(self) -> None:
+		self._entries.clear()
+		self._parsing.clear()
+
+	def stats(self) -> Dict[str, Any]:
+		total = self.hits + self.misses
+		return {
+			"size": len(self._entries),
+			"max_entries": self.max_entries,
+			"hits": self.hits,
+			"misses": self.misses,
+			"hit_rate": (self.hits / total) if total else 0.0,
+			"evictions": self.evictions,
+			"expirations": self.expirations,
+			"invalidations": self.invalidations,
+			"parsing_kbs": sum(1 for kb in list(self._parsing) if self.parsing(kb)),
+		}
+
+
+retrieval_cache = RetrievalCache()
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 
 
@@ -22,7 +22,83 @@ class Settings(BaseSettings):
 	alignment_strong_threshold: float = 0.8
 	alignment_weak_threshold: float = 0.6
 
+	# 轨道 B 检索来源：ragflow（知识库 B 查询）或 local（进程内标准回答索引）
+	track_b_retriever: str = "ragflow"
+	standards_reload_seconds: float = 300.0  # 当前生效版本缓存的全量重载周期（多 worker 间保持一致）
+
+	# 共享 HTTP 连接池（RAGFlow / LLM）
+	http_max_connections: int = 100
+	http_max_keepalive_connections: int = 20
+	http_keepalive_expiry: float = 30.0
+	http_timeout: float = 30.0
+	http_http2: bool = False  # 需要安装 h2
+	llm_timeout: float = 60.0
+
+	# 外部调用优先级：交互（QA 接口）优先于批量生成；按资源限制并发
+	priority_concurrency: Dict[str, int] = {"ragflow": 16, "llm": 8}
+	priority_default_concurrency: int = 8
+	priority_batch_share: float = 0.5  # 批量任务最多占用的并发比例
+
+	# LLM 调用限流：按提供商共享的 RPM/TPM 令牌桶，<=0 表示不限
+	llm_rpm: int = 300
+	llm_tpm: int = 1000000
+	llm_rate_limits: Dict[str, Dict[str, int]] = {}  # 按提供商覆盖，如 {"qwen": {"rpm": 120, "tpm": 300000}}
+	llm_expected_completion_tokens: int = 800  # 放行前按提示词估算 + 该值预扣 token
+	llm_rate_min_factor: float = 0.1  # 429 后速率系数的下限
+	llm_rate_recovery_step: float = 0.05  # 每次成功响应恢复的速率系数
+	llm_throttle_pause_seconds: float = 5.0  # 429 未带 Retry-After 时的暂停时长
+
+	# RAGFlow 上传后合并触发解析：攒够 N 个文档或等待超过 T 秒即提交一次
+	ragflow_parse_batch_size: int = 50
+	ragflow_parse_batch_delay_seconds: float = 2.0
+
+	# RAGFlow 检索缓存
+	retrieval_cache_enabled: bool = True
+	retrieval_cache_max_entries: int = 2048
+	retrieval_cache_ttl_seconds: float = 300.0
+	retrieval_cache_kb_ttl: Dict[str, float] = {}  # 按 kb_id 覆盖 TTL，<=0 表示不缓存
+	# RAGFlow 异步解析：上传/触发解析后的这段时间内不缓存该知识库的检索结果
+	retrieval_cache_parse_window_seconds: float = 600.0
+
+	# A 轨上下文装箱：按得分装入 token 预算，去除重叠块
+	context_token_budget: int = 3000
+	context_dedup_threshold: float = 0.8  # 候选块被已选块覆盖的比例达到该值即视为重复
+	context_tokens_per_cjk: float = 1.0  # 每个中文字符的估算 token 数（偏保守）
+
+	# 相同问题（问题、知识库、提示词、top_k 均相同）的并发 answer 调用合并为一次执行
+	qa_single_flight_enabled: bool = True
+
+	# 批量生成任务队列
+	job_scheduler_enabled: bool = True
+	generation_concurrency: int = 4
+	generation_max_attempts: int = 3
+	generation_retry_base_seconds: float = 5.0
+	generation_retry_max_seconds: float = 300.0
+	job_poll_interval_seconds: float = 2.0
+	job_stale_after_seconds: float = 900.0  # running 超过该时长视为进程已崩溃，重新入队
+	job_heartbeat_seconds: float = 60.0  # 运行中的任务按该周期刷新 updated_at，须明显小于 job_stale_after_seconds
+
+	# /metrics 计数器：增量维护，按该周期用 GROUP BY 全量校准
+	metrics_reconcile_seconds: float = 300.0
+
+	# 批量写库：多行 INSERT 的每块行数
+	db_bulk_chunk_size: int = 1000
+
+	# 大字段列级压缩（生成答案正文/证据、证据块正文）：zstd，可选训练字典
+	column_compression_level: int = 6
+	column_compression_min_bytes: int = 128  # 低于该长度不压缩
+	column_compression_dict_dir: str = ""  # 存放 <dict_id>.zdict 的目录，读取时按需选用
+	column_compression_dict_id: int = 0  # 写入使用的字典，0 表示不用字典
+
+	# 迁移 0011 回填历史 KnowledgeDoc 的 kb_id（早期版本未记录；为空则不回填）
+	knowledge_backfill_kb_id: str = ""
+
+	# 知识库导入：每个批次并发上传到 RAGFlow 的 worker 数（可按批次覆盖）
+	ingest_upload_concurrency: int = 4
+
 	storage_base_dir: str = "./storage"
+	upload_chunk_size: int = 1024 * 1024  # 上传落盘的块大小
+	upload_max_bytes: int = 2 * 1024 * 1024 * 1024  # 单个上传文件上限，0 表示不限制
 	cors_allow_origins: List[str] = ["*"]
 
 	@property
@@ -0,0 +1,94 @@
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Set, TypeVar
+from contextlib import contextmanager
+import asyncio
+import functools
+import time
+from prometheus_client import Counter, Gauge, Histogram
+
+# Prometheus 指标定义；通过 GET /api/v1/metrics/prometheus 抓取。
+# 进程内注册表：多 worker 部署时每个 worker 分别被抓取（按 instance 区分）。
+
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+_DB_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+RETRIEVAL_SECONDS = Histogram(
+	"ir_rag_retrieval_seconds", "Track A/B retrieval latency (including cache hits)", ["track", "source"], buckets=_LATENCY_BUCKETS
+)
+RAGFLOW_REQUEST_SECONDS = Histogram(
+	"ir_rag_ragflow_request_seconds", "RAGFlow HTTP request latency per attempt", ["endpoint"], buckets=_LATENCY_BUCKETS
+)
+LLM_REQUEST_SECONDS = Histogram(
+	"ir_rag_llm_request_seconds", "LLM completion latency per attempt", ["provider", "mode"], buckets=_LATENCY_BUCKETS
+)
+PIPELINE_ANSWER_SECONDS = Histogram(
+	"ir_rag_pipeline_answer_seconds", "End-to-end RAGPipeline answer latency", ["mode"], buckets=_LATENCY_BUCKETS
+)
+DB_SESSION_SECONDS = Histogram(
+	"ir_rag_db_session_seconds", "Time an AsyncSession stays open", buckets=_DB_BUCKETS
+)
+IMPORT_DURATION_SECONDS = Histogram(
+	"ir_rag_import_duration_seconds", "Import batch duration", ["kind"], buckets=_LATENCY_BUCKETS + (300.0, 600.0, 1800.0, 3600.0)
+)
+IMPORT_ROWS = Counter("ir_rag_import_rows_total", "Rows processed by imports (rate() gives throughput)", ["kind"])
+RETRIES = Counter("ir_rag_retries_total", "Retries fired by tenacity decorators", ["client", "method"])
+SINGLE_FLIGHT_CALLS = Counter(
+	"ir_rag_single_flight_calls_total", "Coalesced calls by role (leader executes, follower shares the result)", ["name", "role"]
+)
+LLM_LIMITER_QUEUE = Gauge("ir_rag_llm_limiter_queue_depth", "Calls waiting for the LLM rate limiter", ["provider"])
+LLM_LIMITER_RATE_FACTOR = Gauge("ir_rag_llm_limiter_rate_factor", "Adaptive multiplier applied to configured RPM/TPM", ["provider"])
+LLM_THROTTLED = Counter("ir_rag_llm_throttled_total", "429 responses from LLM providers", ["provider"])
+LANE_ACTIVE = Gauge("ir_rag_priority_lane_active", "External calls holding a priority gate slot", ["resource", "lane"])
+LANE_WAITING = Gauge("ir_rag_priority_lane_waiting", "External calls queued at a priority gate", ["resource", "lane"])
+BACKGROUND_TASKS = Gauge("ir_rag_background_tasks", "In-flight background tasks", ["kind"])
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels: str):
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		(histogram.labels(**labels) if labels else histogram).observe(time.perf_counter() - start)
+
+
+def record_retry(client: str) -> Callable[[Any], None]:
+	"""tenacity before_sleep 回调：每次即将重试时计数"""
+	def _before_sleep(retry_state: Any) -> None:
+		method = getattr(retry_state.fn, "__name__", "unknown")
+		RETRIES.labels(client=client, method=method).inc()
+	return _before_sleep
+
+
+F = TypeVar("F", bound=Callable[..., Awaitable[int]])
+
+
+def observe_import(kind: str) -> Callable[[F], F]:
+	"""记录导入耗时与处理行数；被装饰的协程返回处理的行数"""
+	def decorator(fn: F) -> F:
+		@functools.wraps(fn)
+		async def wrapper(*args: Any, **kwargs: Any) -> int:
+			with timed(IMPORT_DURATION_SECONDS, kind=kind):
+				count = await fn(*args, **kwargs)
+			IMPORT_ROWS.labels(kind=kind).inc(count or 0)
+			return count
+		return wrapper  # type: ignore[return-value]
+	return decorator
+
+
+_background: Set[asyncio.Task] = set()
+
+
+def spawn_background(coro: Awaitable[Any], kind: str) -> asyncio.Task:
+	"""启动后台任务：保留强引用避免被 GC 回收，并计入 in-flight gauge"""
+	task = asyncio.ensure_future(coro)
+	_background.add(task)
+	gauge = BACKGROUND_TASKS.labels(kind=kind)
+	gauge.inc()
+
+	def _done(t: asyncio.Task) -> None:
+		_background.discard(t)
+		gauge.dec()
+
+	task.add_done_callback(_done)
+	return task
@@ -0,0 +1,60 @@
+from typing import Any, Dict, List, Optional, Sequence, Type
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import Base
+
+
+def _chunks(rows: Sequence[Dict[str, Any]], size: int):
+	for i in range(0, len(rows), size):
+		yield rows[i:i + size]
+
+
+async def bulk_insert(
+	db: AsyncSession,
+	model: Type[Base],
+	rows: Sequence[Dict[str, Any]],
+	scope: Optional[sa.ColumnElement] = None,
+	chunk_size: Optional[int] = None,
+	return_ids: bool = True,
+) -> List[int]:
+	"""按块执行多行 INSERT，返回与 rows 顺序一致的自增 id。
+
+	MySQL 不支持 INSERT ... RETURNING：每块插入后取 LAST_INSERT_ID()（该语句的首个
+	自增值），再用 scope 条件（如 batch_id == 123）回查 id >= 首值 的行。同一语句内
+	的自增值按行序单调递增，只要 scope 内的行只由当前调用写入，回查结果即为本块的 id。
+	scope 为空时退化为逐行 ORM flush，保证结果正确。
+	"""
+	if not rows:
+		return []
+	size = chunk_size or settings.db_bulk_chunk_size
+	table = model.__table__
+	pk = table.c.id
+	dialect = db.bind.dialect
+	ids: List[int] = []
+
+	if return_ids and scope is None:
+		objs = [model(**r) for r in rows]
+		for chunk in _chunks(objs, size):
+			db.add_all(chunk)
+			await db.flush()
+			ids.extend(o.id for o in chunk)
+		return ids
+
+	for chunk in _chunks(rows, size):
+		if not return_ids:
+			await db.execute(sa.insert(table).values(list(chunk)))
+			continue
+		if dialect.insert_returning:
+			res = await db.execute(sa.insert(table).values(list(chunk)).returning(pk))
+			ids.extend(res.scalars().all())
+			continue
+		await db.execute(sa.insert(table).values(list(chunk)))
+		first_id = (await db.execute(sa.text("SELECT LAST_INSERT_ID()"))).scalar_one()
+		res = await db.execute(sa.select(pk).where(scope, pk >= first_id).order_by(pk).limit(len(chunk)))
+		chunk_ids = list(res.scalars().all())
+		if len(chunk_ids) != len(chunk):
+			raise RuntimeError(f"bulk insert into {table.name} returned {len(chunk_ids)} ids for {len(chunk)} rows")
+		ids.extend(chunk_ids)
+	return ids
@@ -1,14 +1,32 @@
+import time
 from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 from app.core.config import settings
+from app.core.telemetry import DB_SESSION_SECONDS
 
 
 class Base(DeclarativeBase):
 	pass
 
 
+class TimedAsyncSession(AsyncSession):
+	"""记录会话从创建到关闭的时长，用于观察连接占用"""
+
+	def __init__(self, *args, **kwargs) -> None:
+		super().__init__(*args, **kwargs)
+		self._opened_at = time.perf_counter()
+
+	async def close(self) -> None:
+		try:
+			await super().close()
+		finally:
+			if self._opened_at is not None:
+				DB_SESSION_SECONDS.observe(time.perf_counter() - self._opened_at)
+				self._opened_at = None
+
+
 engine: AsyncEngine = create_async_engine(settings.database_url, echo=False, pool_pre_ping=True)
-AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=TimedAsyncSession)
 
 
 async def get_db_session() -> AsyncSession:
@@ -0,0 +1,139 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Optional
+from pathlib import Path
+import json
+import threading
+import zstandard as zstd
+from sqlalchemy import LargeBinary
+from sqlalchemy.dialects import mysql
+from sqlalchemy.types import TypeDecorator
+
+from app.core.config import settings
+
+# 列级压缩的存储格式（首字节区分，旧数据无需标记）：
+#   zstd 帧（魔数 28 B5 2F FD）  压缩数据，帧头中的 dict_id 指明所用字典（0 表示无字典）
+#   0x00 + 原始字节               低于阈值或压缩无收益的值
+#   其他                          迁移前的 UTF-8 原文（合法 UTF-8 不会以上述两种前缀开头）
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+RAW_PREFIX = b"\x00"
+
+
+class _Codec:
+	"""按线程缓存 zstd 压缩器/解压器（zstandard 的对象不可跨线程并发使用）。
+
+	字典从 column_compression_dict_dir 下的 <dict_id>.zdict 加载：读取时按帧头的 dict_id
+	选择字典，因此轮换字典后旧数据仍可读；写入只使用 column_compression_dict_id 指定的字典。
+	"""
+
+	def __init__(self) -> None:
+		self._local = threading.local()
+		self._dicts: Optional[Dict[int, zstd.ZstdCompressionDict]] = None
+		self._lock = threading.Lock()
+
+	def dictionaries(self) -> Dict[int, zstd.ZstdCompressionDict]:
+		if self._dicts is None:
+			with self._lock:
+				if self._dicts is None:
+					self._dicts = load_dictionaries(settings.column_compression_dict_dir)
+		return self._dicts
+
+	def _compressor(self) -> zstd.ZstdCompressor:
+		c = getattr(self._local, "compressor", None)
+		if c is None:
+			dict_id = settings.column_compression_dict_id
+			dict_data = self.dictionaries().get(dict_id) if dict_id else None
+			if dict_id and dict_data is None:
+				raise RuntimeError(f"compression dictionary {dict_id} not found in {settings.column_compression_dict_dir!r}")
+			c = zstd.ZstdCompressor(level=settings.column_compression_level, dict_data=dict_data)
+			self._local.compressor = c
+		return c
+
+	def _decompressor(self, dict_id: int) -> zstd.ZstdDecompressor:
+		cache = getattr(self._local, "decompressors", None)
+		if cache is None:
+			cache = self._local.decompressors = {}
+		d = cache.get(dict_id)
+		if d is None:
+			dict_data = self.dictionaries().get(dict_id) if dict_id else None
+			if dict_id and dict_data is None:
+				raise RuntimeError(f"compression dictionary {dict_id} not found in {settings.column_compression_dict_dir!r}")
+			d = cache[dict_id] = zstd.ZstdDecompressor(dict_data=dict_data)
+		return d
+
+	def encode(self, data: bytes) -> bytes:
+		if len(data) >= settings.column_compression_min_bytes:
+			packed = self._compressor().compress(data)
+			if len(packed) < len(data):
+				return packed
+		return RAW_PREFIX + data
+
+	def decode(self, value: Any) -> bytes:
+		if isinstance(value, str):
+			# SQLite 上迁移前的 TEXT 值
+			return value.encode("utf-8")
+		value = bytes(value)
+		if value.startswith(ZSTD_MAGIC):
+			dict_id = zstd.get_frame_parameters(value).dict_id
+			return self._decompressor(dict_id).decompress(value)
+		if value.startswith(RAW_PREFIX):
+			return value[1:]
+		return value
+
+
+codec = _Codec()
+
+
+def load_dictionaries(directory: str) -> Dict[int, zstd.ZstdCompressionDict]:
+	if not directory:
+		return {}
+	dicts: Dict[int, zstd.ZstdCompressionDict] = {}
+	for path in sorted(Path(directory).glob("*.zdict")):
+		d = zstd.ZstdCompressionDict(path.read_bytes())
+		dicts[d.dict_id()] = d
+	return dicts
+
+
+def train_dictionary(samples: Iterable[bytes], size: int = 112 * 1024) -> zstd.ZstdCompressionDict:
+	"""用现有数据训练字典；保存为 <dict_id>.zdict 放入 column_compression_dict_dir 后生效"""
+	return zstd.train_dictionary(size, [s for s in samples if s])
+
+
+class _CompressedBlob(TypeDecorator):
+	impl = LargeBinary
+	cache_ok = True
+
+	def load_dialect_impl(self, dialect):
+		if dialect.name == "mysql":
+			return dialect.type_descriptor(mysql.LONGBLOB())
+		return dialect.type_descriptor(LargeBinary())
+
+
+class CompressedText(_CompressedBlob):
+	"""透明压缩的文本列：读写均为 str"""
+	cache_ok = True
+
+	def process_bind_param(self, value: Optional[str], dialect) -> Optional[bytes]:
+		if value is None:
+			return None
+		return codec.encode(value.encode("utf-8"))
+
+	def process_result_value(self, value: Any, dialect) -> Optional[str]:
+		if value is None:
+			return None
+		return codec.decode(value).decode("utf-8")
+
+
+class CompressedJSON(_CompressedBlob):
+	"""透明压缩的 JSON 列：读写均为 Python 对象（不支持 JSON 路径查询）"""
+	cache_ok = True
+
+	def process_bind_param(self, value: Any, dialect) -> Optional[bytes]:
+		if value is None:
+			return None
+		raw = json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+		return codec.encode(raw.encode("utf-8"))
+
+	def process_result_value(self, value: Any, dialect) -> Any:
+		if value is None:
+			return None
+		return json.loads(codec.decode(value))
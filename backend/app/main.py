@@ -1,4 +1,6 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from loguru import logger
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
@@ -6,6 +8,30 @@ from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
 from app.core.logging import configure_logging
 from app.api.v1.routes import api_router
+from app.clients.http_pool import http_clients
+from app.services.counters import counters
+from app.services.job_scheduler import job_scheduler
+from app.services.standards_index import standards_index
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	await counters.start()
+	if settings.job_scheduler_enabled:
+		await job_scheduler.start()
+	if settings.track_b_retriever == "local":
+		try:
+			await standards_index.ensure_loaded()
+		except Exception as e:
+			# 启动时数据库不可用不阻塞服务，首次检索时再加载
+			logger.warning(f"standards index preload failed: {e}")
+	# RAGFlow / LLM 客户端共享的连接池在此统一关闭
+	try:
+		yield
+	finally:
+		await job_scheduler.stop()
+		await counters.stop()
+		await http_clients.aclose()
 
 
 def create_app() -> FastAPI:
@@ -14,6 +40,7 @@ def create_app() -> FastAPI:
 		title="IR RAG Backend",
 		version="0.1.0",
 		default_response_class=ORJSONResponse,
+		lifespan=lifespan,
 	)
 	app.add_middleware(
 		CORSMiddleware,
@@ -27,3 +27,10 @@ class ImportStatus(str, Enum):
 	PROCESSING = "processing"
 	COMPLETED = "completed"
 	FAILED = "failed"
+
+
+class JobStatus(str, Enum):
+	QUEUED = "queued"
+	RUNNING = "running"
+	SUCCEEDED = "succeeded"
+	FAILED = "failed"
@@ -2,10 +2,11 @@ from __future__ import annotations
 from typing import Optional
 from datetime import datetime, date
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Text, Integer, Boolean, DateTime, Date, ForeignKey, JSON
+from sqlalchemy import String, Text, Integer, Boolean, DateTime, Date, ForeignKey, JSON, Index, UniqueConstraint
 
 from app.db.session import Base
-from app.models.enums import Role, DocCategory, ReviewStatus, ImportStatus
+from app.db.types import CompressedJSON, CompressedText
+from app.models.enums import Role, DocCategory, ReviewStatus, ImportStatus, JobStatus
 
 
 class User(Base):
@@ -49,13 +50,23 @@ class ImportBatch(Base):
 class KnowledgeDoc(Base):
 	"""轨道A：公司基础信息/公告/研发等。元数据用于回溯来源。"""
 	__tablename__ = "knowledge_docs"
+	__table_args__ = (
+		Index("ix_knowledge_docs_batch_id", "batch_id", "id"),
+		UniqueConstraint("kb_id", "content_sha256", name="uq_knowledge_docs_kb_sha256"),
+		Index("ix_knowledge_docs_kb_title", "kb_id", "title"),
+		Index("ix_knowledge_docs_kb_source_key", "kb_id", "source_key"),
+	)
 
 	id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 	title: Mapped[str] = mapped_column(String(300))
 	category: Mapped[str] = mapped_column(String(50), index=True)  # DocCategory
 	source_path: Mapped[Optional[str]] = mapped_column(String(500))
+	source_key: Mapped[Optional[str]] = mapped_column(String(500))  # 文档身份：压缩包内条目路径或磁盘路径，新版本按此替换旧版本
 	source_url: Mapped[Optional[str]] = mapped_column(String(500))
 	disclosure_date: Mapped[Optional[date]] = mapped_column(Date)
+	kb_id: Mapped[Optional[str]] = mapped_column(String(100))  # 上传到的 RAGFlow 知识库
+	content_sha256: Mapped[Optional[str]] = mapped_column(String(64))  # 原文件内容哈希，用于去重
+	ragflow_doc_id: Mapped[Optional[str]] = mapped_column(String(64))  # 上传后 RAGFlow 返回的文档 id，替换旧版本时用于删除
 	batch_id: Mapped[Optional[int]] = mapped_column(ForeignKey("import_batches.id"))
 	meta_data: Mapped[Optional[dict]] = mapped_column(JSON, default={})
 	created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -70,10 +81,18 @@ class StandardAnswer(Base):
 	id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 	topic_key: Mapped[str] = mapped_column(String(200), unique=True, index=True)  # 规范化主题键
 	description: Mapped[Optional[str]] = mapped_column(String(500))
+	# 物化的当前生效版本；next_change_at 为下一个生效窗口开启/关闭的时刻，届时需重新解析
+	current_version_id: Mapped[Optional[int]] = mapped_column(
+		ForeignKey("standard_answer_versions.id", use_alter=True, name="fk_standard_answers_current_version_id")
+	)
+	next_change_at: Mapped[Optional[datetime]] = mapped_column(DateTime, index=True)
 	created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 	versions: Mapped[list[StandardAnswerVersion]] = relationship(
-		"StandardAnswerVersion", back_populates="standard_answer", cascade="all, delete-orphan"
+		"StandardAnswerVersion",
+		back_populates="standard_answer",
+		cascade="all, delete-orphan",
+		foreign_keys="StandardAnswerVersion.standard_answer_id",
 	)
 
 
@@ -90,16 +109,23 @@ class StandardAnswerVersion(Base):
 	meta_data: Mapped[Optional[dict]] = mapped_column(JSON, default={})
 	created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
-	standard_answer: Mapped[StandardAnswer] = relationship("StandardAnswer", back_populates="versions")
+	standard_answer: Mapped[StandardAnswer] = relationship(
+		"StandardAnswer", back_populates="versions", foreign_keys=[standard_answer_id]
+	)
 
 
 class Question(Base):
 	__tablename__ = "questions"
+	__table_args__ = (
+		Index("ix_questions_batch_id", "batch_id", "id"),
+		Index("ix_questions_status", "status"),
+	)
 
 	id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 	asked_text: Mapped[str] = mapped_column(Text)
 	normalized_text: Mapped[Optional[str]] = mapped_column(Text)
 	prompt_template_id: Mapped[Optional[int]] = mapped_column(ForeignKey("prompt_templates.id"))
+	batch_id: Mapped[Optional[int]] = mapped_column(ForeignKey("import_batches.id"))
 	status: Mapped[str] = mapped_column(String(20), default="pending")  # pending/answered/needs_review
 	meta_data: Mapped[Optional[dict]] = mapped_column(JSON, default={})
 	created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -107,23 +133,72 @@ class Question(Base):
 	prompt_template: Mapped[Optional[PromptTemplate]] = relationship("PromptTemplate")
 
 
+class EvidenceChunk(Base):
+	"""内容寻址的证据块：同一检索片段只存一份，回答中按 id + score 引用。"""
+	__tablename__ = "evidence_chunks"
+	__table_args__ = (
+		UniqueConstraint("sha256", name="uq_evidence_chunks_sha256"),
+	)
+
+	id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+	sha256: Mapped[str] = mapped_column(String(64))  # 正文 + 元数据的哈希
+	text: Mapped[str] = mapped_column(CompressedText)
+	meta_data: Mapped[Optional[dict]] = mapped_column(JSON, default={})
+	created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
 class GeneratedAnswer(Base):
 	__tablename__ = "generated_answers"
+	__table_args__ = (
+		Index("ix_generated_answers_question_id_created_at", "question_id", "created_at"),
+		Index("ix_generated_answers_created_at", "created_at"),
+	)
 
 	id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 	question_id: Mapped[int] = mapped_column(ForeignKey("questions.id"))
-	initial_answer: Mapped[str] = mapped_column(Text)  # 以A为主生成的初稿
-	aligned_answer: Mapped[Optional[str]] = mapped_column(Text)  # B对齐后
+	initial_answer: Mapped[str] = mapped_column(CompressedText)  # 以A为主生成的初稿
+	aligned_answer: Mapped[Optional[str]] = mapped_column(CompressedText)  # B对齐后
 	alignment_summary: Mapped[Optional[str]] = mapped_column(Text)  # 冲突/调整说明
-	sources_a: Mapped[Optional[dict]] = mapped_column(JSON, default={})  # A轨证据列表
-	sources_b: Mapped[Optional[dict]] = mapped_column(JSON, default={})  # B轨匹配摘要
+	sources_a: Mapped[Optional[dict]] = mapped_column(CompressedJSON, default={})  # A轨证据：{"chunks": [{"chunk_id", "score"}]}
+	sources_b: Mapped[Optional[dict]] = mapped_column(CompressedJSON, default={})  # B轨证据，格式同上
+	timings: Mapped[Optional[dict]] = mapped_column(JSON)  # 分阶段耗时（ms）与 token 用量
 	created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 	question: Mapped[Question] = relationship("Question")
 
 
+class GenerationJob(Base):
+	"""批量生成任务：每个问题一行，由 JobScheduler 按并发上限领取、失败退避重试。"""
+	__tablename__ = "generation_jobs"
+	__table_args__ = (
+		Index("ix_generation_jobs_status_next_run_at", "status", "next_run_at"),
+		Index("ix_generation_jobs_batch_id_status", "batch_id", "status"),
+	)
+
+	id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+	batch_id: Mapped[Optional[int]] = mapped_column(ForeignKey("import_batches.id"))
+	question_id: Mapped[int] = mapped_column(ForeignKey("questions.id"))
+	kb_a_id: Mapped[str] = mapped_column(String(100))
+	kb_b_id: Mapped[str] = mapped_column(String(100))
+	prompt: Mapped[Optional[str]] = mapped_column(Text)
+	status: Mapped[str] = mapped_column(String(20), default=JobStatus.QUEUED.value)
+	attempts: Mapped[int] = mapped_column(Integer, default=0)
+	max_attempts: Mapped[int] = mapped_column(Integer, default=3)
+	last_error: Mapped[Optional[str]] = mapped_column(Text)
+	next_run_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+	created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+	updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+	batch: Mapped[Optional[ImportBatch]] = relationship("ImportBatch")
+	question: Mapped[Question] = relationship("Question")
+
+
 class ReviewTask(Base):
 	__tablename__ = "review_tasks"
+	__table_args__ = (
+		Index("ix_review_tasks_status_created_at", "status", "created_at", "id"),
+		Index("ix_review_tasks_created_at", "created_at", "id"),
+	)
 
 	id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 	question_id: Mapped[int] = mapped_column(ForeignKey("questions.id"))
@@ -141,6 +216,11 @@ class ReviewTask(Base):
 
 class AuditLog(Base):
 	__tablename__ = "audit_logs"
+	__table_args__ = (
+		Index("ix_audit_logs_action_created_at", "action", "created_at", "id"),
+		Index("ix_audit_logs_user_id_created_at", "user_id", "created_at", "id"),
+		Index("ix_audit_logs_created_at", "created_at", "id"),
+	)
 
 	id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 	user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"))
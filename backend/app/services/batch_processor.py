@@ -1,55 +1,132 @@
 from __future__ import annotations
 from typing import Optional, List
-import asyncio
+from datetime import datetime
+import json
 import pandas as pd
+import sqlalchemy as sa
 
 from app.db.session import AsyncSessionLocal
-from app.models.models import Question, GeneratedAnswer, ReviewTask
+from app.db.bulk import bulk_insert
+from app.models.models import Question, GeneratedAnswer, ReviewTask, GenerationJob
+from app.models.enums import ImportStatus, JobStatus, ReviewStatus
+from app.core.config import settings
+from app.core.telemetry import observe_import
+from app.services.batch_status import update_batch
+from app.services.counters import counters
+from app.services.evidence_store import store_evidence
 from app.services.rag_pipeline import RAGPipeline
 
 
-async def _generate_and_store(question: Question, kb_a_id: str, kb_b_id: str, prompt: str) -> None:
+async def generate_and_store(question_id: int, asked_text: str, kb_a_id: str, kb_b_id: str, prompt: str, job_id: Optional[int] = None, attempt: Optional[int] = None) -> bool:
+	"""生成回答并写入 GeneratedAnswer + ReviewTask。
+
+	传入 job_id/attempt 时，任务的 succeeded 状态与回答在同一事务中提交：只有任务仍处于
+	本次领取的 running 状态（attempts 未变）才写入，否则说明该次执行已被超时回收并重新领取
+	或已由其他执行完成，回滚并返回 False，避免同一任务产生重复回答。
+	"""
 	pipeline = RAGPipeline()
-	result = await pipeline.answer(question=question.asked_text, prompt=prompt or "", kb_a_id=kb_a_id, kb_b_id=kb_b_id)
+	result = await pipeline.answer(question=asked_text, prompt=prompt or "", kb_a_id=kb_a_id, kb_b_id=kb_b_id)
 	async with AsyncSessionLocal() as db:
+		if job_id is not None:
+			res_job = await db.execute(
+				sa.update(GenerationJob)
+				.where(GenerationJob.id == job_id, GenerationJob.status == JobStatus.RUNNING.value, GenerationJob.attempts == attempt)
+				.values(status=JobStatus.SUCCEEDED.value, last_error=None, updated_at=datetime.utcnow())
+			)
+			if res_job.rowcount != 1:
+				await db.rollback()
+				return False
+		# 证据块按内容哈希去重存储，回答只保存引用
+		sources_a, sources_b = await store_evidence(db, result.get("evidence_a"), result.get("evidence_b"))
 		ga = GeneratedAnswer(
-			question_id=question.id,
+			question_id=question_id,
 			initial_answer=result["initial"],
 			aligned_answer=result["aligned"],
-			alignment_summary=str(result.get("alignment", {})),
-			sources_a=result.get("evidence_a"),
-			sources_b=result.get("evidence_b"),
+			alignment_summary=json.dumps(result.get("alignment", {}), ensure_ascii=False),
+			sources_a=sources_a,
+			sources_b=sources_b,
+			timings=result.get("timings"),
 		)
 		db.add(ga)
 		await db.flush()
-		review = ReviewTask(question_id=question.id, generated_answer_id=ga.id)
+		review = ReviewTask(question_id=question_id, generated_answer_id=ga.id)
 		db.add(review)
-		question.status = "answered"
+		old_status = (await db.execute(sa.select(Question.status).where(Question.id == question_id))).scalar_one_or_none()
+		await db.execute(sa.update(Question).where(Question.id == question_id).values(status="answered"))
 		await db.commit()
+	counters.incr("generated_answers")
+	counters.incr("review_tasks", ReviewStatus.PENDING.value)
+	counters.move("questions", old_status, "answered")
+	if job_id is not None:
+		counters.move("generation_jobs", JobStatus.RUNNING.value, JobStatus.SUCCEEDED.value)
+	return True
 
 
-async def process_questions_file(file_path: str, kb_a_id: str, kb_b_id: str, prompt: str = "", generate: bool = True) -> int:
+@observe_import("questions")
+async def process_questions_file(file_path: str, kb_a_id: str, kb_b_id: str, prompt: str = "", generate: bool = True, batch_id: Optional[int] = None) -> int:
 	"""Parse CSV/Excel file with a column named 'question' and create Question rows.
-	If generate=True, run pipeline per question and create GeneratedAnswer & ReviewTask.
+	If generate=True, enqueue one GenerationJob per question; the JobScheduler runs the
+	pipeline with bounded concurrency and creates GeneratedAnswer & ReviewTask.
 	Returns the number of questions processed.
 	"""
-	# Read file via pandas
-	if file_path.lower().endswith((".xlsx", ".xls")):
-		df = pd.read_excel(file_path)
-	else:
-		df = pd.read_csv(file_path, encoding_errors="ignore")
-	if "question" not in df.columns:
-		raise ValueError("questions file must contain a 'question' column")
-
-	texts: List[str] = [str(x) for x in df["question"].dropna().tolist()]
-	count = 0
-	async with AsyncSessionLocal() as db:
-		for qtext in texts:
-			q = Question(asked_text=qtext, status="pending")
-			db.add(q)
-			await db.flush()
-			count += 1
+	if batch_id is not None:
+		await update_batch(batch_id, ImportStatus.PROCESSING.value)
+	try:
+		# Read file via pandas
+		if file_path.lower().endswith((".xlsx", ".xls")):
+			df = pd.read_excel(file_path)
+		else:
+			df = pd.read_csv(file_path, encoding_errors="ignore")
+		if "question" not in df.columns:
+			raise ValueError("questions file must contain a 'question' column")
+
+		texts: List[str] = [str(x) for x in df["question"].dropna().tolist()]
+		count = len(texts)
+		async with AsyncSessionLocal() as db:
+			# 多行 INSERT 分块写入，并按 batch_id 取回自增 id 用于创建任务
+			scope = (Question.batch_id == batch_id) if batch_id is not None else None
+			question_ids = await bulk_insert(
+				db,
+				Question,
+				[{"asked_text": qtext, "status": "pending", "batch_id": batch_id, "meta_data": {}} for qtext in texts],
+				scope=scope,
+			)
 			if generate:
-				asyncio.create_task(_generate_and_store(q, kb_a_id=kb_a_id, kb_b_id=kb_b_id, prompt=prompt))
-		await db.commit()
+				now = datetime.utcnow()
+				await bulk_insert(
+					db,
+					GenerationJob,
+					[
+						{
+							"batch_id": batch_id,
+							"question_id": qid,
+							"kb_a_id": kb_a_id,
+							"kb_b_id": kb_b_id,
+							"prompt": prompt or "",
+							"status": JobStatus.QUEUED.value,
+							"attempts": 0,
+							"max_attempts": settings.generation_max_attempts,
+							"next_run_at": now,
+						}
+						for qid in question_ids
+					],
+					return_ids=False,
+				)
+			await db.commit()
+		counters.incr("questions", "pending", n=count)
+		if generate:
+			counters.incr("generation_jobs", JobStatus.QUEUED.value, n=count)
+	except Exception as e:
+		if batch_id is not None:
+			await update_batch(batch_id, ImportStatus.FAILED.value, message=str(e))
+		raise
+
+	if generate and count:
+		# 批次状态由 JobScheduler 在任务全部结束后收尾
+		from app.services.job_scheduler import job_scheduler
+		if batch_id is not None:
+			await job_scheduler.refresh_batch_progress(batch_id)
+		job_scheduler.notify()
+	elif batch_id is not None:
+		await update_batch(batch_id, ImportStatus.COMPLETED.value, message=f"processed={count}")
 	return count
@@ -0,0 +1,21 @@
+from typing import Any, Dict, Optional
+import sqlalchemy as sa
+
+from app.db.session import AsyncSessionLocal
+from app.models.models import ImportBatch
+
+
+async def update_batch(batch_id: int, status: str, message: Optional[str] = None, extra: Optional[Dict[str, Any]] = None) -> None:
+	"""在独立会话中更新导入批次的状态，message / extra 合并进 meta_data"""
+	async with AsyncSessionLocal() as db:
+		res = await db.execute(sa.select(ImportBatch).where(ImportBatch.id == batch_id))
+		b = res.scalar_one_or_none()
+		if b:
+			b.status = status
+			meta = dict(b.meta_data or {})
+			if message:
+				meta["message"] = message
+			if extra:
+				meta.update(extra)
+			b.meta_data = meta
+			await db.commit()
@@ -0,0 +1,67 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Set, Tuple
+import unicodedata
+
+from app.core.config import settings
+from app.utils.tokens import estimate_tokens, truncate_to_tokens
+
+_SEPARATOR_TOKENS = 1  # 块之间的 "\n\n"
+_SHINGLE = 5
+
+
+def _shingles(text: str) -> Set[str]:
+	norm = "".join(unicodedata.normalize("NFKC", text).lower().split())
+	if len(norm) <= _SHINGLE:
+		return {norm} if norm else set()
+	return {norm[i:i + _SHINGLE] for i in range(len(norm) - _SHINGLE + 1)}
+
+
+def pack_context(chunks: List[Dict[str, Any]], budget: Optional[int] = None, dedup_threshold: Optional[float] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+	"""按得分从高到低装入 token 预算，跳过与已选块重叠的块。
+
+	空正文的块不参与排序，单独计入 dropped_empty。
+	重叠判定：候选块的 5 字符 shingle 中，已被已选块覆盖的比例 >= dedup_threshold
+	（完全重复为 1.0；检索切片的首尾重叠、同一段落的不同切分均会命中）。
+	放不下的块跳过并继续尝试更短的块；首块本身超出预算时截断后装入。
+	返回 (实际使用的块, 统计)。
+	"""
+	budget = settings.context_token_budget if budget is None else budget
+	threshold = settings.context_dedup_threshold if dedup_threshold is None else dedup_threshold
+	candidates = [(c, _shingles(c.get("text") or "")) for c in chunks]
+	candidates = [(c, sh) for c, sh in candidates if sh]
+	ranked = sorted(candidates, key=lambda item: float(item[0].get("score") or 0.0), reverse=True)
+
+	used: List[Dict[str, Any]] = []
+	seen: Set[str] = set()
+	tokens = 0
+	duplicates = over_budget = 0
+	truncated = False
+	for chunk, shingles in ranked:
+		text = chunk.get("text") or ""
+		if len(shingles & seen) / len(shingles) >= threshold:
+			duplicates += 1
+			continue
+		cost = estimate_tokens(text) + (_SEPARATOR_TOKENS if used else 0)
+		if tokens + cost > budget:
+			if used or budget <= 0:
+				over_budget += 1
+				continue
+			text = truncate_to_tokens(text, budget)
+			chunk = {**chunk, "text": text, "truncated": True}
+			cost = estimate_tokens(text)
+			truncated = True
+		used.append(chunk)
+		seen |= shingles
+		tokens += cost
+
+	stats = {
+		"budget": budget,
+		"tokens": tokens,
+		"candidates": len(chunks),
+		"used": len(used),
+		"dropped_empty": len(chunks) - len(candidates),
+		"dropped_duplicate": duplicates,
+		"dropped_budget": over_budget,
+		"truncated": truncated,
+	}
+	return used, stats
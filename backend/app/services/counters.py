@@ -0,0 +1,129 @@
+from __future__ import annotations
+from typing import Any, Dict, Optional, Tuple, Type
+from datetime import datetime
+import asyncio
+import sqlalchemy as sa
+from loguru import logger
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, Base
+from app.models.models import (
+	GeneratedAnswer,
+	GenerationJob,
+	KnowledgeDoc,
+	PromptTemplate,
+	Question,
+	ReviewTask,
+	StandardAnswer,
+	StandardAnswerVersion,
+)
+
+TOTAL = "_total"
+
+# 表名 -> (模型, 按状态细分的列)；状态列为空的表只维护总数
+_TRACKED: Dict[str, Tuple[Type[Base], Optional[sa.Column]]] = {
+	"questions": (Question, Question.status),
+	"generated_answers": (GeneratedAnswer, None),
+	"review_tasks": (ReviewTask, ReviewTask.status),
+	"generation_jobs": (GenerationJob, GenerationJob.status),
+	"standard_answers": (StandardAnswer, None),
+	"standard_answer_versions": (StandardAnswerVersion, None),
+	"knowledge_docs": (KnowledgeDoc, None),
+	"prompt_templates": (PromptTemplate, None),
+}
+
+
+class Counters:
+	"""增量维护的行数计数器（按状态细分），供 /metrics 常数时间读取。
+
+	写路径（导入、生成、审核流转）在提交后调用 incr / move；后台任务每隔
+	metrics_reconcile_seconds 用 GROUP BY 重新统计，纠正异常路径或其他 worker 造成的漂移。
+	"""
+
+	def __init__(self) -> None:
+		self._counts: Dict[str, Dict[str, int]] = {name: {} for name in _TRACKED}
+		self.reconciled_at: Optional[datetime] = None
+		self._task: Optional[asyncio.Task] = None
+		self._lock: Optional[asyncio.Lock] = None
+
+	def incr(self, table: str, status: Optional[str] = None, n: int = 1) -> None:
+		if not n:
+			return
+		bucket = self._counts[table]
+		bucket[TOTAL] = bucket.get(TOTAL, 0) + n
+		if status is not None:
+			bucket[status] = bucket.get(status, 0) + n
+
+	def move(self, table: str, old: Optional[str], new: str, n: int = 1) -> None:
+		"""状态流转：总数不变"""
+		if not n or old == new:
+			return
+		bucket = self._counts[table]
+		if old is not None:
+			bucket[old] = bucket.get(old, 0) - n
+		bucket[new] = bucket.get(new, 0) + n
+
+	def total(self, table: str) -> int:
+		return self._counts[table].get(TOTAL, 0)
+
+	def by_status(self, table: str) -> Dict[str, int]:
+		return {k: v for k, v in self._counts[table].items() if k != TOTAL and v}
+
+	def snapshot(self) -> Dict[str, Any]:
+		return {
+			"totals": {name: self.total(name) for name in _TRACKED},
+			"by_status": {name: self.by_status(name) for name, (_, col) in _TRACKED.items() if col is not None},
+			"reconciled_at": self.reconciled_at.isoformat() if self.reconciled_at else None,
+		}
+
+	async def reconcile(self) -> None:
+		if self._lock is None:
+			self._lock = asyncio.Lock()
+		async with self._lock:
+			fresh: Dict[str, Dict[str, int]] = {}
+			async with AsyncSessionLocal() as db:
+				for name, (model, col) in _TRACKED.items():
+					if col is None:
+						res = await db.execute(sa.select(sa.func.count()).select_from(model))
+						fresh[name] = {TOTAL: int(res.scalar_one())}
+						continue
+					res = await db.execute(sa.select(col, sa.func.count()).group_by(col))
+					bucket = {status: int(n) for status, n in res.all() if status is not None}
+					bucket[TOTAL] = sum(bucket.values())
+					fresh[name] = bucket
+			if self.reconciled_at is not None:
+				drift = {name: fresh[name][TOTAL] - self.total(name) for name in _TRACKED if fresh[name][TOTAL] != self.total(name)}
+				if drift:
+					logger.info(f"counters reconciled, drift={drift}")
+			self._counts = fresh
+			self.reconciled_at = datetime.utcnow()
+
+	async def ensure_loaded(self) -> None:
+		if self.reconciled_at is None:
+			await self.reconcile()
+
+	async def start(self) -> None:
+		if self._task is None:
+			self._task = asyncio.create_task(self._loop())
+
+	async def stop(self) -> None:
+		if self._task is not None:
+			self._task.cancel()
+			try:
+				await self._task
+			except asyncio.CancelledError:
+				pass
+			self._task = None
+
+	async def _loop(self) -> None:
+		while True:
+			try:
+				await self.reconcile()
+			except asyncio.CancelledError:
+				raise
+			except Exception as e:
+				logger.warning(f"counters reconcile failed: {e}")
+			await asyncio.sleep(settings.metrics_reconcile_seconds)
+
+
+counters = Counters()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence
+import hashlib
+import json
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.models import EvidenceChunk
+
+
+def chunk_hash(text: str, metadata: Optional[Dict[str, Any]]) -> str:
+	"""证据块的内容地址：正文 + 规范化元数据的 SHA-256（迁移 0009 中的回填使用相同算法）"""
+	meta = json.dumps(metadata or {}, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+	return hashlib.sha256(f"{text}\x00{meta}".encode("utf-8")).hexdigest()
+
+
+# 块内容存入 evidence_chunks，其余字段（score、truncated 等）保留在引用中
+_STORED_FIELDS = ("text", "metadata")
+
+
+def _is_ref(chunk: Dict[str, Any]) -> bool:
+	return "chunk_id" in chunk and "text" not in chunk
+
+
+async def store_evidence(db: AsyncSession, *evidences: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+	"""把检索结果中的证据块写入 evidence_chunks（按哈希去重），返回以 chunk_id 代替正文与元数据的引用。
+	证据的其他顶层字段（如 packing）与块的其他字段（如 truncated）原样保留在引用中。
+
+	每批一次 INSERT（仅忽略唯一键冲突）写入新块，再按哈希一次取回 id；已是引用格式的输入原样返回。
+	"""
+	pending: Dict[str, Dict[str, Any]] = {}
+	for evidence in evidences:
+		for c in (evidence or {}).get("chunks", []):
+			if _is_ref(c):
+				continue
+			text = c.get("text") or ""
+			meta = c.get("metadata") or {}
+			pending.setdefault(chunk_hash(text, meta), {"text": text, "meta_data": meta})
+
+	ids: Dict[str, int] = {}
+	dialect = db.bind.dialect.name
+	hashes = list(pending)
+	size = settings.db_bulk_chunk_size
+	for i in range(0, len(hashes), size):
+		batch = hashes[i:i + size]
+		rows = [{"sha256": h, **pending[h]} for h in batch]
+		# 并发写入同一块时只忽略唯一键冲突；INSERT IGNORE 会连数据截断等错误一起吞掉
+		if dialect == "mysql":
+			stmt = mysql.insert(EvidenceChunk).values(rows)
+			stmt = stmt.on_duplicate_key_update(id=EvidenceChunk.id)
+		elif dialect == "sqlite":
+			stmt = sqlite.insert(EvidenceChunk).values(rows).on_conflict_do_nothing(index_elements=["sha256"])
+		else:
+			stmt = sa.insert(EvidenceChunk).values(rows)
+		await db.execute(stmt)
+		res = await db.execute(sa.select(EvidenceChunk.sha256, EvidenceChunk.id).where(EvidenceChunk.sha256.in_(batch)))
+		ids.update({sha: chunk_id for sha, chunk_id in res.all()})
+
+	refs: List[Dict[str, Any]] = []
+	for evidence in evidences:
+		chunks = []
+		for c in (evidence or {}).get("chunks", []):
+			if _is_ref(c):
+				chunks.append(c)
+				continue
+			sha = chunk_hash(c.get("text") or "", c.get("metadata") or {})
+			ref = {k: v for k, v in c.items() if k not in _STORED_FIELDS}
+			ref.update(chunk_id=ids[sha], score=float(c.get("score") or 0.0))
+			chunks.append(ref)
+		refs.append({**{k: v for k, v in (evidence or {}).items() if k != "chunks"}, "chunks": chunks})
+	return refs
+
+
+async def hydrate_evidence(db: AsyncSession, evidences: Sequence[Optional[Dict[str, Any]]]) -> List[Optional[Dict[str, Any]]]:
+	"""把引用格式的证据还原为完整块；所有证据共用一次批量查询。旧格式（内嵌正文）原样返回。"""
+	chunk_ids = {c["chunk_id"] for e in evidences if e for c in e.get("chunks", []) if _is_ref(c)}
+	rows: Dict[int, EvidenceChunk] = {}
+	if chunk_ids:
+		res = await db.execute(sa.select(EvidenceChunk).where(EvidenceChunk.id.in_(chunk_ids)))
+		rows = {r.id: r for r in res.scalars().all()}
+
+	hydrated: List[Optional[Dict[str, Any]]] = []
+	for evidence in evidences:
+		if not evidence:
+			hydrated.append(evidence)
+			continue
+		chunks = []
+		for c in evidence.get("chunks", []):
+			row = rows.get(c["chunk_id"]) if _is_ref(c) else None
+			if row is None:
+				chunks.append(c)
+				continue
+			chunks.append({**c, "chunk_id": row.id, "text": row.text, "score": c.get("score", 0.0), "metadata": row.meta_data or {}})
+		hydrated.append({**evidence, "chunks": chunks})
+	return hydrated
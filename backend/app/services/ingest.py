@@ -1,34 +1,202 @@
 from __future__ import annotations
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Set, Tuple
 from datetime import datetime
-from pathlib import Path
+from pathlib import PurePosixPath
+import asyncio
 import pandas as pd
 import sqlalchemy as sa
-import zipfile
 from loguru import logger
 
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.telemetry import observe_import
 from app.db.session import AsyncSessionLocal
-from app.models.models import KnowledgeDoc, ImportBatch, StandardAnswer, StandardAnswerVersion
+from app.db.bulk import bulk_insert
+from app.models.models import KnowledgeDoc, StandardAnswer, StandardAnswerVersion
 from app.models.enums import DocCategory, ImportStatus
 from app.clients.ragflow_client import RAGFlowClient
+from app.clients.retrieval_cache import retrieval_cache
+from app.services.batch_status import update_batch
+from app.services.counters import counters
+from app.services.upload_pipeline import UploadPipeline, UploadSource
+from app.services.zip_index import ZipIndex
+from app.services.standard_versions import active_versions, sync_pointers
+
+
+class _DocWriter:
+	"""缓冲 KnowledgeDoc 行：按内容哈希去重后按块多行 INSERT，再把带 doc_id 的上传任务投递给 uploader。
+
+	同一知识库中已存在相同哈希的文件视为 duplicate，直接跳过（不写库、不上传）；
+	哈希是新的但此前导入过同一 source_key（压缩包内路径或磁盘路径）的文档视为 changed；其余为 new。
+	changed 的新版本上传成功后，finalize 从 RAGFlow 删除被替换的旧文档（连同其切片）并删除旧 KnowledgeDoc 行；
+	内容哈希出现在本次导入中的旧行不会被删除。
+	"""
+
+	def __init__(self, db: AsyncSession, uploader: UploadPipeline, kb_id: str, batch_id: Optional[int]) -> None:
+		self.db = db
+		self.uploader = uploader
+		self.kb_id = kb_id
+		self.batch_id = batch_id
+		self.pending: List[Tuple[Dict[str, Any], Optional[UploadSource], Dict[str, Any]]] = []
+		self._seen: Set[str] = set()
+		# 本次导入开始前的最大 id：只有 id 不超过它的行才算"此前的导入"
+		self._baseline: Optional[int] = None
+		self.new = 0
+		self.duplicate = 0
+		self.changed = 0
+		self.replaced = 0
+		self.replace_failed = 0
+		self._changed_docs: Dict[int, str] = {}  # 新 KnowledgeDoc.id -> source_key
+
+	async def add(self, row: Dict[str, Any], source: Optional[UploadSource], upload_meta: Dict[str, Any]) -> None:
+		sha = await asyncio.to_thread(source.sha256) if source else None
+		if sha is not None:
+			if sha in self._seen:
+				self.duplicate += 1
+				return
+			self._seen.add(sha)
+		row["batch_id"] = self.batch_id
+		row["kb_id"] = self.kb_id
+		row["content_sha256"] = sha
+		row["source_key"] = _source_key(row.get("source_path"))
+		self.pending.append((row, source, upload_meta))
+		if len(self.pending) >= settings.db_bulk_chunk_size:
+			await self.flush()
+
+	async def flush(self) -> None:
+		if not self.pending:
+			return
+		if self._baseline is None:
+			self._baseline = (await self.db.execute(sa.select(sa.func.max(KnowledgeDoc.id)))).scalar() or 0
+		pending, self.pending = self.pending, []
+		hashes = [r["content_sha256"] for r, _, _ in pending if r["content_sha256"]]
+		existing: Set[str] = set()
+		if hashes:
+			res = await self.db.execute(
+				sa.select(KnowledgeDoc.content_sha256)
+				.where(KnowledgeDoc.kb_id == self.kb_id, KnowledgeDoc.content_sha256.in_(hashes))
+			)
+			existing = set(res.scalars().all())
+		fresh = [p for p in pending if p[0]["content_sha256"] not in existing]
+		self.duplicate += len(pending) - len(fresh)
+		if not fresh:
+			return
+
+		keys = list({r["source_key"] for r, _, _ in fresh if r["source_key"]})
+		known_keys: Set[str] = set()
+		if keys:
+			res = await self.db.execute(
+				sa.select(KnowledgeDoc.source_key)
+				.where(KnowledgeDoc.kb_id == self.kb_id, KnowledgeDoc.source_key.in_(keys), KnowledgeDoc.id <= self._baseline)
+				.distinct()
+			)
+			known_keys = set(res.scalars().all())
+		scope = (KnowledgeDoc.batch_id == self.batch_id) if self.batch_id is not None else None
+		ids = await bulk_insert(self.db, KnowledgeDoc, [p[0] for p in fresh], scope=scope)
+		for (r, source, upload_meta), doc_id in zip(fresh, ids):
+			if r["source_key"] in known_keys:
+				self.changed += 1
+				self._changed_docs[doc_id] = r["source_key"]
+			else:
+				self.new += 1
+			if source:
+				await self.uploader.submit(source, {"doc_id": doc_id, **upload_meta})
 
+	async def finalize(self, rag: RAGFlowClient) -> None:
+		"""上传结束后调用：记录 RAGFlow 文档 id，并用上传成功的新版本替换同一 source_key 的旧文档。
 
-async def _update_batch(batch_id: int, status: str, message: Optional[str] = None) -> None:
-	async with AsyncSessionLocal() as db:
-		res = await db.execute(sa.select(ImportBatch).where(ImportBatch.id == batch_id))
-		b = res.scalar_one_or_none()
-		if b:
-			b.status = status
-			meta = dict(b.meta_data or {})
-			if message:
-				meta["message"] = message
-			b.meta_data = meta
+		旧文档有 ragflow_doc_id 时按 id 删除；早期导入的行没有该 id，按原文件名在 RAGFlow 中查找
+		（排除本次上传的文档）。RAGFlow 中的文档名只有文件名，若知识库中还有其他路径的同名文档，
+		无法区分，保留旧行并记入 replace_failed；RAGFlow 删除失败时同样保留旧行。
+		"""
+		uploaded = self.uploader.uploaded_docs
+		async with AsyncSessionLocal() as db:
+			rows = [{"_id": doc_id, "_rid": rid} for doc_id, rid in uploaded.items() if rid]
+			if rows:
+				await db.execute(
+					sa.update(KnowledgeDoc.__table__)
+					.where(KnowledgeDoc.__table__.c.id == sa.bindparam("_id"))
+					.values(ragflow_doc_id=sa.bindparam("_rid")),
+					rows,
+				)
+			replacements = {doc_id: key for doc_id, key in self._changed_docs.items() if doc_id in uploaded}
+			if replacements:
+				new_rids = {rid for rid in uploaded.values() if rid}
+				stale = (await db.execute(
+					sa.select(KnowledgeDoc.id, KnowledgeDoc.title, KnowledgeDoc.source_key, KnowledgeDoc.ragflow_doc_id, KnowledgeDoc.content_sha256)
+					.where(
+						KnowledgeDoc.kb_id == self.kb_id,
+						KnowledgeDoc.source_key.in_(set(replacements.values())),
+						KnowledgeDoc.id <= (self._baseline or 0),
+					)
+				)).all()
+				stale = [old for old in stale if old.content_sha256 is None or old.content_sha256 not in self._seen]
+				stale_ids = {old.id for old in stale}
+				removed: List[int] = []
+				for old in stale:
+					try:
+						if old.ragflow_doc_id:
+							rids = [old.ragflow_doc_id]
+						else:
+							name = _upload_name(old.source_key)
+							if name and await self._name_shared(db, name, old.source_key, stale_ids):
+								self.replace_failed += 1
+								logger.warning(f"Not deleting superseded knowledge doc {old.id} ({old.source_key}): RAGFlow document name {name} is shared with other paths")
+								continue
+							rids = [d["id"] for d in await rag.find_documents(self.kb_id, name) if d.get("id") not in new_rids] if name else []
+						if rids:
+							await rag.delete_documents(self.kb_id, rids)
+						removed.append(old.id)
+					except Exception as e:
+						self.replace_failed += 1
+						logger.warning(f"Failed to delete superseded RAGFlow document for knowledge doc {old.id} ({old.source_key}): {e}")
+				if removed:
+					await db.execute(sa.delete(KnowledgeDoc).where(KnowledgeDoc.id.in_(removed)))
+				self.replaced += len(removed)
 			await db.commit()
 
+	async def _name_shared(self, db: AsyncSession, name: str, key: str, stale_ids: Set[int]) -> bool:
+		"""知识库中是否还有其他路径的文档以同一文件名上传（被替换的行除外）"""
+		res = await db.execute(
+			sa.select(KnowledgeDoc.id)
+			.where(
+				KnowledgeDoc.kb_id == self.kb_id,
+				KnowledgeDoc.source_key != key,
+				sa.or_(KnowledgeDoc.source_key == name, KnowledgeDoc.source_key.endswith(f"/{name}", autoescape=True)),
+			)
+		)
+		return any(doc_id not in stale_ids for doc_id in res.scalars().all())
+
+	def summary(self) -> Dict[str, int]:
+		return {"new": self.new, "duplicate": self.duplicate, "changed": self.changed, "replaced": self.replaced, "replace_failed": self.replace_failed}
+
+	def message(self) -> str:
+		return f"new={self.new} duplicate={self.duplicate} changed={self.changed} replaced={self.replaced} replace_failed={self.replace_failed}"
+
+
+def _source_key(source_path: Optional[str]) -> Optional[str]:
+	"""文档身份：压缩包条目取包内路径（不含每次上传都不同的压缩包路径），其余取规范化后的磁盘路径"""
+	if not source_path:
+		return None
+	path = source_path.replace("\\", "/")
+	if "!/" in path:
+		path = path.split("!/", 1)[1]
+	key = str(PurePosixPath(path.lstrip("/")))
+	return key if key not in ("", ".") else None
 
-async def process_knowledge_a_file(file_path: str, kb_a_id: str, default_category: str = DocCategory.ANNOUNCEMENT.value, batch_id: Optional[int] = None) -> int:
+
+def _upload_name(source_key: Optional[str]) -> Optional[str]:
+	"""上传时使用的文件名：source_key 的最后一段"""
+	if not source_key:
+		return None
+	return PurePosixPath(source_key).name or None
+
+
+@observe_import("knowledge_a_file")
+async def process_knowledge_a_file(file_path: str, kb_a_id: str, default_category: str = DocCategory.ANNOUNCEMENT.value, batch_id: Optional[int] = None, upload_concurrency: Optional[int] = None) -> int:
 	if batch_id is not None:
-		await _update_batch(batch_id, ImportStatus.PROCESSING.value)
+		await update_batch(batch_id, ImportStatus.PROCESSING.value)
 	try:
 		if file_path.lower().endswith((".xlsx", ".xls")):
 			df = pd.read_excel(file_path)
@@ -38,7 +206,8 @@ async def process_knowledge_a_file(file_path: str, kb_a_id: str, default_categor
 		rows = df.to_dict(orient="records")
 		count = 0
 		rag = RAGFlowClient()
-		async with AsyncSessionLocal() as db:
+		async with AsyncSessionLocal() as db, UploadPipeline(rag, kb_a_id, upload_concurrency) as uploader:
+			writer = _DocWriter(db, uploader, kb_a_id, batch_id)
 			for r in rows:
 				title = str(r.get("title") or "").strip()
 				if not title:
@@ -52,99 +221,153 @@ async def process_knowledge_a_file(file_path: str, kb_a_id: str, default_categor
 						disclosure_date = datetime.fromisoformat(str(disclosure_date)).date()
 					except Exception:
 						disclosure_date = None
-				kd = KnowledgeDoc(
-					title=title,
-					category=category,
-					source_path=source_path,
-					source_url=source_url,
-					disclosure_date=disclosure_date,
+				await writer.add(
+					{
+						"title": title,
+						"category": category,
+						"source_path": source_path,
+						"source_url": source_url,
+						"disclosure_date": disclosure_date,
+						"meta_data": {},
+					},
+					UploadSource.from_path(str(source_path)) if source_path else None,
+					{"category": category},
 				)
-				db.add(kd)
-				await db.flush()
-				if source_path:
-					try:
-						await rag.upload_document(file_path=source_path, kb_id=kb_a_id, metadata={"doc_id": kd.id, "category": category})
-					except Exception as e:
-						print(f"[WARNING] Failed to upload to RAGFlow: {e}")
 				count += 1
+			await writer.flush()
 			await db.commit()
+		await writer.finalize(rag)
+		counters.incr("knowledge_docs", n=writer.new + writer.changed - writer.replaced)
+		await rag.flush_parse()
+		retrieval_cache.invalidate_kb(kb_a_id)
 		if batch_id is not None:
-			await _update_batch(batch_id, ImportStatus.COMPLETED.value, message=f"processed={count}")
+			await update_batch(batch_id, ImportStatus.COMPLETED.value, message=f"processed={count} {writer.message()} {uploader.summary()}", extra={"dedup": writer.summary()})
 		return count
 	except Exception as e:
 		if batch_id is not None:
-			await _update_batch(batch_id, ImportStatus.FAILED.value, message=str(e))
+			await update_batch(batch_id, ImportStatus.FAILED.value, message=str(e))
 		raise
 
 
+def _blank(v: Any) -> bool:
+	return v is None or (isinstance(v, float) and pd.isna(v)) or (isinstance(v, str) and not v.strip())
+
+
+def _parse_dt(v: Any) -> Optional[datetime]:
+	if _blank(v):
+		return None
+	try:
+		return datetime.fromisoformat(str(v))
+	except Exception:
+		return None
+
+
+def _parse_bool(v: Any) -> bool:
+	if _blank(v):
+		return False
+	if isinstance(v, str):
+		return v.strip().lower() not in ("0", "false", "no", "n", "否")
+	return bool(v)
+
+
+async def _load_standard_heads(db: AsyncSession, topic_keys: List[str]) -> Dict[str, Tuple[int, int]]:
+	"""topic_key -> (standard_answer_id, 当前最大版本号)；每块一次 LEFT JOIN + GROUP BY 查询"""
+	heads: Dict[str, Tuple[int, int]] = {}
+	size = settings.db_bulk_chunk_size
+	for i in range(0, len(topic_keys), size):
+		chunk = topic_keys[i:i + size]
+		res = await db.execute(
+			sa.select(StandardAnswer.id, StandardAnswer.topic_key, sa.func.coalesce(sa.func.max(StandardAnswerVersion.version), 0))
+			.outerjoin(StandardAnswerVersion, StandardAnswerVersion.standard_answer_id == StandardAnswer.id)
+			.where(StandardAnswer.topic_key.in_(chunk))
+			.group_by(StandardAnswer.id, StandardAnswer.topic_key)
+		)
+		for sa_id, topic_key, max_version in res.all():
+			heads[topic_key] = (int(sa_id), int(max_version))
+	return heads
+
+
+@observe_import("standards_b")
 async def process_standards_b_file(file_path: str, batch_id: Optional[int] = None) -> int:
+	"""集合式导入标准回答：预加载所有 topic_key 及其当前最大版本，内存中计算版本号，
+	再批量写入新的标准回答头与版本，整个文件在一个事务内完成。"""
 	if batch_id is not None:
-		await _update_batch(batch_id, ImportStatus.PROCESSING.value)
+		await update_batch(batch_id, ImportStatus.PROCESSING.value)
 	try:
 		if file_path.lower().endswith((".xlsx", ".xls")):
 			df = pd.read_excel(file_path)
 		else:
 			df = pd.read_csv(file_path, encoding_errors="ignore")
 		rows = df.to_dict(orient="records")
-		count = 0
+
+		entries: List[Dict[str, Any]] = []
+		descriptions: Dict[str, Optional[str]] = {}
+		for r in rows:
+			topic_key = "" if _blank(r.get("topic_key")) else str(r.get("topic_key")).strip()
+			content = "" if _blank(r.get("content")) else str(r.get("content")).strip()
+			if not topic_key or not content:
+				continue
+			desc = r.get("description")
+			descriptions.setdefault(topic_key, None if _blank(desc) else str(desc))
+			entries.append({
+				"topic_key": topic_key,
+				"content": content,
+				"strong_constraint": _parse_bool(r.get("strong_constraint")),
+				"effective_from": _parse_dt(r.get("effective_from")),
+				"effective_to": _parse_dt(r.get("effective_to")),
+			})
+
+		topic_keys = list(descriptions)
 		async with AsyncSessionLocal() as db:
-			for r in rows:
-				topic_key = str(r.get("topic_key") or "").strip()
-				content = str(r.get("content") or "").strip()
-				if not topic_key or not content:
-					continue
-				strong = bool(r.get("strong_constraint") or False)
-				desc = r.get("description")
-				def _parse_dt(v):
-					if not v:
-						return None
-					try:
-						return datetime.fromisoformat(str(v))
-					except Exception:
-						return None
-				eff_from = _parse_dt(r.get("effective_from"))
-				eff_to = _parse_dt(r.get("effective_to"))
-
-				res = await db.execute(sa.select(StandardAnswer).where(StandardAnswer.topic_key == topic_key))
-				sa_obj = res.scalar_one_or_none()
-				if not sa_obj:
-					sa_obj = StandardAnswer(topic_key=topic_key, description=desc)
-					db.add(sa_obj)
-					await db.flush()
-				res_ver = await db.execute(sa.select(sa.func.coalesce(sa.func.max(StandardAnswerVersion.version), 0)).where(StandardAnswerVersion.standard_answer_id == sa_obj.id))
-				current_max = int(res_ver.scalar_one()) if res_ver.scalar() is not None else 0
-				next_version = current_max + 1
-				sav = StandardAnswerVersion(
-					standard_answer_id=sa_obj.id,
-					version=next_version,
-					content=content,
-					strong_constraint=strong,
-					effective_from=eff_from,
-					effective_to=eff_to,
+			heads = await _load_standard_heads(db, topic_keys)
+			missing = [k for k in topic_keys if k not in heads]
+			if missing:
+				await bulk_insert(
+					db,
+					StandardAnswer,
+					[{"topic_key": k, "description": descriptions[k]} for k in missing],
+					return_ids=False,
 				)
-				db.add(sav)
-				count += 1
+				# topic_key 唯一，新插入的头直接按 topic_key 取回 id
+				heads.update(await _load_standard_heads(db, missing))
+
+			versions: List[Dict[str, Any]] = []
+			for e in entries:
+				sa_id, current_max = heads[e["topic_key"]]
+				next_version = current_max + 1
+				heads[e["topic_key"]] = (sa_id, next_version)
+				versions.append({
+					"standard_answer_id": sa_id,
+					"version": next_version,
+					"content": e["content"],
+					"strong_constraint": e["strong_constraint"],
+					"effective_from": e["effective_from"],
+					"effective_to": e["effective_to"],
+					"meta_data": {},
+				})
+			await bulk_insert(db, StandardAnswerVersion, versions, return_ids=False)
+			touched = [heads[k][0] for k in topic_keys]
+			await sync_pointers(db, touched)
 			await db.commit()
+		await active_versions.refresh(touched)
+		counters.incr("standard_answers", n=len(missing))
+		counters.incr("standard_answer_versions", n=len(versions))
+		count = len(versions)
 		if batch_id is not None:
-			await _update_batch(batch_id, ImportStatus.COMPLETED.value, message=f"processed={count}")
+			await update_batch(batch_id, ImportStatus.COMPLETED.value, message=f"processed={count} new_topics={len(missing)}")
 		return count
 	except Exception as e:
 		if batch_id is not None:
-			await _update_batch(batch_id, ImportStatus.FAILED.value, message=str(e))
+			await update_batch(batch_id, ImportStatus.FAILED.value, message=str(e))
 		raise
 
 
-async def process_knowledge_a_hybrid(csv_path: str, zip_path: str, kb_a_id: str, batch_id: Optional[int] = None) -> int:
+@observe_import("knowledge_a_hybrid")
+async def process_knowledge_a_hybrid(csv_path: str, zip_path: str, kb_a_id: str, batch_id: Optional[int] = None, upload_concurrency: Optional[int] = None) -> int:
 	"""混合模式：CSV提供元数据，ZIP包含PDF/DOCX，通过filename列匹配"""
 	if batch_id is not None:
-		await _update_batch(batch_id, ImportStatus.PROCESSING.value)
+		await update_batch(batch_id, ImportStatus.PROCESSING.value)
 	try:
-		# 解压 ZIP 到临时目录
-		zip_extract_dir = Path(zip_path).parent / f"{Path(zip_path).stem}_extracted"
-		zip_extract_dir.mkdir(exist_ok=True)
-		with zipfile.ZipFile(zip_path, 'r') as zf:
-			zf.extractall(zip_extract_dir)
-		
 		# 读取 CSV
 		if csv_path.lower().endswith((".xlsx", ".xls")):
 			df = pd.read_excel(csv_path)
@@ -154,111 +377,115 @@ async def process_knowledge_a_hybrid(csv_path: str, zip_path: str, kb_a_id: str,
 		rows = df.to_dict(orient="records")
 		count = 0
 		rag = RAGFlowClient()
-		async with AsyncSessionLocal() as db:
-			for r in rows:
-				title = str(r.get("title") or "").strip()
-				filename = str(r.get("filename") or "").strip()
-				if not title or not filename:
-					continue
-				
-				category = str(r.get("category") or DocCategory.ANNOUNCEMENT.value)
-				source_url = r.get("source_url")
-				disclosure_date = r.get("disclosure_date")
-				description = r.get("description")
-				
-				if disclosure_date:
-					try:
-						disclosure_date = datetime.fromisoformat(str(disclosure_date)).date()
-					except Exception:
-						disclosure_date = None
-				
-				# 在解压目录中查找文件（支持嵌套）
-				file_path = None
-				for p in zip_extract_dir.rglob(filename):
-					file_path = str(p)
-					break
-				
-				if not file_path:
-					continue  # 文件不存在，跳过
-				
-				kd = KnowledgeDoc(
-					title=title,
-					category=category,
-					source_path=file_path,
-					source_url=source_url,
-					disclosure_date=disclosure_date,
-					meta_data={"description": description} if description else None
-				)
-				db.add(kd)
-				await db.flush()
-				
-				# 上传到 RAGFlow
-				try:
-					await rag.upload_document(file_path=file_path, kb_id=kb_a_id, metadata={"doc_id": kd.id, "category": category, "title": title})
-				except Exception as e:
-					logger.warning(f"Failed to upload to RAGFlow: {file_path} - {e}")
-				
-				count += 1
-			await db.commit()
+		# 一次遍历中央目录建立文件名索引，条目直接从压缩包读取，无需解压到磁盘
+		zip_index = await asyncio.to_thread(ZipIndex, zip_path)
+		with zip_index:
+			async with AsyncSessionLocal() as db, UploadPipeline(rag, kb_a_id, upload_concurrency) as uploader:
+				writer = _DocWriter(db, uploader, kb_a_id, batch_id)
+				for r in rows:
+					title = str(r.get("title") or "").strip()
+					filename = str(r.get("filename") or "").strip()
+					if not title or not filename:
+						continue
+					
+					category = str(r.get("category") or DocCategory.ANNOUNCEMENT.value)
+					source_url = r.get("source_url")
+					disclosure_date = r.get("disclosure_date")
+					description = r.get("description")
+					
+					if disclosure_date:
+						try:
+							disclosure_date = datetime.fromisoformat(str(disclosure_date)).date()
+						except Exception:
+							disclosure_date = None
+					
+					# O(1) 查找压缩包内文件（支持嵌套目录，忽略大小写与全角/半角差异）
+					info = zip_index.lookup(filename)
+					if info is None:
+						continue  # 文件不存在，跳过
+					source = zip_index.source(info)
+					
+					# 批量写库后投递到上传队列，由 worker 并发上传到 RAGFlow
+					await writer.add(
+						{
+							"title": title,
+							"category": category,
+							"source_path": source.location,
+							"source_url": source_url,
+							"disclosure_date": disclosure_date,
+							"meta_data": {"description": description} if description else None,
+						},
+						source,
+						{"category": category, "title": title},
+					)
+					
+					count += 1
+				await writer.flush()
+				await db.commit()
+		await writer.finalize(rag)
+		counters.incr("knowledge_docs", n=writer.new + writer.changed - writer.replaced)
+		await rag.flush_parse()
+		retrieval_cache.invalidate_kb(kb_a_id)
 		
 		if batch_id is not None:
-			await _update_batch(batch_id, ImportStatus.COMPLETED.value, message=f"processed={count}")
+			await update_batch(batch_id, ImportStatus.COMPLETED.value, message=f"processed={count} {writer.message()} {uploader.summary()}", extra={"dedup": writer.summary()})
 		return count
 	except Exception as e:
 		if batch_id is not None:
-			await _update_batch(batch_id, ImportStatus.FAILED.value, message=str(e))
+			await update_batch(batch_id, ImportStatus.FAILED.value, message=str(e))
 		raise
 
 
-async def process_knowledge_a_zip(zip_path: str, kb_a_id: str, default_category: str = DocCategory.ANNOUNCEMENT.value, batch_id: Optional[int] = None) -> int:
+@observe_import("knowledge_a_zip")
+async def process_knowledge_a_zip(zip_path: str, kb_a_id: str, default_category: str = DocCategory.ANNOUNCEMENT.value, batch_id: Optional[int] = None, upload_concurrency: Optional[int] = None) -> int:
 	"""纯ZIP模式：自动从文件名提取标题，批量上传PDF/DOCX到RAGFlow A"""
 	if batch_id is not None:
-		await _update_batch(batch_id, ImportStatus.PROCESSING.value)
+		await update_batch(batch_id, ImportStatus.PROCESSING.value)
 	try:
-		# 解压 ZIP
-		zip_extract_dir = Path(zip_path).parent / f"{Path(zip_path).stem}_extracted"
-		zip_extract_dir.mkdir(exist_ok=True)
-		with zipfile.ZipFile(zip_path, 'r') as zf:
-			zf.extractall(zip_extract_dir)
+		# 直接遍历压缩包条目，无需解压到磁盘
+		zip_index = await asyncio.to_thread(ZipIndex, zip_path)
 		
 		# 遍历所有 PDF/DOCX 文件
 		count = 0
 		rag = RAGFlowClient()
-		async with AsyncSessionLocal() as db:
-			for file_path in zip_extract_dir.rglob("*"):
-				if not file_path.is_file():
-					continue
-				ext = file_path.suffix.lower()
-				if ext not in [".pdf", ".docx", ".doc"]:
-					continue
-				
-				# 从文件名提取标题（去掉扩展名）
-				title = file_path.stem
-				
-				kd = KnowledgeDoc(
-					title=title,
-					category=default_category,
-					source_path=str(file_path),
-					source_url=None,
-					disclosure_date=None,
-				)
-				db.add(kd)
-				await db.flush()
-				
-				# 上传到 RAGFlow
-				try:
-					await rag.upload_document(file_path=str(file_path), kb_id=kb_a_id, metadata={"doc_id": kd.id, "category": default_category, "title": title})
-				except Exception as e:
-					logger.warning(f"Failed to upload to RAGFlow: {file_path} - {e}")
-					# 继续处理，不中断流程
-				
-				count += 1
-			await db.commit()
+		with zip_index:
+			async with AsyncSessionLocal() as db, UploadPipeline(rag, kb_a_id, upload_concurrency) as uploader:
+				writer = _DocWriter(db, uploader, kb_a_id, batch_id)
+				for info in zip_index.entries():
+					name = PurePosixPath(zip_index.name_of(info))
+					if name.suffix.lower() not in [".pdf", ".docx", ".doc"]:
+						continue
+					
+					# 从文件名提取标题（去掉扩展名）
+					title = name.stem
+					source = zip_index.source(info)
+					
+					# 批量写库后投递到上传队列，由 worker 并发上传到 RAGFlow（失败不中断流程）
+					await writer.add(
+						{
+							"title": title,
+							"category": default_category,
+							"source_path": source.location,
+							"source_url": None,
+							"disclosure_date": None,
+							"meta_data": {},
+						},
+						source,
+						{"category": default_category, "title": title},
+					)
+					
+					count += 1
+				await writer.flush()
+				await db.commit()
+		await writer.finalize(rag)
+		counters.incr("knowledge_docs", n=writer.new + writer.changed - writer.replaced)
+		await rag.flush_parse()
+		retrieval_cache.invalidate_kb(kb_a_id)
 		
 		if batch_id is not None:
-			await _update_batch(batch_id, ImportStatus.COMPLETED.value, message=f"processed={count}")
+			await update_batch(batch_id, ImportStatus.COMPLETED.value, message=f"processed={count} {writer.message()} {uploader.summary()}", extra={"dedup": writer.summary()})
 		return count
 	except Exception as e:
 		if batch_id is not None:
-			await _update_batch(batch_id, ImportStatus.FAILED.value, message=str(e))
+			await update_batch(batch_id, ImportStatus.FAILED.value, message=str(e))
 		raise
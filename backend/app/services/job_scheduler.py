@@ -0,0 +1,269 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Set
+from datetime import datetime, timedelta
+import asyncio
+import time
+import sqlalchemy as sa
+from loguru import logger
+
+from app.clients.priority import Lane, priority_lane
+from app.core.config import settings
+from app.core.telemetry import BACKGROUND_TASKS
+from app.db.session import AsyncSessionLocal
+from app.models.models import GenerationJob, ImportBatch, Question
+from app.models.enums import ImportStatus, JobStatus
+from app.services.batch_processor import generate_and_store
+from app.services.counters import counters
+
+
+class JobScheduler:
+	"""DB 持久化的批量生成调度器。
+
+	- 通过 SELECT ... FOR UPDATE SKIP LOCKED 领取任务，多 worker 部署下不会重复执行；
+	- 同时运行的任务数不超过 generation_concurrency；
+	- 失败按指数退避重试，超过 max_attempts 标记为 failed；
+	- 运行中的任务定期刷新 updated_at（心跳），在优先级闸门排队的任务不会被当作崩溃回收；
+	- 每个任务结束后把批次进度写回 ImportBatch.meta_data["jobs"]。
+	"""
+
+	def __init__(self, concurrency: Optional[int] = None, poll_interval: Optional[float] = None) -> None:
+		self.concurrency = concurrency or settings.generation_concurrency
+		self.poll_interval = poll_interval or settings.job_poll_interval_seconds
+		self._running: Set[asyncio.Task] = set()
+		self._loop_task: Optional[asyncio.Task] = None
+		self._wakeup: Optional[asyncio.Event] = None
+		self._stopping = False
+		self._last_recover = 0.0
+
+	@property
+	def in_flight(self) -> int:
+		return len(self._running)
+
+	def notify(self) -> None:
+		"""有新任务入队时唤醒调度循环，避免等待一个完整的轮询周期"""
+		if self._wakeup is not None:
+			self._wakeup.set()
+
+	async def start(self) -> None:
+		if self._loop_task is not None:
+			return
+		self._stopping = False
+		self._wakeup = asyncio.Event()
+		self._loop_task = asyncio.create_task(self._loop())
+		logger.info(f"job scheduler started (concurrency={self.concurrency})")
+
+	async def stop(self) -> None:
+		self._stopping = True
+		self.notify()
+		if self._loop_task is not None:
+			self._loop_task.cancel()
+			try:
+				await self._loop_task
+			except asyncio.CancelledError:
+				pass
+			self._loop_task = None
+		# 未完成的任务保持 running，重启后由 _recover_stale 重新入队
+		for task in list(self._running):
+			task.cancel()
+		if self._running:
+			await asyncio.gather(*self._running, return_exceptions=True)
+
+	async def _loop(self) -> None:
+		while not self._stopping:
+			claimed = 0
+			try:
+				if time.monotonic() - self._last_recover >= 60:
+					await self._recover_stale()
+					self._last_recover = time.monotonic()
+				free = self.concurrency - len(self._running)
+				if free > 0:
+					for job_id in await self._claim(free):
+						task = asyncio.create_task(self._run(job_id))
+						self._running.add(task)
+						task.add_done_callback(self._on_done)
+						claimed += 1
+			except asyncio.CancelledError:
+				raise
+			except Exception as e:
+				logger.exception(f"job scheduler loop error: {e}")
+			# 本轮领满则立即继续，否则等待唤醒或下一个轮询周期
+			if claimed and len(self._running) < self.concurrency:
+				continue
+			assert self._wakeup is not None
+			try:
+				await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+			except asyncio.TimeoutError:
+				pass
+			self._wakeup.clear()
+
+	def _on_done(self, task: asyncio.Task) -> None:
+		self._running.discard(task)
+		self.notify()
+
+	async def _recover_stale(self) -> None:
+		"""回收超时的 running 任务：尚有重试次数的重新入队，已用尽的标记为 failed（避免反复拖垮 worker 的任务无限重试）"""
+		now = datetime.utcnow()
+		cutoff = now - timedelta(seconds=settings.job_stale_after_seconds)
+		stale = (GenerationJob.status == JobStatus.RUNNING.value, GenerationJob.updated_at < cutoff)
+		async with AsyncSessionLocal() as db:
+			res_f = await db.execute(
+				sa.select(GenerationJob.id, GenerationJob.question_id, GenerationJob.batch_id)
+				.where(*stale, GenerationJob.attempts >= GenerationJob.max_attempts)
+				.with_for_update(skip_locked=True)
+			)
+			exhausted = res_f.all()
+			question_moves: Dict[Optional[str], int] = {}
+			if exhausted:
+				await db.execute(
+					sa.update(GenerationJob)
+					.where(GenerationJob.id.in_([r.id for r in exhausted]))
+					.values(status=JobStatus.FAILED.value, last_error="worker lost while running; max attempts reached", updated_at=now)
+				)
+				question_ids = {r.question_id for r in exhausted}
+				res_q = await db.execute(sa.select(Question.status).where(Question.id.in_(question_ids)))
+				for status in res_q.scalars().all():
+					question_moves[status] = question_moves.get(status, 0) + 1
+				await db.execute(sa.update(Question).where(Question.id.in_(question_ids)).values(status="failed"))
+			res = await db.execute(
+				sa.update(GenerationJob)
+				.where(*stale, GenerationJob.attempts < GenerationJob.max_attempts)
+				.values(status=JobStatus.QUEUED.value, next_run_at=now, updated_at=now)
+			)
+			await db.commit()
+		counters.move("generation_jobs", JobStatus.RUNNING.value, JobStatus.QUEUED.value, n=res.rowcount)
+		counters.move("generation_jobs", JobStatus.RUNNING.value, JobStatus.FAILED.value, n=len(exhausted))
+		for status, n in question_moves.items():
+			counters.move("questions", status, "failed", n=n)
+		if res.rowcount:
+			logger.warning(f"requeued {res.rowcount} stale generation jobs")
+		if exhausted:
+			logger.warning(f"marked {len(exhausted)} stale generation jobs failed after max attempts")
+			for batch_id in {r.batch_id for r in exhausted if r.batch_id is not None}:
+				await self.refresh_batch_progress(batch_id)
+
+	async def _claim(self, limit: int) -> List[int]:
+		now = datetime.utcnow()
+		async with AsyncSessionLocal() as db:
+			res = await db.execute(
+				sa.select(GenerationJob)
+				.where(GenerationJob.status == JobStatus.QUEUED.value, GenerationJob.next_run_at <= now)
+				.order_by(GenerationJob.next_run_at, GenerationJob.id)
+				.limit(limit)
+				.with_for_update(skip_locked=True)
+			)
+			jobs = res.scalars().all()
+			for job in jobs:
+				job.status = JobStatus.RUNNING.value
+				job.attempts = (job.attempts or 0) + 1
+				job.updated_at = now
+			await db.commit()
+			counters.move("generation_jobs", JobStatus.QUEUED.value, JobStatus.RUNNING.value, n=len(jobs))
+			return [job.id for job in jobs]
+
+	def _backoff(self, attempts: int) -> float:
+		delay = settings.generation_retry_base_seconds * (2 ** max(attempts - 1, 0))
+		return min(delay, settings.generation_retry_max_seconds)
+
+	async def _run(self, job_id: int) -> None:
+		async with AsyncSessionLocal() as db:
+			res = await db.execute(
+				sa.select(GenerationJob, Question.asked_text)
+				.join(Question, Question.id == GenerationJob.question_id)
+				.where(GenerationJob.id == job_id)
+			)
+			row = res.one_or_none()
+		if row is None:
+			return
+		job, asked_text = row
+		heartbeat = asyncio.create_task(self._heartbeat(job_id, job.attempts))
+		try:
+			# 批量通道：外部调用让位于交互式 QA；成功状态与回答同一事务提交
+			with priority_lane(Lane.BATCH):
+				stored = await generate_and_store(
+					job.question_id, asked_text, kb_a_id=job.kb_a_id, kb_b_id=job.kb_b_id, prompt=job.prompt or "",
+					job_id=job_id, attempt=job.attempts,
+				)
+			if not stored:
+				logger.warning(f"generation job {job_id} attempt {job.attempts} was superseded, result discarded")
+		except asyncio.CancelledError:
+			raise
+		except Exception as e:
+			error = f"{type(e).__name__}: {e}"
+			logger.warning(f"generation job {job_id} attempt {job.attempts} failed: {error}")
+			await self._record_failure(job, error)
+		finally:
+			heartbeat.cancel()
+		if job.batch_id is not None:
+			await self.refresh_batch_progress(job.batch_id)
+
+	async def _heartbeat(self, job_id: int, attempt: int) -> None:
+		"""执行期间定期刷新 updated_at；任务已不再是本次领取的 running 状态时停止"""
+		while True:
+			await asyncio.sleep(settings.job_heartbeat_seconds)
+			try:
+				async with AsyncSessionLocal() as db:
+					res = await db.execute(
+						sa.update(GenerationJob)
+						.where(GenerationJob.id == job_id, GenerationJob.status == JobStatus.RUNNING.value, GenerationJob.attempts == attempt)
+						.values(updated_at=datetime.utcnow())
+					)
+					await db.commit()
+				if res.rowcount != 1:
+					return
+			except Exception as e:
+				logger.warning(f"generation job {job_id} heartbeat failed: {e}")
+
+	async def _record_failure(self, job: GenerationJob, error: str) -> None:
+		now = datetime.utcnow()
+		question_status: Optional[str] = None
+		async with AsyncSessionLocal() as db:
+			values: Dict[str, object] = {"updated_at": now, "last_error": error}
+			if job.attempts < job.max_attempts:
+				values["status"] = JobStatus.QUEUED.value
+				values["next_run_at"] = now + timedelta(seconds=self._backoff(job.attempts))
+			else:
+				values["status"] = JobStatus.FAILED.value
+			# 仅当任务仍是本次领取的 running 状态时更新（可能已被超时回收）
+			res = await db.execute(
+				sa.update(GenerationJob)
+				.where(GenerationJob.id == job.id, GenerationJob.status == JobStatus.RUNNING.value, GenerationJob.attempts == job.attempts)
+				.values(**values)
+			)
+			if res.rowcount != 1:
+				await db.rollback()
+				return
+			if values["status"] == JobStatus.FAILED.value:
+				res_q = await db.execute(sa.select(Question.status).where(Question.id == job.question_id))
+				question_status = res_q.scalar_one_or_none()
+				await db.execute(sa.update(Question).where(Question.id == job.question_id).values(status="failed"))
+			await db.commit()
+		counters.move("generation_jobs", JobStatus.RUNNING.value, values["status"])
+		if values["status"] == JobStatus.FAILED.value:
+			counters.move("questions", question_status, "failed")
+
+	async def refresh_batch_progress(self, batch_id: int) -> None:
+		async with AsyncSessionLocal() as db:
+			res = await db.execute(
+				sa.select(GenerationJob.status, sa.func.count())
+				.where(GenerationJob.batch_id == batch_id)
+				.group_by(GenerationJob.status)
+			)
+			by_status = {status: int(n) for status, n in res.all()}
+			res_b = await db.execute(sa.select(ImportBatch).where(ImportBatch.id == batch_id))
+			batch = res_b.scalar_one_or_none()
+			if batch is None:
+				return
+			progress = {s.value: by_status.get(s.value, 0) for s in JobStatus}
+			progress["total"] = sum(by_status.values())
+			meta = dict(batch.meta_data or {})
+			meta["jobs"] = progress
+			pending = progress[JobStatus.QUEUED.value] + progress[JobStatus.RUNNING.value]
+			if progress["total"] and pending == 0:
+				batch.status = ImportStatus.COMPLETED.value
+				meta["message"] = f"processed={progress['total']} succeeded={progress[JobStatus.SUCCEEDED.value]} failed={progress[JobStatus.FAILED.value]}"
+			batch.meta_data = meta
+			await db.commit()
+
+
+job_scheduler = JobScheduler()
+BACKGROUND_TASKS.labels(kind="generation").set_function(lambda: job_scheduler.in_flight)
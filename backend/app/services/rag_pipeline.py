@@ -1,10 +1,61 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterator, List, Optional, Tuple, TypeVar
+from contextlib import contextmanager
 import asyncio
+import hashlib
+import time
 
 from app.clients.ragflow_client import RAGFlowClient
 from app.clients.llm_client import LLMClient
+from app.clients.retrieval_cache import normalize_query
 from app.core.config import settings
+from app.core.telemetry import PIPELINE_ANSWER_SECONDS, RETRIEVAL_SECONDS, timed
+from app.services.context_packer import pack_context
+from app.services.single_flight import SingleFlight
+from app.services.standards_index import standards_index
+from app.utils.tokens import estimate_tokens
+
+
+T = TypeVar("T")
+
+# 全进程共享：QA 接口与批量任务的相同问题合并为一次检索 + 生成
+answer_flight = SingleFlight("qa_answer")
+
+
+def answer_key(question: str, prompt: str, kb_a_id: str, kb_b_id: str, top_k_a: int, top_k_b: int) -> str:
+	raw = "\x00".join([normalize_query(question), prompt or "", kb_a_id, kb_b_id, str(int(top_k_a)), str(int(top_k_b))])
+	return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class StageTimings:
+	"""单次请求的分阶段耗时（毫秒）与 token 用量，随回答返回并持久化到 GeneratedAnswer.timings"""
+
+	STAGES = ("retrieval_a", "retrieval_b", "context_pack", "prompt_build", "llm", "alignment")
+
+	def __init__(self) -> None:
+		self._start = time.perf_counter()
+		self.values: Dict[str, Any] = {}
+
+	@contextmanager
+	def stage(self, name: str) -> Iterator[None]:
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.values[f"{name}_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+	async def measure(self, name: str, aw: Awaitable[T]) -> T:
+		with self.stage(name):
+			return await aw
+
+	def set_usage(self, usage: Optional[Dict[str, Any]]) -> None:
+		# OpenAI 兼容接口的 usage 字段；缺失时记为 None
+		usage = usage or {}
+		for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+			self.values[key] = usage.get(key)
+
+	def as_dict(self) -> Dict[str, Any]:
+		return {**self.values, "total_ms": round((time.perf_counter() - self._start) * 1000, 2)}
 
 
 class RAGPipeline:
@@ -12,16 +63,44 @@ class RAGPipeline:
 		self.rag_client = rag_client or RAGFlowClient()
 		self.llm = llm_client or LLMClient()
 
-	async def retrieve_a_b(self, question: str, kb_a_id: str, kb_b_id: str, top_k_a: int = 5, top_k_b: int = 5) -> Tuple[Dict[str, Any], Dict[str, Any]]:
-		res_a_task = asyncio.create_task(self.rag_client.query(kb_id=kb_a_id, query=question, top_k=top_k_a))
-		res_b_task = asyncio.create_task(self.rag_client.query(kb_id=kb_b_id, query=question, top_k=top_k_b))
+	async def retrieve_a_b(self, question: str, kb_a_id: str, kb_b_id: str, top_k_a: int = 5, top_k_b: int = 5, timings: Optional[StageTimings] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+		timings = timings or StageTimings()
+		res_a_task = asyncio.create_task(timings.measure("retrieval_a", self.retrieve_a(question, kb_a_id, top_k_a)))
+		res_b_task = asyncio.create_task(timings.measure("retrieval_b", self.retrieve_b(question, kb_b_id, top_k_b)))
 		res_a, res_b = await asyncio.gather(res_a_task, res_b_task)
 		return res_a, res_b
 
-	async def generate_initial_from_a(self, question: str, retrieved_a: Dict[str, Any], prompt: str) -> str:
+	async def retrieve_a(self, question: str, kb_a_id: str, top_k: int = 5) -> Dict[str, Any]:
+		with timed(RETRIEVAL_SECONDS, track="a", source="ragflow"):
+			return await self.rag_client.query(kb_id=kb_a_id, query=question, top_k=top_k)
+
+	async def retrieve_b(self, question: str, kb_b_id: str, top_k: int = 5) -> Dict[str, Any]:
+		if settings.track_b_retriever == "local":
+			with timed(RETRIEVAL_SECONDS, track="b", source="local"):
+				await standards_index.ensure_loaded()
+				return standards_index.search(question, top_k=top_k)
+		with timed(RETRIEVAL_SECONDS, track="b", source="ragflow"):
+			return await self.rag_client.query(kb_id=kb_b_id, query=question, top_k=top_k)
+
+	def pack_a(self, retrieved_a: Dict[str, Any], timings: Optional[StageTimings] = None) -> Dict[str, Any]:
+		"""A 轨证据装箱：返回模型实际看到的块，packing 字段记录 token 数与剔除情况"""
+		timings = timings or StageTimings()
+		with timings.stage("context_pack"):
+			used, stats = pack_context(retrieved_a.get("chunks", []))
+		timings.values["context_tokens"] = stats["tokens"]
+		return {**retrieved_a, "chunks": used, "packing": stats}
+
+	def _compose_prompt(self, question: str, retrieved_a: Dict[str, Any], prompt: str) -> str:
 		context = "\n\n".join([c.get("text", "") for c in retrieved_a.get("chunks", [])])
-		composed_prompt = f"You are an IR assistant.\nQuestion: {question}\nContext (A):\n{context}\nInstructions:\n{prompt}"
-		resp = await self.llm.chat(prompt=composed_prompt, model=settings.llm_model, temperature=settings.deepseek_temperature)
+		return f"You are an IR assistant.\nQuestion: {question}\nContext (A):\n{context}\nInstructions:\n{prompt}"
+
+	async def generate_initial_from_a(self, question: str, retrieved_a: Dict[str, Any], prompt: str, timings: Optional[StageTimings] = None) -> str:
+		timings = timings or StageTimings()
+		with timings.stage("prompt_build"):
+			composed_prompt = self._compose_prompt(question, retrieved_a, prompt)
+		with timings.stage("llm"):
+			resp = await self.llm.chat(prompt=composed_prompt, model=settings.llm_model, temperature=settings.deepseek_temperature)
+		timings.set_usage(resp.get("usage"))
 		answer = resp.get("choices", [{}])[0].get("message", {}).get("content", "") or str(resp)
 		return answer
 
@@ -50,13 +129,55 @@ class RAGPipeline:
 		return draft, {"mode": mode, "max_score": max_score, "strong": strong, "weak": weak, "conflicts": conflicts}
 
 	async def answer(self, question: str, prompt: str, kb_a_id: str, kb_b_id: str, top_k_a: int = 5, top_k_b: int = 5) -> Dict[str, Any]:
-		retrieved_a, retrieved_b = await self.retrieve_a_b(question, kb_a_id, kb_b_id, top_k_a, top_k_b)
-		initial = await self.generate_initial_from_a(question, retrieved_a, prompt)
-		aligned, align_summary = await self.align_with_b(initial, retrieved_b)
+		"""完整回答；相同参数的并发调用合并为一次执行，合并方的 timings 带 coalesced 标记"""
+		if not settings.qa_single_flight_enabled:
+			return await self._answer(question, prompt, kb_a_id, kb_b_id, top_k_a, top_k_b)
+		key = answer_key(question, prompt, kb_a_id, kb_b_id, top_k_a, top_k_b)
+		result, shared = await answer_flight.do(key, lambda: self._answer(question, prompt, kb_a_id, kb_b_id, top_k_a, top_k_b))
+		if shared:
+			result["timings"]["coalesced"] = True
+		return result
+
+	async def _answer(self, question: str, prompt: str, kb_a_id: str, kb_b_id: str, top_k_a: int = 5, top_k_b: int = 5) -> Dict[str, Any]:
+		timings = StageTimings()
+		with timed(PIPELINE_ANSWER_SECONDS, mode="answer"):
+			retrieved_a, retrieved_b = await self.retrieve_a_b(question, kb_a_id, kb_b_id, top_k_a, top_k_b, timings=timings)
+			retrieved_a = self.pack_a(retrieved_a, timings=timings)
+			initial = await self.generate_initial_from_a(question, retrieved_a, prompt, timings=timings)
+			with timings.stage("alignment"):
+				aligned, align_summary = await self.align_with_b(initial, retrieved_b)
 		return {
 			"initial": initial,
 			"aligned": aligned,
 			"evidence_a": retrieved_a,
 			"evidence_b": retrieved_b,
 			"alignment": align_summary,
+			"timings": timings.as_dict(),
 		}
+
+	async def answer_stream(self, question: str, prompt: str, kb_a_id: str, kb_b_id: str, top_k_a: int = 5, top_k_b: int = 5) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+		"""流式版本的 answer：依次产出 (event, data)——evidence、若干 token、alignment。"""
+		timings = StageTimings()
+		retrieved_a, retrieved_b = await self.retrieve_a_b(question, kb_a_id, kb_b_id, top_k_a, top_k_b, timings=timings)
+		retrieved_a = self.pack_a(retrieved_a, timings=timings)
+		yield "evidence", {"evidence_a": retrieved_a, "evidence_b": retrieved_b}
+		with timings.stage("prompt_build"):
+			composed_prompt = self._compose_prompt(question, retrieved_a, prompt)
+		parts: List[str] = []
+		usage: Dict[str, Any] = {}
+		# llm_ms 为整个流的耗时（包含客户端消费 token 的时间）
+		llm_start = time.perf_counter()
+		async for delta in self.llm.chat_stream(prompt=composed_prompt, model=settings.llm_model, temperature=settings.deepseek_temperature, usage=usage):
+			parts.append(delta)
+			yield "token", {"text": delta}
+		timings.values["llm_ms"] = round((time.perf_counter() - llm_start) * 1000, 2)
+		initial = "".join(parts)
+		if not usage:
+			# 提供商不支持 stream_options 时按估算值记录，并标记为估算
+			prompt_tokens, completion_tokens = estimate_tokens(composed_prompt), estimate_tokens(initial)
+			usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+			timings.values["usage_estimated"] = True
+		timings.set_usage(usage)
+		with timings.stage("alignment"):
+			aligned, align_summary = await self.align_with_b(initial, retrieved_b)
+		yield "alignment", {"initial": initial, "aligned": aligned, "alignment": align_summary, "timings": timings.as_dict()}
@@ -0,0 +1,70 @@
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+import asyncio
+import contextvars
+import copy
+
+from app.clients.priority import Lane, LaneRef, current_lane, promote
+from app.core.telemetry import SINGLE_FLIGHT_CALLS
+
+
+class SingleFlight:
+	"""进程内请求合并：同一 key 同时只执行一次，并发的相同调用等待同一结果。
+
+	实际执行放在独立任务中，发起者被取消（如客户端断开）不会影响其他等待者；
+	所有等待者都取消后才取消该任务。每个调用方拿到结果的深拷贝，互不影响。
+	任务使用自己的通道引用（初值为发起者的通道）；交互调用合并到批量发起的执行时，
+	该执行被提升为交互通道，避免交互调用按批量优先级排队。
+	"""
+
+	def __init__(self, name: str) -> None:
+		self.name = name
+		self._inflight: Dict[Hashable, Tuple[asyncio.Task, list, LaneRef]] = {}
+		self.leaders = 0
+		self.followers = 0
+
+	@property
+	def in_flight(self) -> int:
+		return len(self._inflight)
+
+	async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+		"""返回 (结果, 是否与进行中的调用合并)"""
+		entry = self._inflight.get(key)
+		shared = entry is not None
+		if entry is None:
+			lane = LaneRef(current_lane.get().lane)
+			ctx = contextvars.copy_context()
+			ctx.run(current_lane.set, lane)
+			task = asyncio.get_running_loop().create_task(fn(), context=ctx)
+			entry = (task, [0], lane)
+			self._inflight[key] = entry
+			task.add_done_callback(lambda _t, k=key, e=entry: self._inflight.pop(k, None) if self._inflight.get(k) is e else None)
+			self.leaders += 1
+		else:
+			self.followers += 1
+			if current_lane.get().lane is Lane.INTERACTIVE:
+				promote(entry[2])
+		SINGLE_FLIGHT_CALLS.labels(name=self.name, role="follower" if shared else "leader").inc()
+
+		task, waiters, _lane = entry
+		waiters[0] += 1
+		try:
+			result = await asyncio.shield(task)
+		except asyncio.CancelledError:
+			if not task.done() and waiters[0] == 1:
+				task.cancel()
+				if self._inflight.get(key) is entry:
+					del self._inflight[key]
+			raise
+		finally:
+			waiters[0] -= 1
+		return copy.deepcopy(result), shared
+
+	def stats(self) -> Dict[str, Any]:
+		total = self.leaders + self.followers
+		return {
+			"in_flight": self.in_flight,
+			"executions": self.leaders,
+			"deduplicated": self.followers,
+			"dedup_rate": (self.followers / total) if total else 0.0,
+		}
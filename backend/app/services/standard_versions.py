@@ -0,0 +1,181 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from datetime import datetime
+import asyncio
+import time
+import sqlalchemy as sa
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.models import StandardAnswer, StandardAnswerVersion
+
+
+def resolve_active(
+	versions: Iterable[StandardAnswerVersion], now: Optional[datetime] = None
+) -> Tuple[Optional[StandardAnswerVersion], Optional[datetime]]:
+	"""返回 (生效窗口包含 now 的最高版本, 下一个窗口边界时刻)；到达该时刻前结果不会改变"""
+	now = now or datetime.utcnow()
+	current: Optional[StandardAnswerVersion] = None
+	next_change_at: Optional[datetime] = None
+	for v in versions:
+		for boundary in (v.effective_from, v.effective_to):
+			if boundary is not None and boundary > now and (next_change_at is None or boundary < next_change_at):
+				next_change_at = boundary
+		if v.effective_from is not None and v.effective_from > now:
+			continue
+		if v.effective_to is not None and v.effective_to <= now:
+			continue
+		if current is None or v.version > current.version:
+			current = v
+	return current, next_change_at
+
+
+async def sync_pointers(db: AsyncSession, standard_answer_ids: Iterable[int], now: Optional[datetime] = None) -> None:
+	"""重新解析指定标准回答的当前版本，写回 current_version_id / next_change_at（由调用方提交）"""
+	ids = sorted(set(standard_answer_ids))
+	now = now or datetime.utcnow()
+	size = settings.db_bulk_chunk_size
+	for i in range(0, len(ids), size):
+		chunk = ids[i:i + size]
+		res = await db.execute(
+			sa.select(StandardAnswerVersion).where(StandardAnswerVersion.standard_answer_id.in_(chunk))
+		)
+		grouped: Dict[int, List[StandardAnswerVersion]] = {sa_id: [] for sa_id in chunk}
+		for v in res.scalars().all():
+			grouped[v.standard_answer_id].append(v)
+		params = []
+		for sa_id, versions in grouped.items():
+			current, next_change_at = resolve_active(versions, now)
+			params.append({
+				"id": sa_id,
+				"current_version_id": current.id if current is not None else None,
+				"next_change_at": next_change_at,
+			})
+		# ORM 按主键批量 UPDATE（executemany）
+		await db.execute(sa.update(StandardAnswer), params)
+
+
+async def sync_due_pointers(db: AsyncSession, now: Optional[datetime] = None) -> List[int]:
+	"""重新解析所有窗口边界已到期的标准回答，返回受影响的 id"""
+	now = now or datetime.utcnow()
+	res = await db.execute(
+		sa.select(StandardAnswer.id).where(StandardAnswer.next_change_at.is_not(None), StandardAnswer.next_change_at <= now)
+	)
+	ids = list(res.scalars().all())
+	if ids:
+		await sync_pointers(db, ids, now)
+	return ids
+
+
+class ActiveVersion:
+	__slots__ = ("standard_answer_id", "topic_key", "version_id", "version", "content", "strong_constraint")
+
+	def __init__(self, standard_answer_id: int, topic_key: str, version: StandardAnswerVersion) -> None:
+		self.standard_answer_id = standard_answer_id
+		self.topic_key = topic_key
+		self.version_id = version.id
+		self.version = version.version
+		self.content = version.content
+		self.strong_constraint = bool(version.strong_constraint)
+
+
+class ActiveVersionCache:
+	"""按 StandardAnswer.current_version_id 物化的"当前生效版本"缓存。
+
+	查找为 O(1) 字典访问。缓存记录所有标准回答中最早的 next_change_at，到达该时刻后
+	ensure_fresh 只重新解析到期的标准回答（生效窗口开启或关闭），并定期全量重载以
+	同步其他 worker 的写入。generation 在内容变化时递增，供下游索引判断是否需要重建。
+	"""
+
+	def __init__(self) -> None:
+		self._by_id: Dict[int, ActiveVersion] = {}
+		self._by_topic: Dict[str, ActiveVersion] = {}
+		self._next_change_at: Optional[datetime] = None
+		self._loaded_at: Optional[float] = None
+		self._lock: Optional[asyncio.Lock] = None
+		self.generation = 0
+
+	def __len__(self) -> int:
+		return len(self._by_id)
+
+	def get(self, standard_answer_id: int) -> Optional[ActiveVersion]:
+		return self._by_id.get(standard_answer_id)
+
+	def by_topic(self, topic_key: str) -> Optional[ActiveVersion]:
+		return self._by_topic.get(topic_key)
+
+	def snapshot(self) -> List[ActiveVersion]:
+		return list(self._by_id.values())
+
+	async def ensure_fresh(self) -> None:
+		if self._lock is None:
+			self._lock = asyncio.Lock()
+		async with self._lock:
+			if self._loaded_at is None or (time.monotonic() - self._loaded_at) >= settings.standards_reload_seconds:
+				await self.load()
+			elif self._next_change_at is not None and datetime.utcnow() >= self._next_change_at:
+				await self._refresh_due()
+
+	async def _select(self, db: AsyncSession, ids: Optional[Sequence[int]] = None) -> List[Tuple[int, str, Optional[StandardAnswerVersion]]]:
+		stmt = sa.select(StandardAnswer.id, StandardAnswer.topic_key, StandardAnswerVersion).outerjoin(
+			StandardAnswerVersion, StandardAnswerVersion.id == StandardAnswer.current_version_id
+		)
+		if ids is not None:
+			stmt = stmt.where(StandardAnswer.id.in_(ids))
+		res = await db.execute(stmt)
+		return [tuple(row) for row in res.all()]
+
+	async def _min_next_change(self, db: AsyncSession) -> Optional[datetime]:
+		res = await db.execute(sa.select(sa.func.min(StandardAnswer.next_change_at)))
+		return res.scalar_one_or_none()
+
+	def _put(self, sa_id: int, topic_key: str, version: Optional[StandardAnswerVersion]) -> None:
+		old = self._by_id.pop(sa_id, None)
+		if old is not None:
+			self._by_topic.pop(old.topic_key, None)
+		if version is not None:
+			av = ActiveVersion(sa_id, topic_key, version)
+			self._by_id[sa_id] = av
+			self._by_topic[topic_key] = av
+
+	async def load(self) -> None:
+		async with AsyncSessionLocal() as db:
+			if await sync_due_pointers(db):
+				await db.commit()
+			rows = await self._select(db)
+			next_change_at = await self._min_next_change(db)
+		self._by_id, self._by_topic = {}, {}
+		for sa_id, topic_key, version in rows:
+			self._put(sa_id, topic_key, version)
+		self._next_change_at = next_change_at
+		self._loaded_at = time.monotonic()
+		self.generation += 1
+		logger.info(f"active standard versions loaded: {len(self._by_id)} in force")
+
+	async def _refresh_due(self) -> None:
+		async with AsyncSessionLocal() as db:
+			ids = await sync_due_pointers(db)
+			await db.commit()
+			rows = await self._select(db, ids) if ids else []
+			self._next_change_at = await self._min_next_change(db)
+		for sa_id, topic_key, version in rows:
+			self._put(sa_id, topic_key, version)
+		if rows:
+			self.generation += 1
+
+	async def refresh(self, standard_answer_ids: Iterable[int]) -> None:
+		"""指针已由 sync_pointers 写回并提交后，把指定标准回答同步进缓存（未加载时跳过）"""
+		ids = list(set(standard_answer_ids))
+		if not ids or self._loaded_at is None:
+			return
+		async with AsyncSessionLocal() as db:
+			rows = await self._select(db, ids)
+			self._next_change_at = await self._min_next_change(db)
+		for sa_id, topic_key, version in rows:
+			self._put(sa_id, topic_key, version)
+		self.generation += 1
+
+
+active_versions = ActiveVersionCache()
@@ -0,0 +1,169 @@
+from __future__ import annotations
+from typing import Any, Dict, List
+from collections import Counter
+import math
+import unicodedata
+import numpy as np
+
+from app.services.standard_versions import ActiveVersion, active_versions
+
+
+def _normalize(text: str) -> str:
+	text = unicodedata.normalize("NFKC", text or "").lower()
+	# 去掉空白与标点，只保留字母、数字与汉字
+	return "".join(ch for ch in text if ch.isalnum())
+
+
+def char_ngrams(text: str) -> Counter:
+	"""字符 1-gram + 2-gram：中文无需分词即可得到稳定的检索特征"""
+	s = _normalize(text)
+	grams: Counter = Counter(s)
+	grams.update(s[i:i + 2] for i in range(len(s) - 1))
+	return grams
+
+
+class _Entry:
+	__slots__ = ("standard_answer_id", "topic_key", "version_id", "version", "content", "strong_constraint", "grams")
+
+	def __init__(self, active: ActiveVersion) -> None:
+		self.standard_answer_id = active.standard_answer_id
+		self.topic_key = active.topic_key
+		self.version_id = active.version_id
+		self.version = active.version
+		self.content = active.content
+		self.strong_constraint = active.strong_constraint
+		self.grams = char_ngrams(f"{active.topic_key} {active.content}")
+
+
+class StandardsIndex:
+	"""轨道 B 的进程内检索索引：基于当前生效标准回答的字符 n-gram TF-IDF。
+
+	得分为 TF-IDF 向量的余弦相似度（0~1），可直接与 alignment_strong_threshold /
+	alignment_weak_threshold 比较。文档集合取自 active_versions；变化时只更新内存条目
+	并标记 dirty，下一次查询时用 NumPy 向量化地重建稀疏矩阵（CSC 倒排 + 文档范数）。
+	"""
+
+	def __init__(self) -> None:
+		self._entries: Dict[int, _Entry] = {}
+		self._dirty = True
+		self._generation = -1
+		# 编译后的矩阵
+		self._order: List[_Entry] = []
+		self._vocab: Dict[str, int] = {}
+		self._idf = np.zeros(0, dtype=np.float32)
+		self._colptr = np.zeros(1, dtype=np.int64)
+		self._rows = np.zeros(0, dtype=np.int32)
+		self._vals = np.zeros(0, dtype=np.float32)
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	# ---- 维护 ----
+
+	def _sync(self) -> None:
+		"""按 active_versions 快照增量同步：只对版本发生变化的条目重新切分 n-gram"""
+		entries: Dict[int, _Entry] = {}
+		changed = False
+		for active in active_versions.snapshot():
+			current = self._entries.get(active.standard_answer_id)
+			if current is None or current.version_id != active.version_id:
+				current = _Entry(active)
+				changed = True
+			entries[active.standard_answer_id] = current
+		if changed or len(entries) != len(self._entries):
+			self._entries = entries
+			self._dirty = True
+		self._generation = active_versions.generation
+
+	async def ensure_loaded(self) -> None:
+		"""跟随当前生效版本缓存：窗口开启/关闭、promote、导入都会推进其 generation"""
+		await active_versions.ensure_fresh()
+		if self._generation != active_versions.generation:
+			self._sync()
+
+	# ---- 检索 ----
+
+	def _compile(self) -> None:
+		order = list(self._entries.values())
+		vocab: Dict[str, int] = {}
+		indptr = [0]
+		cols: List[int] = []
+		tfs: List[float] = []
+		for entry in order:
+			for gram, tf in entry.grams.items():
+				cols.append(vocab.setdefault(gram, len(vocab)))
+				tfs.append(1.0 + math.log(tf))
+			indptr.append(len(cols))
+		n_docs = len(order)
+		indices = np.asarray(cols, dtype=np.int32)
+		data = np.asarray(tfs, dtype=np.float32)
+		doc_of = np.repeat(np.arange(n_docs, dtype=np.int32), np.diff(np.asarray(indptr, dtype=np.int64)))
+
+		df = np.bincount(indices, minlength=len(vocab)).astype(np.float32)
+		idf = (np.log((1.0 + n_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+		weights = data * idf[indices]
+		norms = np.sqrt(np.bincount(doc_of, weights=weights * weights, minlength=n_docs)).astype(np.float32)
+		norms[norms == 0] = 1.0
+		weights = weights / norms[doc_of]
+
+		# 转为按 term 聚合的 CSC（倒排表）
+		perm = np.argsort(indices, kind="stable")
+		self._rows = doc_of[perm]
+		self._vals = weights[perm]
+		self._colptr = np.concatenate(([0], np.cumsum(np.bincount(indices, minlength=len(vocab))))).astype(np.int64)
+		self._idf = idf
+		self._vocab = vocab
+		self._order = order
+		self._dirty = False
+
+	def search(self, query: str, top_k: int = 5) -> Dict[str, Any]:
+		if self._dirty:
+			self._compile()
+		if not self._order:
+			return {"chunks": []}
+		# 未登录词 df=0，仍计入查询范数，保证得分是真实余弦值
+		oov_idf = math.log(1.0 + len(self._order)) + 1.0
+		q_cols: List[int] = []
+		q_w: List[float] = []
+		oov_sq = 0.0
+		for gram, tf in char_ngrams(query).items():
+			col = self._vocab.get(gram)
+			if col is None:
+				oov_sq += ((1.0 + math.log(tf)) * oov_idf) ** 2
+				continue
+			q_cols.append(col)
+			q_w.append((1.0 + math.log(tf)) * float(self._idf[col]))
+		if not q_cols:
+			return {"chunks": []}
+		qw = np.asarray(q_w, dtype=np.float32)
+		q_norm = math.sqrt(float(np.dot(qw, qw)) + oov_sq) or 1.0
+		scores = np.zeros(len(self._order), dtype=np.float32)
+		for col, w in zip(q_cols, qw / q_norm):
+			start, end = self._colptr[col], self._colptr[col + 1]
+			np.add.at(scores, self._rows[start:end], w * self._vals[start:end])
+		k = max(0, min(top_k, len(scores)))
+		if k == 0:
+			return {"chunks": []}
+		top = np.argpartition(-scores, k - 1)[:k]
+		top = top[np.argsort(-scores[top])]
+		chunks = []
+		for i in top:
+			score = float(scores[i])
+			if score <= 0:
+				continue
+			entry = self._order[i]
+			chunks.append({
+				"text": entry.content,
+				"score": min(score, 1.0),
+				"metadata": {
+					"standard_answer_id": entry.standard_answer_id,
+					"topic_key": entry.topic_key,
+					"version_id": entry.version_id,
+					"version": entry.version,
+					"strong_constraint": entry.strong_constraint,
+				},
+			})
+		return {"chunks": chunks}
+
+
+standards_index = StandardsIndex()
@@ -0,0 +1,102 @@
+from __future__ import annotations
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+from pathlib import Path
+import asyncio
+import hashlib
+from loguru import logger
+
+from app.core.config import settings
+from app.core.telemetry import BACKGROUND_TASKS
+from app.clients.ragflow_client import RAGFlowClient
+
+
+class UploadSource:
+	"""待上传的文件：磁盘路径或压缩包内条目。opener 返回二进制文件对象，均在线程中调用。"""
+
+	def __init__(self, filename: str, opener: Callable[[], BinaryIO], location: str) -> None:
+		self.filename = filename
+		self.opener = opener
+		self.location = location
+
+	@classmethod
+	def from_path(cls, file_path: str) -> "UploadSource":
+		path = Path(file_path)
+		return cls(filename=path.name, opener=lambda: path.open("rb"), location=str(path))
+
+	def read(self) -> bytes:
+		with self.opener() as f:
+			return f.read()
+
+	def sha256(self) -> Optional[str]:
+		"""流式计算内容哈希；源文件不存在时返回 None"""
+		digest = hashlib.sha256()
+		try:
+			with self.opener() as f:
+				for block in iter(lambda: f.read(1024 * 1024), b""):
+					digest.update(block)
+		except FileNotFoundError:
+			return None
+		return digest.hexdigest()
+
+
+class UploadPipeline:
+	"""有界 worker 池，把文档并发上传到 RAGFlow。
+
+	生产者（逐行写 DB）通过 submit 投递，队列有上限形成背压；worker 并发执行
+	文件读取与 HTTP 上传，使 DB 写入、读盘和上传相互重叠。
+
+		async with UploadPipeline(rag, kb_id, concurrency=8) as uploader:
+			await uploader.submit(UploadSource.from_path(path), metadata)
+	"""
+
+	def __init__(self, rag: RAGFlowClient, kb_id: str, concurrency: Optional[int] = None) -> None:
+		self.rag = rag
+		self.kb_id = kb_id
+		self.concurrency = max(1, concurrency or settings.ingest_upload_concurrency)
+		self.uploaded = 0
+		self.failed = 0
+		# metadata["doc_id"]（KnowledgeDoc.id）-> RAGFlow 文档 id，仅记录上传成功的文档
+		self.uploaded_docs: Dict[int, Optional[str]] = {}
+		self._queue: "asyncio.Queue[Optional[Tuple[UploadSource, Dict[str, Any]]]]" = asyncio.Queue(maxsize=self.concurrency * 2)
+		self._workers: List[asyncio.Task] = []
+
+	async def __aenter__(self) -> "UploadPipeline":
+		self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+		return self
+
+	async def __aexit__(self, exc_type, exc, tb) -> None:
+		if exc_type is not None:
+			for w in self._workers:
+				w.cancel()
+			await asyncio.gather(*self._workers, return_exceptions=True)
+			return
+		for _ in self._workers:
+			await self._queue.put(None)
+		await asyncio.gather(*self._workers)
+
+	async def submit(self, source: UploadSource, metadata: Optional[Dict[str, Any]] = None) -> None:
+		await self._queue.put((source, metadata or {}))
+
+	async def _worker(self) -> None:
+		while True:
+			item = await self._queue.get()
+			if item is None:
+				return
+			source, metadata = item
+			gauge = BACKGROUND_TASKS.labels(kind="upload")
+			gauge.inc()
+			try:
+				content = await asyncio.to_thread(source.read)
+				result = await self.rag.upload_content(filename=source.filename, content=content, kb_id=self.kb_id, metadata=metadata)
+				self.uploaded += 1
+				if metadata.get("doc_id") is not None:
+					self.uploaded_docs[metadata["doc_id"]] = self.rag.extract_doc_id(result)
+			except Exception as e:
+				# 单个文件失败不中断整个批次
+				self.failed += 1
+				logger.warning(f"Failed to upload to RAGFlow: {source.location} - {e}")
+			finally:
+				gauge.dec()
+
+	def summary(self) -> str:
+		return f"uploaded={self.uploaded} upload_failed={self.failed}"
@@ -0,0 +1,75 @@
+from __future__ import annotations
+from typing import Dict, Iterator, Optional
+from pathlib import PurePosixPath
+import unicodedata
+import zipfile
+
+from app.services.upload_pipeline import UploadSource
+
+
+def normalize_filename(name: str) -> str:
+	"""全角/半角、大小写、首尾空白归一，使 CSV 中的文件名与压缩包条目稳定匹配"""
+	return unicodedata.normalize("NFKC", name).strip().casefold()
+
+
+def _entry_name(info: zipfile.ZipInfo) -> str:
+	# 未设置 UTF-8 标志位的条目被 zipfile 按 cp437 解码；Windows 中文环境打包的通常是 GBK
+	if info.flag_bits & 0x800:
+		return info.filename
+	try:
+		return info.filename.encode("cp437").decode("gbk")
+	except (UnicodeEncodeError, UnicodeDecodeError):
+		return info.filename
+
+
+class ZipIndex:
+	"""一次遍历 ZIP 中央目录建立的文件名索引。
+
+	按规范化后的文件名（以及相对路径）O(1) 查找条目，条目内容直接从压缩包流式读取，
+	无需先 extractall 到磁盘。同名文件以中央目录中先出现的为准。
+	"""
+
+	def __init__(self, zip_path: str) -> None:
+		self.zip_path = zip_path
+		self._zf = zipfile.ZipFile(zip_path, "r")
+		self._names: Dict[str, str] = {}
+		self._by_key: Dict[str, zipfile.ZipInfo] = {}
+		for info in self._zf.infolist():
+			if info.is_dir():
+				continue
+			name = _entry_name(info)
+			self._names[info.filename] = name
+			self._by_key.setdefault(normalize_filename(name), info)
+			self._by_key.setdefault(normalize_filename(PurePosixPath(name).name), info)
+
+	def __enter__(self) -> "ZipIndex":
+		return self
+
+	def __exit__(self, exc_type, exc, tb) -> None:
+		self.close()
+
+	def close(self) -> None:
+		self._zf.close()
+
+	def __len__(self) -> int:
+		return len(self._names)
+
+	def name_of(self, info: zipfile.ZipInfo) -> str:
+		return self._names.get(info.filename, info.filename)
+
+	def lookup(self, filename: str) -> Optional[zipfile.ZipInfo]:
+		key = normalize_filename(filename.replace("\\", "/"))
+		return self._by_key.get(key) or self._by_key.get(normalize_filename(PurePosixPath(key).name))
+
+	def entries(self) -> Iterator[zipfile.ZipInfo]:
+		for info in self._zf.infolist():
+			if not info.is_dir():
+				yield info
+
+	def source(self, info: zipfile.ZipInfo) -> UploadSource:
+		name = self.name_of(info)
+		return UploadSource(
+			filename=PurePosixPath(name).name,
+			opener=lambda: self._zf.open(info, "r"),
+			location=f"{self.zip_path}!/{name}",
+		)
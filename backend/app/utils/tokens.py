@@ -0,0 +1,28 @@
+import math
+import re
+
+from app.core.config import settings
+
+# 中日韩文字、假名、全角符号与中文标点：按每字 context_tokens_per_cjk 个 token 估算
+_CJK = re.compile(r"[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+	"""不依赖分词器的 token 估算：CJK 字符逐字计，其余非空白字符约 4 个一 token"""
+	if not text:
+		return 0
+	cjk = len(_CJK.findall(text))
+	other = sum(1 for ch in _CJK.sub("", text) if not ch.isspace())
+	return math.ceil(cjk * settings.context_tokens_per_cjk + other / 4)
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+	used = 0.0
+	for i, ch in enumerate(text):
+		if _CJK.match(ch):
+			used += settings.context_tokens_per_cjk
+		elif not ch.isspace():
+			used += 0.25
+		if used > budget:
+			return text[:i]
+	return text
@@ -0,0 +1,108 @@
+"""列级压缩基准：对比不同 zstd 级别、有无训练字典时的存储体积与读取（解压）延迟。
+
+从当前数据库抽样 generated_answers / evidence_chunks 的大字段（已压缩的值会先还原），
+一半样本用于训练字典，另一半用于测量，避免字典"见过"测试数据导致结果偏乐观。
+
+用法（在 backend/ 下）：
+	PYTHONPATH=. python scripts/bench_column_compression.py --limit 2000 --levels 3,6,12
+	PYTHONPATH=. python scripts/bench_column_compression.py --write-dict ./storage/zdict
+写出的 <dict_id>.zdict 放入 COLUMN_COMPRESSION_DICT_DIR，并设置 COLUMN_COMPRESSION_DICT_ID 后生效。
+"""
+from __future__ import annotations
+from typing import List, Optional
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import time
+import numpy as np
+import sqlalchemy as sa
+import zstandard as zstd
+
+from app.db.session import AsyncSessionLocal
+from app.db.types import codec, train_dictionary
+from app.models.models import EvidenceChunk, GeneratedAnswer
+
+FIELDS = [
+	GeneratedAnswer.initial_answer,
+	GeneratedAnswer.aligned_answer,
+	GeneratedAnswer.sources_a,
+	GeneratedAnswer.sources_b,
+	EvidenceChunk.text,
+]
+
+
+async def load_samples(limit: int) -> List[bytes]:
+	samples: List[bytes] = []
+	async with AsyncSessionLocal() as db:
+		for col in FIELDS:
+			res = await db.execute(sa.select(col).where(col.is_not(None)).order_by(col.class_.id.desc()).limit(limit))
+			for value in res.scalars().all():
+				if isinstance(value, str):
+					samples.append(value.encode("utf-8"))
+				else:
+					samples.append(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+	return [s for s in samples if s]
+
+
+def measure(name: str, samples: List[bytes], level: int, dict_data: Optional[zstd.ZstdCompressionDict]) -> None:
+	cctx = zstd.ZstdCompressor(level=level, dict_data=dict_data)
+	dctx = zstd.ZstdDecompressor(dict_data=dict_data)
+	raw = sum(len(s) for s in samples)
+	t0 = time.perf_counter()
+	packed = [cctx.compress(s) for s in samples]
+	write_s = time.perf_counter() - t0
+	latencies = []
+	for p in packed:
+		t = time.perf_counter()
+		dctx.decompress(p)
+		latencies.append(time.perf_counter() - t)
+	stored = sum(len(p) for p in packed)
+	us = np.array(latencies) * 1e6
+	print(
+		f"{name:<22} level={level:<3} stored={stored / 1024:>10.1f}KiB ratio={raw / max(stored, 1):>5.2f}x "
+		f"write={write_s * 1e6 / len(samples):>8.1f}us/row read_p50={np.percentile(us, 50):>7.1f}us "
+		f"read_p95={np.percentile(us, 95):>7.1f}us"
+	)
+
+
+async def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--limit", type=int, default=2000, help="每个字段抽样的行数")
+	parser.add_argument("--levels", default="3,6,12", help="逗号分隔的 zstd 级别")
+	parser.add_argument("--dict-size", type=int, default=112 * 1024)
+	parser.add_argument("--write-dict", default="", help="用全部样本训练字典并写入该目录")
+	args = parser.parse_args()
+
+	samples = await load_samples(args.limit)
+	if len(samples) < 20:
+		print(f"only {len(samples)} samples in the database, nothing to benchmark")
+		return
+	train, test = samples[0::2], samples[1::2]
+	raw = sum(len(s) for s in test)
+	print(f"samples={len(test)} raw={raw / 1024:.1f}KiB avg={raw / len(test):.0f}B (train={len(train)})")
+
+	dict_data = train_dictionary(train, args.dict_size)
+	for level in (int(x) for x in args.levels.split(",")):
+		measure("zstd", test, level, None)
+		measure(f"zstd+dict({dict_data.dict_id()})", test, level, dict_data)
+
+	# 当前配置下的实际读路径（含格式判断与小值不压缩）
+	encoded = [codec.encode(s) for s in test]
+	t = time.perf_counter()
+	for e in encoded:
+		codec.decode(e)
+	per_row = (time.perf_counter() - t) * 1e6 / len(encoded)
+	print(f"configured codec       stored={sum(len(e) for e in encoded) / 1024:>10.1f}KiB read_avg={per_row:.1f}us/row")
+
+	if args.write_dict:
+		full = train_dictionary(samples, args.dict_size)
+		out = Path(args.write_dict)
+		out.mkdir(parents=True, exist_ok=True)
+		path = out / f"{full.dict_id()}.zdict"
+		path.write_bytes(full.as_bytes())
+		print(f"dictionary written to {path} (set COLUMN_COMPRESSION_DICT_ID={full.dict_id()})")
+
+
+if __name__ == "__main__":
+	asyncio.run(main())
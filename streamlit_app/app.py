@@ -49,9 +49,20 @@ st.markdown("""
 def api_get(endpoint: str, params: Optional[Dict] = None) -> Dict[str, Any]:
     """调用后端 GET API"""
     try:
-        response = requests.get(f"{BACKEND_API}{endpoint}", params=params, timeout=30)
+        # 带 ETag 的响应缓存在会话中，重复请求走条件 GET（304 直接复用）
+        cache = st.session_state.setdefault("_etag_cache", {})
+        cache_key = (endpoint, tuple(sorted((params or {}).items())))
+        headers = {}
+        if cache_key in cache:
+            headers["If-None-Match"] = cache[cache_key][0]
+        response = requests.get(f"{BACKEND_API}{endpoint}", params=params, headers=headers, timeout=30)
+        if response.status_code == 304 and cache_key in cache:
+            return cache[cache_key][1]
         response.raise_for_status()
-        return response.json()
+        data = response.json()
+        if response.headers.get("ETag"):
+            cache[cache_key] = (response.headers["ETag"], data)
+        return data
     except Exception as e:
         st.error(f"API 调用失败: {e}")
         return {}
@@ -245,6 +256,7 @@ elif page == "✅ 审核工作台":
         )
     with col_filter2:
         if st.button("🔄 刷新列表", use_container_width=True):
+            st.session_state.pop("review_tasks", None)
             st.rerun()
     with col_filter3:
         auto_refresh = st.checkbox("自动刷新", value=False)
@@ -258,14 +270,28 @@ elif page == "✅ 审核工作台":
         "已拒绝": "rejected"
     }
     
-    tasks_response = api_get("/api/v1/reviews", 
-                            params={"status": status_map[status_filter]} if status_filter != "全部" else None)
-    tasks = tasks_response.get("tasks", [])
+    # 列表接口按游标分页：已加载的任务与下一页游标保存在会话中，
+    # 页面重跑时不再请求；切换过滤、刷新或审核操作后只重新取第一页，其余页通过"加载更多"追加
+    def fetch_review_page(cursor: Optional[str] = None) -> None:
+        params = {}
+        if status_map[status_filter]:
+            params["status"] = status_map[status_filter]
+        if cursor:
+            params["cursor"] = cursor
+        tasks_response = api_get("/api/v1/reviews", params=params)
+        st.session_state.review_tasks = st.session_state.get("review_tasks", []) + tasks_response.get("tasks", [])
+        st.session_state.review_next_cursor = tasks_response.get("next_cursor")
+    
+    if st.session_state.get("review_filter") != status_filter or "review_tasks" not in st.session_state:
+        st.session_state.review_filter = status_filter
+        st.session_state.review_tasks = []
+        fetch_review_page()
+    tasks = st.session_state.review_tasks
     
     if not tasks:
         st.info("📭 暂无审核任务")
     else:
-        st.success(f"找到 {len(tasks)} 个任务")
+        st.success(f"已加载 {len(tasks)} 个任务" + ("（还有更多）" if st.session_state.get("review_next_cursor") else ""))
         
         # 任务列表和详情（左右布局）
         col_list, col_detail = st.columns([1, 2])
@@ -299,6 +325,11 @@ elif page == "✅ 审核工作台":
                 ):
                     st.session_state.selected_task_id = task_id
                     st.rerun()
+            
+            if st.session_state.get("review_next_cursor"):
+                if st.button("加载更多", use_container_width=True):
+                    fetch_review_page(st.session_state.review_next_cursor)
+                    st.rerun()
         
         with col_detail:
             if st.session_state.selected_task_id:
@@ -363,6 +394,7 @@ elif page == "✅ 审核工作台":
                             if result:
                                 st.success("✅ 审核通过！")
                                 st.session_state.selected_task_id = None
+                                st.session_state.pop("review_tasks", None)
                                 st.rerun()
                     
                     with col_act2:
@@ -372,6 +404,7 @@ elif page == "✅ 审核工作台":
                             if result:
                                 st.warning("📝 已退回修订")
                                 st.session_state.selected_task_id = None
+                                st.session_state.pop("review_tasks", None)
                                 st.rerun()
                     
                     with col_act3:
@@ -381,6 +414,7 @@ elif page == "✅ 审核工作台":
                             if result:
                                 st.error("❌ 已拒绝")
                                 st.session_state.selected_task_id = None
+                                st.session_state.pop("review_tasks", None)
                                 st.rerun()
                     
                     # 升级为标准回答
@@ -578,5 +612,6 @@ elif page == "📊 系统指标":
 if page == "✅ 审核工作台" and auto_refresh:
     import time
     time.sleep(5)
+    st.session_state.pop("review_tasks", None)
     st.rerun()
 